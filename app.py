@@ -1,16 +1,29 @@
 import os
-import json
 import logging
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, send_from_directory, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, make_response
 from flask_login import LoginManager, login_required, current_user, login_user, logout_user
 from flask_wtf.csrf import CSRFProtect
 from werkzeug.utils import secure_filename
 from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, Subject, File, User, Report
+from models import db, Subject, File, User, Report, FileVote, FileComment, upgrade_schema
 from email_service import email_service
+from email_outbox import email_outbox
+from json_store import JsonDocument, JsonCollection
+from vote_buffer import vote_buffer
+from search_index import search_index
+from pagination import paginate_files, paginate_records
+from hidden_files import HiddenFileSet
+from catalog import catalog
+from page_cache import page_cache
+from file_serving import serve_file, file_offload
+from blob_store import blob_store
+from ingest import ingest
+from chunked_upload import chunked_uploads, ChunkedUploadError
+from media import thumbnails, photos
+from metrics import metrics
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -41,10 +54,26 @@ db.init_app(app)
 try:
     with app.app_context():
         db.create_all()
+        upgrade_schema()
 except Exception as e:
     print(f"Warning: Could not create database tables on startup: {e}")
 
-# Initialize email service
+# Initialize full-text search (FTS5 on SQLite, tsvector on Postgres)
+app.config['SEARCH_BACKEND'] = os.environ.get('SEARCH_BACKEND', 'auto')  # 'auto' or 'like'
+try:
+    search_index.init_app(app)
+except Exception as e:
+    print(f"Warning: Could not initialize search index on startup: {e}")
+
+# Initialize email service; mails go through the outbox (outbound_emails table) and a background thread
+app.config['MAIL_API_URL'] = os.environ.get('MAIL_API_URL', 'https://connectors.replit.com/api/v2/mailer/send')
+app.config['MAIL_CONNECT_TIMEOUT'] = float(os.environ.get('MAIL_CONNECT_TIMEOUT', '3.05'))
+app.config['MAIL_READ_TIMEOUT'] = float(os.environ.get('MAIL_READ_TIMEOUT', '20'))
+app.config['MAIL_POOL_SIZE'] = int(os.environ.get('MAIL_POOL_SIZE', '4'))  # Keep-alive connections to the mail API
+app.config['EMAIL_OUTBOX_MAX_ATTEMPTS'] = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+app.config['EMAIL_OUTBOX_BACKOFF'] = float(os.environ.get('EMAIL_OUTBOX_BACKOFF', '5'))  # Seconds before the first retry, doubling
+app.config['EMAIL_OUTBOX_BACKOFF_MAX'] = float(os.environ.get('EMAIL_OUTBOX_BACKOFF_MAX', '300'))
+app.config['EMAIL_OUTBOX_MAX_AGE'] = int(os.environ.get('EMAIL_OUTBOX_MAX_AGE', '600'))  # OTP codes expire after 10 minutes
 email_service.init_app(app)
 
 # Initialize Flask-Login
@@ -469,259 +498,169 @@ ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'ppt', 'pptx', 'txt', 'jpg', 'jpeg',
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
+# Let nginx ('x-accel') or Apache ('x-sendfile') stream stored files; 'none' serves them from Python
+app.config['FILE_OFFLOAD'] = os.environ.get('FILE_OFFLOAD', 'none')
+app.config['FILE_OFFLOAD_PREFIX'] = os.environ.get('FILE_OFFLOAD_PREFIX', '/_protected/')  # nginx internal location
+file_offload.init_app(app)
+
+# Question papers and syllabus files are stored once per content hash under uploads/blobs
+blob_store.init_app(app)
+
+# Chunked uploads (/api/uploads) let large bundles go past MAX_CONTENT_LENGTH and resume after a disconnect
+app.config['CHUNKED_UPLOAD_CHUNK_SIZE'] = int(os.environ.get('CHUNKED_UPLOAD_CHUNK_SIZE', str(5 * 1024 * 1024)))
+app.config['CHUNKED_UPLOAD_MAX_SIZE'] = int(os.environ.get('CHUNKED_UPLOAD_MAX_SIZE', str(500 * 1024 * 1024)))
+app.config['CHUNKED_UPLOAD_TTL'] = int(os.environ.get('CHUNKED_UPLOAD_TTL', str(24 * 3600)))  # Seconds an idle upload is kept
+app.config['CHUNKED_UPLOAD_DIR'] = os.environ.get('CHUNKED_UPLOAD_DIR', os.path.join(app.instance_path, 'chunks'))  # Never under UPLOAD_FOLDER
+chunked_uploads.init_app(app)
+
+# Downscaled WebP/JPEG copies of uploaded images and PDF first pages, rendered in the background
+app.config['THUMBNAIL_WIDTHS'] = tuple(int(w) for w in os.environ.get('THUMBNAIL_WIDTHS', '320,640,1280').split(','))
+app.config['THUMBNAIL_WORKERS'] = int(os.environ.get('THUMBNAIL_WORKERS', '2'))
+app.config['THUMBNAIL_QUALITY'] = int(os.environ.get('THUMBNAIL_QUALITY', '80'))
+app.config['THUMBNAIL_GHOSTSCRIPT'] = os.environ.get('THUMBNAIL_GHOSTSCRIPT')  # Path to gs; found on PATH if unset
+thumbnails.init_app(app)
+
+# Canteen/place/hostel/event/club photos are turned upright, stripped of metadata, capped and re-encoded
+app.config['PHOTO_MAX_DIMENSION'] = int(os.environ.get('PHOTO_MAX_DIMENSION', '2048'))
+app.config['PHOTO_QUALITY'] = int(os.environ.get('PHOTO_QUALITY', '82'))
+app.config['PHOTO_KEEP_ORIGINAL'] = os.environ.get('PHOTO_KEEP_ORIGINAL', 'false').lower() == 'true'
+app.config['PHOTO_ORIGINALS_DIR'] = os.environ.get('PHOTO_ORIGINALS_DIR', os.path.join(app.instance_path, 'photo_originals'))  # Never under UPLOAD_FOLDER
+photos.init_app(app)
+
+# Vote counters are flushed to the JSON files every few seconds or every N votes
+app.config['VOTE_FLUSH_INTERVAL'] = float(os.environ.get('VOTE_FLUSH_INTERVAL', '2'))
+app.config['VOTE_FLUSH_EVERY'] = int(os.environ.get('VOTE_FLUSH_EVERY', '100'))
+vote_buffer.init_app(app)
+
+# Rows per page on /search, /manage-uploads and /admin/verify-files
+app.config['PAGE_SIZE'] = int(os.environ.get('PAGE_SIZE', '50'))
+
+# Pending reports after which a file is hidden until an admin reviews it
+app.config['REPORT_HIDE_THRESHOLD'] = int(os.environ.get('REPORT_HIDE_THRESHOLD', '3'))
+
+# Seconds a worker trusts its hidden-file set before re-reading reports made elsewhere
+app.config['HIDDEN_FILES_TTL'] = float(os.environ.get('HIDDEN_FILES_TTL', '5'))
+
+# Rendered hierarchy, calculator and syllabus pages; invalidated on uploads, verification, reports and deletes
+app.config['PAGE_CACHE_BACKEND'] = os.environ.get('PAGE_CACHE_BACKEND', 'memory')  # 'memory', 'disk' or 'none'
+app.config['PAGE_CACHE_DIR'] = os.environ.get('PAGE_CACHE_DIR', os.path.join(app.instance_path, 'page_cache'))
+app.config['PAGE_CACHE_SIZE'] = int(os.environ.get('PAGE_CACHE_SIZE', '512'))
+app.config['PAGE_CACHE_TTL'] = float(os.environ.get('PAGE_CACHE_TTL', '60'))
+page_cache.init_app(app)
+
 # Ensure directories exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-def load_community_data():
-    """Load community data from JSON file"""
-    try:
-        if os.path.exists('community.json'):
-            with open('community.json', 'r') as f:
-                return json.load(f)
-        else:
-            return {"discussions": []}
-    except Exception as e:
-        app.logger.error(f"Error loading community data: {str(e)}")
-        return {"discussions": []}
-
-def save_community_data(data):
-    """Save community data to JSON file"""
-    try:
-        with open('community.json', 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        app.logger.error(f"Error saving community data: {str(e)}")
-
-def load_clubs_data():
-    """Load clubs data from JSON file"""
-    try:
-        if os.path.exists('clubs.json'):
-            with open('clubs.json', 'r') as f:
-                return json.load(f)
-        else:
-            return {"clubs": [], "next_id": 1}
-    except Exception as e:
-        app.logger.error(f"Error loading clubs data: {str(e)}")
-        return {"clubs": [], "next_id": 1}
-
-def save_clubs_data(data):
-    """Save clubs data to JSON file"""
-    try:
-        with open('clubs.json', 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        app.logger.error(f"Error saving clubs data: {str(e)}")
-        raise
-
-def load_transportation_data():
-    """Load transportation data from JSON file"""
-    try:
-        if os.path.exists('transportation.json'):
-            with open('transportation.json', 'r') as f:
-                return json.load(f)
-        else:
-            return {"bus_routes": [], "next_id": 1}
-    except Exception as e:
-        app.logger.error(f"Error loading transportation data: {str(e)}")
-        return {"bus_routes": [], "next_id": 1}
-
-def save_transportation_data(data):
-    """Save transportation data to JSON file"""
-    try:
-        with open('transportation.json', 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        app.logger.error(f"Error saving transportation data: {str(e)}")
-        raise
-
-def load_canteen_data():
-    """Load canteen data from JSON file"""
-    try:
-        if os.path.exists('canteen.json'):
-            with open('canteen.json', 'r') as f:
-                return json.load(f)
-        else:
-            return {"canteens": [], "next_id": 1}
-    except Exception as e:
-        app.logger.error(f"Error loading canteen data: {str(e)}")
-        return {"canteens": [], "next_id": 1}
-
-def save_canteen_data(data):
-    """Save canteen data to JSON file"""
-    try:
-        with open('canteen.json', 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        app.logger.error(f"Error saving canteen data: {str(e)}")
-        raise
-
-def load_places_data():
-    """Load places data from JSON file"""
-    try:
-        if os.path.exists('places.json'):
-            with open('places.json', 'r') as f:
-                return json.load(f)
-        else:
-            return {"places": [], "next_id": 1}
-    except Exception as e:
-        app.logger.error(f"Error loading places data: {str(e)}")
-        return {"places": [], "next_id": 1}
-
-def save_places_data(data):
-    """Save places data to JSON file"""
-    try:
-        with open('places.json', 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        app.logger.error(f"Error saving places data: {str(e)}")
-        raise
-
-def load_hostels_data():
-    """Load hostels data from JSON file"""
-    try:
-        if os.path.exists('hostels.json'):
-            with open('hostels.json', 'r') as f:
-                return json.load(f)
-        else:
-            return {"hostels": [], "next_id": 1}
-    except Exception as e:
-        app.logger.error(f"Error loading hostels data: {str(e)}")
-        return {"hostels": [], "next_id": 1}
-
-def save_hostels_data(data):
-    """Save hostels data to JSON file"""
-    try:
-        with open('hostels.json', 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        app.logger.error(f"Error saving hostels data: {str(e)}")
-        raise
-
-def load_events_data():
-    """Load events data from JSON file"""
-    try:
-        if os.path.exists('events.json'):
-            with open('events.json', 'r') as f:
-                return json.load(f)
-        else:
-            return {"events": [], "next_id": 1}
-    except Exception as e:
-        app.logger.error(f"Error loading events data: {str(e)}")
-        return {"events": [], "next_id": 1}
-
-def save_events_data(data):
-    """Save events data to JSON file"""
-    try:
-        with open('events.json', 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        app.logger.error(f"Error saving events data: {str(e)}")
-        raise
-
-def load_data():
-    """Load data from JSON file"""
-    try:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r') as f:
-                return json.load(f)
-        else:
-            # Initialize with sample data
-            data = {
-                "course_types": {
-                    "ug": {
-                        "name": "Under Graduate (UG)",
-                        "departments": {
-                            "cse": {
-                                "name": "Computer Science & Engineering",
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
-                            },
-                            "mech": {
-                                "name": "Mechanical Engineering", 
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
-                            },
-                            "eee": {
-                                "name": "Electrical & Electronics Engineering",
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
-                            },
-                            "ece": {
-                                "name": "Electronics & Communication Engineering",
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
-                            },
-                            "it": {
-                                "name": "Information Technology",
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
-                            },
-                            "chem": {
-                                "name": "Chemical Engineering",
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
-                            },
-                            "civil": {
-                                "name": "Civil Engineering",
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
-                            }
-                        }
+def default_data():
+    """Initial data.json contents: the course hierarchy with no files"""
+    return {
+        "course_types": {
+            "ug": {
+                "name": "Under Graduate (UG)",
+                "departments": {
+                    "cse": {
+                        "name": "Computer Science & Engineering",
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
+                    },
+                    "mech": {
+                        "name": "Mechanical Engineering", 
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
+                    },
+                    "eee": {
+                        "name": "Electrical & Electronics Engineering",
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
+                    },
+                    "ece": {
+                        "name": "Electronics & Communication Engineering",
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
                     },
-                    "pg": {
-                        "name": "Post Graduate (PG)",
-                        "departments": {
-                            "mtech_cse": {
-                                "name": "M.Tech CSE (5-Year)",
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 11)}
-                            },
-                            "me_applied_electronics": {
-                                "name": "M.E Applied Electronics",
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 5)}
-                            },
-                            "me_structural": {
-                                "name": "M.E Structural",
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 5)}
-                            },
-                            "me_ped": {
-                                "name": "M.E PED",
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 5)}
-                            }
-                        }
+                    "it": {
+                        "name": "Information Technology",
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
                     },
-                    "mba": {
-                        "name": "Master of Business Administration (MBA)",
-                        "departments": {
-                            "general_mba": {
-                                "name": "General MBA",
-                                "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 5)}
-                            }
-                        }
+                    "chem": {
+                        "name": "Chemical Engineering",
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
+                    },
+                    "civil": {
+                        "name": "Civil Engineering",
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 9)}
+                    }
+                }
+            },
+            "pg": {
+                "name": "Post Graduate (PG)",
+                "departments": {
+                    "mtech_cse": {
+                        "name": "M.Tech CSE (5-Year)",
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 11)}
+                    },
+                    "me_applied_electronics": {
+                        "name": "M.E Applied Electronics",
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 5)}
+                    },
+                    "me_structural": {
+                        "name": "M.E Structural",
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 5)}
+                    },
+                    "me_ped": {
+                        "name": "M.E PED",
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 5)}
                     }
-                },
-                "files": []
+                }
+            },
+            "mba": {
+                "name": "Master of Business Administration (MBA)",
+                "departments": {
+                    "general_mba": {
+                        "name": "General MBA",
+                        "semesters": {str(i): {"name": f"Semester {i}"} for i in range(1, 5)}
+                    }
+                }
             }
-            save_data(data)
-            return data
-    except Exception as e:
-        app.logger.error(f"Error loading data: {e}")
-        return {"course_types": {}, "files": []}
+        },
+        "files": []
+    }
 
-def save_data(data):
-    """Save data to JSON file"""
-    try:
-        with open(DATA_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        app.logger.error(f"Error saving data: {e}")
+# JSON-backed stores
+data_document = JsonDocument(DATA_FILE, default_data, persist_default=True)
+files_collection = JsonCollection(data_document, 'files')
+syllabus_collection = JsonCollection(data_document, 'syllabus_files')
+discussions_collection = JsonCollection(JsonDocument('community.json', lambda: {"discussions": []}), 'discussions')
+clubs_collection = JsonCollection(JsonDocument('clubs.json', lambda: {"clubs": [], "next_id": 1}), 'clubs', 'next_id')
+bus_routes_collection = JsonCollection(JsonDocument('transportation.json', lambda: {"bus_routes": [], "next_id": 1}), 'bus_routes', 'next_id')
+canteens_collection = JsonCollection(JsonDocument('canteen.json', lambda: {"canteens": [], "next_id": 1}), 'canteens', 'next_id')
+places_collection = JsonCollection(JsonDocument('places.json', lambda: {"places": [], "next_id": 1}), 'places', 'next_id')
+hostels_collection = JsonCollection(JsonDocument('hostels.json', lambda: {"hostels": [], "next_id": 1}), 'hostels', 'next_id')
+events_collection = JsonCollection(JsonDocument('events.json', lambda: {"events": [], "next_id": 1}), 'events', 'next_id')
+reports_document = JsonDocument('reports.json', lambda: {"reports": {}, "report_threshold": 3})  # Hide after 3 reports
+hidden_files = HiddenFileSet(reports_document, app)
+
+# A blob may back several records; it is deleted when the last of them goes.
+# data.json copies of database rows (db_file_id set) are covered by the row itself.
+blob_store.add_reference_counter(lambda path: File.query.filter_by(file_path=path).count())
+blob_store.add_reference_counter(lambda path: sum(
+    1 for record in files_collection.all() if record.get('file_path') == path and not record.get('db_file_id')
+))
+blob_store.add_reference_counter(lambda path: sum(
+    1 for record in syllabus_collection.all() if record.get('file_path') == path
+))
+blob_store.add_delete_listener(thumbnails.discard)
+
+def load_data():
+    """Load the whole data.json document (course hierarchy and file lists)"""
+    return data_document.load()
+
+# Course hierarchy for materials and syllabus pages, built once from data.json
+catalog.init_app(app, lambda: load_data()['course_types'])
 
 def allowed_file(filename):
     """Allow all file types"""
     return True  # Accept all file types
 
-def get_file_size(filepath):
-    """Get human readable file size"""
-    size = os.path.getsize(filepath)
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size < 1024.0:
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
-    return f"{size:.1f} TB"
-
 @app.route('/')
+@page_cache.conditional()
+@page_cache.cached
 def index():
     """Homepage showing main sections: Question Papers and Syllabus"""
     return render_template('index.html')
@@ -749,59 +688,72 @@ def admin_dashboard():
                          recent_users=recent_users)
 
 @app.route('/materials')
+@page_cache.conditional()
+@page_cache.cached
 def materials_home():
     """Materials homepage showing course types for question papers"""
-    data = load_data()
-    return render_template('materials/home.html', course_types=data['course_types'])
+    return render_template('materials/home.html', course_types=catalog.current.course_types)
 
 @app.route('/calculators')
+@page_cache.conditional()
+@page_cache.cached
 def calculators_home():
     """Calculators homepage showing available calculators"""
     return render_template('calculators/home.html')
 
 @app.route('/calculators/gpa')
+@page_cache.conditional()
+@page_cache.cached
 def gpa_calculator():
     """GPA Calculator page"""
     return render_template('calculators/gpa.html')
 
 @app.route('/calculators/cgpa')
+@page_cache.conditional()
+@page_cache.cached
 def cgpa_calculator():
     """CGPA Calculator page"""
     return render_template('calculators/cgpa.html')
 
 @app.route('/calculators/percentage')
+@page_cache.conditional()
+@page_cache.cached
 def percentage_calculator():
     """Percentage Calculator page"""
     return render_template('calculators/percentage.html')
 
 @app.route('/calculators/internal')
+@page_cache.conditional()
+@page_cache.cached
 def internal_calculator():
     """Internal Marks Calculator page"""
     return render_template('calculators/internal.html')
 
 @app.route('/course/<course_type_id>')
+@page_cache.conditional()
+@page_cache.cached
 def course_type(course_type_id):
     """Course type page showing list of departments"""
-    data = load_data()
-    if course_type_id not in data['course_types']:
+    course_data = catalog.current.course_type(course_type_id)
+    if course_data is None:
         flash('Course type not found', 'error')
         return redirect(url_for('index'))
     
-    course_data = data['course_types'][course_type_id]
     return render_template('course_type.html', 
                          course_type=course_data,
                          course_type_id=course_type_id)
 
 @app.route('/department/<course_type_id>/<dept_id>')
+@page_cache.conditional()
+@page_cache.cached
 def department(course_type_id, dept_id):
     """Department page showing list of semesters"""
-    data = load_data()
-    if course_type_id not in data['course_types'] or dept_id not in data['course_types'][course_type_id]['departments']:
+    department_data = catalog.current.department(course_type_id, dept_id)
+    if department_data is None:
         flash('Department not found', 'error')
         return redirect(url_for('index'))
     
-    course_data = data['course_types'][course_type_id]
-    department_data = course_data['departments'][dept_id]
+    course_data = catalog.current.course_type(course_type_id)
     return render_template('department.html', 
                          course_type=course_data,
                          course_type_id=course_type_id,
@@ -809,17 +761,17 @@ def department(course_type_id, dept_id):
                          dept_id=dept_id)
 
 @app.route('/semester/<course_type_id>/<dept_id>/<semester_id>')
+@page_cache.conditional()
+@page_cache.cached
 def semester(course_type_id, dept_id, semester_id):
     """Semester page showing list of categories"""
-    data = load_data()
-    if (course_type_id not in data['course_types'] or 
-        dept_id not in data['course_types'][course_type_id]['departments']):
+    department_data = catalog.current.department(course_type_id, dept_id)
+    if department_data is None:
         flash('Department not found', 'error')
         return redirect(url_for('index'))
     
-    course_data = data['course_types'][course_type_id]
-    department_data = course_data['departments'][dept_id]
-    categories = ['CAT', 'ESE', 'SAT', 'Practical']
+    course_data = catalog.current.course_type(course_type_id)
+    categories = catalog.current.categories
     
     return render_template('semester.html', 
                          course_type=course_data,
@@ -830,26 +782,23 @@ def semester(course_type_id, dept_id, semester_id):
                          categories=categories)
 
 @app.route('/category/<course_type_id>/<dept_id>/<semester_id>/<category>')
+@page_cache.conditional()
 def category_view(course_type_id, dept_id, semester_id, category):
     """Category page showing downloadable files with role-based visibility"""
-    data = load_data()
-    if (course_type_id not in data['course_types'] or 
-        dept_id not in data['course_types'][course_type_id]['departments']):
+    department_data = catalog.current.department(course_type_id, dept_id)
+    if department_data is None:
         flash('Department not found', 'error')
         return redirect(url_for('index'))
     
     try:
         # Query database for files matching this category
-        db_files = File.query.filter_by(
+        visible_files = visible_files_query().options(*File.list_options()).filter_by(
             course_type=course_type_id,
             department=dept_id,
             semester=semester_id,
             category=category.upper()
         ).order_by(File.upload_date.desc()).all()
         
-        # Apply role-based visibility filtering
-        visible_files = [f for f in db_files if is_file_visible_to_user(f)]
-        
         # Convert to dict for template compatibility
         filtered_files = [f.to_dict() for f in visible_files]
         
@@ -857,7 +806,7 @@ def category_view(course_type_id, dept_id, semester_id, category):
         app.logger.error(f"Error querying database for category view: {str(e)}")
         # Fallback to JSON data
         filtered_files = [
-            f for f in data.get('files', []) 
+            f for f in files_collection.all() 
             if f['course_type'].lower() == course_type_id.lower() and
                f['department'].lower() == dept_id.lower() and 
                f['semester'] == semester_id and 
@@ -866,8 +815,7 @@ def category_view(course_type_id, dept_id, semester_id, category):
                not is_file_hidden(f['id'], 'QP')
         ]
     
-    course_data = data['course_types'][course_type_id]
-    department_data = course_data['departments'][dept_id]
+    course_data = catalog.current.course_type(course_type_id)
     
     return render_template('category.html',
                          course_type=course_data,
@@ -884,43 +832,18 @@ def api_search():
     try:
         # Get search parameters
         query = request.args.get('q', '').strip()
-        course_type = request.args.get('course_type', '').strip()
-        department = request.args.get('department', '').strip()
-        semester = request.args.get('semester', '').strip()
-        category = request.args.get('category', '').strip()
-        file_type = request.args.get('file_type', '').strip()
-        
-        # Build database query
-        db_query = File.query
-        
-        # Apply filters
-        if course_type:
-            db_query = db_query.filter(File.course_type.ilike(course_type))
-        if department:
-            db_query = db_query.filter(File.department.ilike(department))
-        if semester:
-            db_query = db_query.filter_by(semester=semester)
-        if category:
-            db_query = db_query.filter(File.category.ilike(category))
-        
-        # Text search on subject_name and custom_filename
-        if query:
-            search_pattern = f'%{query}%'
-            db_query = db_query.filter(
-                db.or_(
-                    File.subject_name.ilike(search_pattern),
-                    File.custom_filename.ilike(search_pattern)
-                )
-            )
         
-        # Execute query
-        all_files = db_query.order_by(File.upload_date.desc()).limit(100).all()
+        # Build database query (role-based visibility is applied in SQL) and apply filters
+        db_query = filter_files_query(visible_files_query(), request.args)
+        
+        # Full-text search over subject, filenames and description, ranked by relevance and recency
+        db_query = search_index.search(db_query, query)
         
-        # Apply role-based visibility filtering
-        visible_files = [f for f in all_files if is_file_visible_to_user(f)]
+        # Execute query
+        visible_files = db_query.options(*File.list_options()).limit(50).all()
         
-        # Convert to dict and limit results
-        results = [f.to_dict() for f in visible_files[:50]]
+        # Convert to dict for the response
+        results = [f.to_dict() for f in visible_files]
         
         return jsonify({
             'success': True,
@@ -946,42 +869,33 @@ def vote_file(file_id):
         if vote_type not in ['like', 'dislike']:
             return jsonify({'success': False, 'error': 'Invalid vote type'}), 400
         
-        data = load_data()
-        files = data.get('files', [])
+        # Database files: one vote row plus an in-place counter increment
+        column = File.likes if vote_type == 'like' else File.dislikes
+        updated = File.query.filter_by(id=file_id).update({column: column + 1}, synchronize_session=False)
+        if updated:
+            db.session.add(FileVote(
+                file_id=file_id,
+                vote_type=vote_type,
+                voter_id=current_user.id if current_user.is_authenticated else None
+            ))
+            db.session.commit()
+            likes, dislikes = db.session.query(File.likes, File.dislikes).filter_by(id=file_id).one()
+            return jsonify({'success': True, 'likes': likes, 'dislikes': dislikes})
         
-        # Find the file
-        found_file = None
-        for file in files:
-            if file['id'] == file_id:
-                found_file = file
-                
-                # Initialize vote counts if not present
-                if 'likes' not in file:
-                    file['likes'] = 0
-                if 'dislikes' not in file:
-                    file['dislikes'] = 0
-                
-                # Increment the vote count
-                if vote_type == 'like':
-                    file['likes'] += 1
-                else:
-                    file['dislikes'] += 1
-                
-                break
+        # Legacy JSON-only files: buffered write-behind; totals include votes not yet flushed to disk
+        totals = vote_buffer.vote(files_collection, file_id, vote_type)
         
-        if not found_file:
+        if not totals:
             return jsonify({'success': False, 'error': 'File not found'}), 404
         
-        # Save updated data
-        save_data(data)
-        
         return jsonify({
             'success': True,
-            'likes': found_file['likes'],
-            'dislikes': found_file['dislikes']
+            'likes': totals['likes'],
+            'dislikes': totals['dislikes']
         })
         
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"Vote error: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -997,41 +911,40 @@ def add_comment(file_id):
         if not name or not comment_text:
             return jsonify({'success': False, 'error': 'Name and comment are required'}), 400
         
-        data = load_data()
+        # Question papers in the database: one comment row plus an in-place counter increment
+        if file_type != 'Syllabus':
+            updated = File.query.filter_by(id=file_id).update(
+                {File.comment_count: File.comment_count + 1}, synchronize_session=False
+            )
+            if updated:
+                comment = FileComment(
+                    file_id=file_id,
+                    name=name,
+                    comment=comment_text,
+                    author_id=current_user.id if current_user.is_authenticated else None
+                )
+                db.session.add(comment)
+                db.session.commit()
+                total_comments = db.session.query(File.comment_count).filter_by(id=file_id).scalar()
+                return jsonify({
+                    'success': True,
+                    'comment': comment.to_dict(),
+                    'total_comments': total_comments
+                })
         
-        # Choose the right file list based on file type
-        if file_type == 'Syllabus':
-            files = data.get('syllabus_files', [])
-        else:
-            files = data.get('files', [])
-        
-        # Find the file
-        found_file = None
-        new_comment = None
-        for file in files:
-            if file['id'] == file_id:
-                found_file = file
-                
-                # Initialize comments if not present
-                if 'comments' not in file:
-                    file['comments'] = []
-                
-                # Add the new comment
-                new_comment = {
-                    'name': name,
-                    'comment': comment_text,
-                    'date': datetime.now().strftime('%Y-%m-%d %H:%M')
-                }
-                file['comments'].append(new_comment)
-                
-                break
+        # Syllabus files and legacy JSON-only files keep their comments in data.json
+        collection = syllabus_collection if file_type == 'Syllabus' else files_collection
+        
+        new_comment = {
+            'name': name,
+            'comment': comment_text,
+            'date': datetime.now().strftime('%Y-%m-%d %H:%M')
+        }
+        found_file = collection.update(file_id, lambda file: file.setdefault('comments', []).append(new_comment))
         
         if not found_file:
             return jsonify({'success': False, 'error': 'File not found'}), 404
         
-        # Save updated data
-        save_data(data)
-        
         return jsonify({
             'success': True,
             'comment': new_comment,
@@ -1039,6 +952,7 @@ def add_comment(file_id):
         })
         
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"Comment error: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1051,65 +965,100 @@ def vote_syllabus_file(file_id):
         if vote_type not in ['like', 'dislike']:
             return jsonify({'success': False, 'error': 'Invalid vote type'}), 400
         
-        data = load_data()
-        files = data.get('syllabus_files', [])
-        
-        # Find the file
-        found_file = None
-        for file in files:
-            if file['id'] == file_id:
-                found_file = file
-                
-                # Initialize vote counts if not present
-                if 'likes' not in file:
-                    file['likes'] = 0
-                if 'dislikes' not in file:
-                    file['dislikes'] = 0
-                
-                # Increment the vote count
-                if vote_type == 'like':
-                    file['likes'] += 1
-                else:
-                    file['dislikes'] += 1
-                
-                break
+        # Buffered write-behind; totals include votes not yet flushed to disk
+        totals = vote_buffer.vote(syllabus_collection, file_id, vote_type)
         
-        if not found_file:
+        if not totals:
             return jsonify({'success': False, 'error': 'File not found'}), 404
         
-        # Save updated data
-        save_data(data)
-        
         return jsonify({
             'success': True,
-            'likes': found_file['likes'],
-            'dislikes': found_file['dislikes']
+            'likes': totals['likes'],
+            'dislikes': totals['dislikes']
         })
         
     except Exception as e:
         app.logger.error(f"Vote error: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def load_reports_data():
-    """Load reports data from JSON file"""
+def can_see_unverified_files():
+    """Admins and contributors see all files; guests and unauthenticated users only verified ones"""
+    # Safely check if user is authenticated
     try:
-        if os.path.exists('reports.json'):
-            with open('reports.json', 'r') as f:
-                return json.load(f)
+        is_authenticated = current_user and current_user.is_authenticated
+    except AttributeError:
+        is_authenticated = False
+    
+    return bool(is_authenticated and (current_user.is_admin or current_user.is_contributor))
+
+def file_page(query):
+    """One keyset page of a File query, driven by the ?cursor= argument"""
+    return paginate_files(query.options(*File.list_options()),
+                          cursor=request.args.get('cursor'),
+                          page_size=app.config['PAGE_SIZE'])
+
+def page_links(page):
+    """Absolute URLs of the newer/older pages of the current listing"""
+    args = request.args.to_dict()
+    links = {}
+    for name, cursor in (('prev', page.prev_cursor), ('next', page.next_cursor)):
+        if cursor:
+            args['cursor'] = cursor
+            links[name] = url_for(request.endpoint, **args)
         else:
-            return {"reports": {}, "report_threshold": 3}  # Hide after 3 reports
-    except Exception as e:
-        app.logger.error(f"Error loading reports data: {str(e)}")
-        return {"reports": {}, "report_threshold": 3}
-
-def save_reports_data(data):
-    """Save reports data to JSON file"""
-    try:
-        with open('reports.json', 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        app.logger.error(f"Error saving reports data: {str(e)}")
-        raise
+            links[name] = None
+    return links
+
+def file_page_json(page, files=None):
+    """JSON form of a listing page (?format=json); files defaults to to_dict() of its rows"""
+    links = page_links(page)
+    if files is None:
+        files = [f.to_dict() for f in page.items]
+    return jsonify({
+        'success': True,
+        'files': files,
+        'count': len(page.items),
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'next': links['next'],
+        'prev': links['prev']
+    })
+
+def visible_files_query(query=None):
+    """Restrict a File query to the files the current user may see, in SQL"""
+    if query is None:
+        query = File.query
+    # Files hidden by reports stay out of every listing until an admin reviews them
+    query = query.filter(File.auto_hidden == False)
+    if not can_see_unverified_files():
+        query = query.filter(File.verified == True)
+    return query
+
+# Search request arguments that narrow a listing to one part of the hierarchy
+SEARCH_FILTERS = ('course_type', 'department', 'semester', 'category')
+
+def search_filters(args):
+    """Non-empty hierarchy filters of a search request, department as its stored key"""
+    filters = {name: args.get(name, '').strip() for name in SEARCH_FILTERS}
+    if filters['department']:
+        filters['department'] = normalize_department(filters['department'])
+    return {name: value for name, value in filters.items() if value}
+
+def filter_files_query(query, args):
+    """Restrict a File query to the hierarchy filters of a search request (case-insensitive)"""
+    for name, value in search_filters(args).items():
+        query = query.filter(getattr(File, name).ilike(value))
+    return query
+
+def file_record_matches(record, args, query_text):
+    """filter_files_query and a substring search over a data.json file record"""
+    for name, value in search_filters(args).items():
+        if str(record.get(name, '')).lower() != value.lower():
+            return False
+    if query_text:
+        text = query_text.lower()
+        return any(text in (record.get(field) or '').lower() for field in ('subject', 'subject_name', 'custom_filename'))
+    return True
 
 def is_file_visible_to_user(file_obj):
     """
@@ -1120,36 +1069,18 @@ def is_file_visible_to_user(file_obj):
     - Contributors: See all files (verified or not)
     - Admins: See all files (verified or not)
     - Unauthenticated users: Only see verified files (treated as guests)
-    """
-    # Safely check if user is authenticated
-    try:
-        is_authenticated = current_user and current_user.is_authenticated
-    except AttributeError:
-        is_authenticated = False
-    
-    if not is_authenticated:
-        # Unauthenticated users only see verified files
-        return file_obj.verified if hasattr(file_obj, 'verified') else file_obj.get('verified', False)
     
-    # Admins and contributors see all files
-    if current_user.is_admin or current_user.is_contributor:
+    Use visible_files_query() when listing files from the database.
+    """
+    if can_see_unverified_files():
         return True
     
-    # Guests only see verified files
     return file_obj.verified if hasattr(file_obj, 'verified') else file_obj.get('verified', False)
 
 def is_file_hidden(file_id, file_type='QP'):
     """Check if a file should be hidden due to reports"""
     try:
-        reports_data = load_reports_data()
-        file_key = f"{file_type}_{file_id}"
-        
-        if file_key in reports_data["reports"]:
-            report_count = len(reports_data["reports"][file_key])
-            threshold = reports_data.get("report_threshold", 3)
-            return report_count >= threshold
-        
-        return False
+        return hidden_files.is_hidden(file_id, file_type)
     except Exception as e:
         app.logger.error(f"Error checking file visibility: {str(e)}")
         return False
@@ -1188,14 +1119,18 @@ def report_file(file_id):
                 status='Pending'
             )
             db.session.add(report)
+            threshold = app.config['REPORT_HIDE_THRESHOLD']
+            File.change_pending_reports(file_id, 1, threshold)
             db.session.commit()
+            hidden_files.invalidate()
+            page_cache.invalidate()
             
             app.logger.info(f"File {file_id} reported by {current_user.email}: {reason}")
             
-            # Count pending reports for this file
-            report_count = Report.query.filter_by(file_id=file_id, status='Pending').count()
-            threshold = 3
-            is_hidden = report_count >= threshold
+            # Counters were updated in the same transaction as the report
+            db.session.refresh(db_file)
+            report_count = db_file.pending_report_count
+            is_hidden = db_file.auto_hidden
             
             response_data = {
                 'success': True,
@@ -1212,28 +1147,28 @@ def report_file(file_id):
             return jsonify(response_data)
         
         # Fallback to JSON-based reporting for anonymous users (legacy support)
-        reports_data = load_reports_data()
         file_key = f"{file_type}_{file_id}"
         
-        if file_key not in reports_data["reports"]:
-            reports_data["reports"][file_key] = []
-        
-        existing_reports = reports_data["reports"][file_key]
-        for report in existing_reports:
-            if report.get("reporter_ip") == reporter_ip:
-                return jsonify({
-                    'success': False, 
-                    'error': 'You have already reported this file'
-                }), 400
-        
-        new_report = {
-            'reason': reason,
-            'reporter_ip': reporter_ip,
-            'timestamp': datetime.utcnow().isoformat(),
-            'user_agent': request.headers.get('User-Agent', '')[:200]
-        }
-        reports_data["reports"][file_key].append(new_report)
-        save_reports_data(reports_data)
+        with reports_document.lock():
+            reports_data = reports_document.load(strict=True)
+            existing_reports = reports_data["reports"].get(file_key, [])
+            for report in existing_reports:
+                if report.get("reporter_ip") == reporter_ip:
+                    return jsonify({
+                        'success': False, 
+                        'error': 'You have already reported this file'
+                    }), 400
+            
+            new_report = {
+                'reason': reason,
+                'reporter_ip': reporter_ip,
+                'timestamp': datetime.utcnow().isoformat(),
+                'user_agent': request.headers.get('User-Agent', '')[:200]
+            }
+            reports_data["reports"].setdefault(file_key, []).append(new_report)
+            reports_document.save(reports_data)
+        hidden_files.invalidate()
+        page_cache.invalidate()
         
         report_count = len(reports_data["reports"][file_key])
         threshold = reports_data.get("report_threshold", 3)
@@ -1276,6 +1211,10 @@ def file_detail(file_id):
             
             # Convert database object to dict for template compatibility
             file_found = db_file.to_dict()
+            file_found['comments'] = [
+                comment.to_dict() for comment in
+                FileComment.query.filter_by(file_id=db_file.id).order_by(FileComment.created_at)
+            ]
             file_type = 'QP'
             
             # Check if the physical file exists
@@ -1286,24 +1225,17 @@ def file_detail(file_id):
         
         # Fallback to JSON for backward compatibility
         if not file_found:
-            data = load_data()
-            
-            # Search in regular files first
-            for file in data.get('files', []):
-                if file['id'] == file_id:
-                    file_found = file
-                    file_type = 'QP'
-                    break
-            
-            # Search in syllabus files if not found
+            # Search in regular files first, then syllabus files
+            file_found = files_collection.get(file_id)
+            file_type = 'QP'
             if not file_found:
-                for file in data.get('syllabus_files', []):
-                    if file['id'] == file_id:
-                        file_found = file
-                        file_type = 'Syllabus'
-                        break
+                file_found = syllabus_collection.get(file_id)
+                file_type = 'Syllabus'
             
             if file_found:
+                # The record is the cached document's own dict; the display defaults below must not end up in it
+                file_found = dict(file_found)
+
                 # Check if file is visible to current user (for JSON files)
                 if not is_file_visible_to_user(file_found):
                     flash('File not available', 'error')
@@ -1366,33 +1298,212 @@ def highlight_search_terms(file, query):
     return highlighted_file
 
 @app.route('/search')
+@page_cache.conditional()
 def search():
-    """Search page for all files with role-based visibility"""
+    """Search page for all files with role-based visibility
+
+    q and the course_type / department / semester / category filters are
+    applied in SQL and carried in the page links.
+    """
+    query_text = request.args.get('q', '').strip()
+    page = None
     try:
-        # Query database for all files
-        db_files = File.query.order_by(File.upload_date.desc()).all()
-        
-        # Apply role-based visibility filtering
-        visible_files = [f for f in db_files if is_file_visible_to_user(f)]
+        # One page of the matching files the current user may see, newest first
+        query = search_index.match(filter_files_query(visible_files_query(), request.args), query_text)
+        page = file_page(query)
+        if request.args.get('format') == 'json':
+            return file_page_json(page)
         
         # Convert to dict for template compatibility
-        all_files = [f.to_dict() for f in visible_files]
+        all_files = [f.to_dict() for f in page.items]
+        total = query.count()
         
     except Exception as e:
         app.logger.error(f"Error querying database for search page: {str(e)}")
-        # Fallback to JSON data
+        db.session.rollback()
+        # Fallback to JSON data, paged the same way
         data = load_data()
-        json_files = data.get('files', [])
-        all_files = [f for f in json_files if is_file_visible_to_user(f)]
+        matches = [f for f in data.get('files', [])
+                   if is_file_visible_to_user(f) and file_record_matches(f, request.args, query_text)]
+        page = paginate_records(matches, cursor=request.args.get('cursor'), page_size=app.config['PAGE_SIZE'])
+        if request.args.get('format') == 'json':
+            return file_page_json(page, page.items)
+        all_files = page.items
+        total = len(matches)
+    
+    filtered = bool(search_filters(request.args))
+    return render_template('search.html', all_files=all_files, page=page, links=page_links(page),
+                           total=total, filtered=filtered, searching=filtered or bool(query_text))
+
+def normalize_course_type(ct):
+    """Upload form course type -> data.json key"""
+    return ct.lower() if ct else ct
+
+def normalize_department(dept):
+    """Upload form department name -> data.json key"""
+    if not dept:
+        return dept
+    
+    # Map frontend department names to data structure keys
+    dept_map = {
+        'CSE': 'cse',
+        'MECH': 'mech', 
+        'EEE': 'eee',
+        'ECE': 'ece',
+        'IT': 'it',
+        'CHEM': 'chem',
+        'CIVIL': 'civil',
+        'M.Tech CSE (5-Year)': 'mtech_cse',
+        'M.E Applied Electronics': 'applied_electronics',
+        'M.E Structural': 'structural',
+        'M.E PED': 'ped',
+        'General MBA': 'general_mba'
+    }
     
-    return render_template('search.html', all_files=all_files)
+    return dept_map.get(dept, dept.lower())
+
+def upload_filename(original_filename, custom_filename=None):
+    """Safe stored name for an upload: the custom name (keeping the original extension) or the original"""
+    if custom_filename:
+        filename = secure_filename(custom_filename)
+        # Add extension if not present
+        if '.' in original_filename:
+            ext = original_filename.rsplit('.', 1)[1].lower()
+            if not filename.endswith('.' + ext):
+                filename += '.' + ext
+    else:
+        filename = secure_filename(original_filename)
+    
+    # Validate filename
+    if not filename or filename == '':
+        raise ValueError("Invalid filename after security processing")
+    return filename
+
+def save_question_paper(ingested, original_filename, custom_filename, course_type, department,
+                        semester, category, subject, description):
+    """Store an ingested upload and create its data.json record and Subject/File rows
+
+    Used by the form upload and the chunked upload API. Returns (file_data, notice);
+    notice tells the uploader when identical content was already on the portal.
+    """
+    filename = upload_filename(original_filename, custom_filename)
+    normalized_course_type = normalize_course_type(course_type)
+    normalized_department = normalize_department(department)
+    notice = None
+    
+    # Store the content once, named by its SHA-256; identical uploads share one blob.
+    # The lock keeps a concurrent delete from removing the blob before our records exist.
+    with blob_store.lock():
+        filepath, created = blob_store.add(ingested, os.path.splitext(filename)[1])
+        if created:
+            thumbnails.schedule(filepath)
+        content_hash = ingested.digest
+        stored_filename = blob_store.filename_for(filepath)
+        
+        duplicate = File.query.filter_by(content_hash=content_hash).first()
+        if duplicate:
+            notice = (f'This file is already on the portal as "{duplicate.custom_filename}". '
+                      'Your upload was added without storing a second copy.')
+        elif not created:
+            notice = 'This file is already on the portal. Your upload was added without storing a second copy.'
+        
+        # Add file metadata to JSON (id is assigned by the collection)
+        file_data = {
+            "filename": stored_filename,
+            "original_filename": original_filename,
+            "custom_filename": custom_filename or filename,
+            "course_type": normalized_course_type,
+            "department": normalized_department,
+            "semester": semester,
+            "category": category,
+            "subject": subject,
+            "description": description,
+            "size": ingested.human_size,
+            "mime_type": ingested.mimetype,
+            "content_hash": content_hash,
+            "upload_date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "file_path": filepath,
+            "likes": 0,
+            "dislikes": 0,
+            "comments": []
+        }
+        
+        # Save to database for role-based visibility
+        try:
+            # Get or create subject
+            db_subject = Subject.query.filter_by(
+                name=subject,
+                course_type=normalized_course_type,
+                department=normalized_department,
+                semester=semester
+            ).first()
+            
+            if not db_subject:
+                # Generate subject code from name (e.g., "UHV" -> "UHV101" or similar)
+                subject_code = subject.upper().replace(' ', '')[:10]
+                subject_code = f"{subject_code}{semester}{category[:3]}"
+                
+                # Ensure uniqueness by checking and appending counter if needed
+                counter = 1
+                base_code = subject_code
+                while Subject.query.filter_by(code=subject_code).first():
+                    subject_code = f"{base_code}_{counter}"
+                    counter += 1
+                
+                db_subject = Subject(
+                    code=subject_code,
+                    name=subject,
+                    course_type=normalized_course_type,
+                    department=normalized_department,
+                    semester=semester,
+                    category=category
+                )
+                db.session.add(db_subject)
+                db.session.flush()  # Get the ID
+            
+            # Create file record with verified=False (visible to contributors/admins only)
+            db_file = File(
+                filename=stored_filename,
+                original_filename=original_filename,
+                custom_filename=custom_filename or filename,
+                course_type=normalized_course_type,
+                department=normalized_department,
+                semester=semester,
+                category=category,
+                subject_id=db_subject.id,
+                subject_name=subject,
+                file_path=filepath,
+                content_hash=content_hash,
+                mime_type=ingested.mimetype,
+                description=description or None,
+                size=ingested.human_size,
+                uploader_id=current_user.id if current_user.is_authenticated else None,
+                uploader_email=current_user.email if current_user.is_authenticated else None,
+                verified=False
+            )
+            db.session.add(db_file)
+            db.session.flush()
+            search_index.index_file(db_file)
+            db.session.commit()
+            file_data["db_file_id"] = db_file.id  # The JSON copy mirrors this row
+            
+            app.logger.info(f"File saved to database with ID {db_file.id}, verified=False")
+            
+        except Exception as db_error:
+            db.session.rollback()
+            app.logger.error(f"Database save error: {str(db_error)}")
+            # Continue even if DB save fails - file is still in JSON
+        
+        files_collection.insert(file_data)
+    page_cache.invalidate()
+    
+    app.logger.info(f"File uploaded successfully: {filename} -> {stored_filename}")
+    return file_data, notice
 
 @app.route('/upload', methods=['GET', 'POST'])
 @contributor_required
 def upload():
     """Upload new files"""
-    data = load_data()
-    
     if request.method == 'POST':
         try:
             # Get form data
@@ -1416,169 +1527,28 @@ def upload():
             
             if file and file.filename and allowed_file(file.filename):
                 try:
-                    # Use custom filename if provided, otherwise use original
-                    if custom_filename:
-                        filename = secure_filename(custom_filename)
-                        # Add extension if not present
-                        if '.' in file.filename:
-                            ext = file.filename.rsplit('.', 1)[1].lower()
-                            if not filename.endswith('.' + ext):
-                                filename += '.' + ext
-                    else:
-                        filename = secure_filename(file.filename)
-                    
-                    # Validate filename
-                    if not filename or filename == '':
-                        raise ValueError("Invalid filename after security processing")
-                    
-                    # Handle duplicate filenames
-                    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    counter = 1
-                    base_name, extension = os.path.splitext(filename)
-                    
-                    while os.path.exists(filepath):
-                        filename = f"{base_name}_{counter}{extension}"
-                        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                        counter += 1
-                    
-                    # Ensure upload directory exists
-                    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                    
-                    # Save the file
-                    file.save(filepath)
-                    
-                    # Verify file was saved
-                    if not os.path.exists(filepath):
-                        raise IOError("File was not saved successfully")
-                    
-                    # Generate unique ID safely
-                    max_id = 0
-                    for existing_file in data.get('files', []):
-                        if existing_file.get('id', 0) > max_id:
-                            max_id = existing_file['id']
-                    new_id = max_id + 1
-                    
-                    # Normalize department and course type to match data structure keys
-                    def normalize_course_type(ct):
-                        return ct.lower() if ct else ct
-                    
-                    def normalize_department(dept, course_type):
-                        if not dept:
-                            return dept
-                        
-                        # Map frontend department names to data structure keys
-                        dept_map = {
-                            'CSE': 'cse',
-                            'MECH': 'mech', 
-                            'EEE': 'eee',
-                            'ECE': 'ece',
-                            'IT': 'it',
-                            'CHEM': 'chem',
-                            'CIVIL': 'civil',
-                            'M.Tech CSE (5-Year)': 'mtech_cse',
-                            'M.E Applied Electronics': 'applied_electronics',
-                            'M.E Structural': 'structural',
-                            'M.E PED': 'ped',
-                            'General MBA': 'general_mba'
-                        }
-                        
-                        return dept_map.get(dept, dept.lower())
-                    
-                    normalized_course_type = normalize_course_type(course_type)
-                    normalized_department = normalize_department(department, course_type)
-                    
-                    # Add file metadata to JSON
-                    file_data = {
-                        "id": new_id,
-                        "filename": filename,
-                        "original_filename": file.filename,
-                        "custom_filename": custom_filename or filename,
-                        "course_type": normalized_course_type,
-                        "department": normalized_department,
-                        "semester": semester,
-                        "category": category,
-                        "subject": subject,
-                        "description": description,
-                        "size": get_file_size(filepath),
-                        "upload_date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        "file_path": filepath,
-                        "likes": 0,
-                        "dislikes": 0,
-                        "comments": []
-                    }
-                    
-                    data['files'].append(file_data)
-                    save_data(data)
+                    upload_filename(file.filename, custom_filename)
                     
-                    # Save to database for role-based visibility
+                    # One pass over the upload: temp file, hash, size and MIME type
+                    ingested = ingest(file, blob_store.root)
                     try:
-                        # Get or create subject
-                        db_subject = Subject.query.filter_by(
-                            name=subject,
-                            course_type=normalized_course_type,
-                            department=normalized_department,
-                            semester=semester
-                        ).first()
-                        
-                        if not db_subject:
-                            # Generate subject code from name (e.g., "UHV" -> "UHV101" or similar)
-                            subject_code = subject.upper().replace(' ', '')[:10]
-                            subject_code = f"{subject_code}{semester}{category[:3]}"
-                            
-                            # Ensure uniqueness by checking and appending counter if needed
-                            counter = 1
-                            base_code = subject_code
-                            while Subject.query.filter_by(code=subject_code).first():
-                                subject_code = f"{base_code}_{counter}"
-                                counter += 1
-                            
-                            db_subject = Subject(
-                                code=subject_code,
-                                name=subject,
-                                course_type=normalized_course_type,
-                                department=normalized_department,
-                                semester=semester,
-                                category=category
-                            )
-                            db.session.add(db_subject)
-                            db.session.flush()  # Get the ID
-                        
-                        # Create file record with verified=False (visible to contributors/admins only)
-                        db_file = File(
-                            filename=filename,
-                            original_filename=file.filename,
-                            custom_filename=custom_filename or filename,
-                            course_type=normalized_course_type,
-                            department=normalized_department,
-                            semester=semester,
-                            category=category,
-                            subject_id=db_subject.id,
-                            subject_name=subject,
-                            file_path=filepath,
-                            size=get_file_size(filepath),
-                            uploader_id=current_user.id if current_user.is_authenticated else None,
-                            uploader_email=current_user.email if current_user.is_authenticated else None,
-                            verified=False
+                        file_data, notice = save_question_paper(
+                            ingested, file.filename, custom_filename, course_type, department,
+                            semester, category, subject, description
                         )
-                        db.session.add(db_file)
-                        db.session.commit()
-                        
-                        app.logger.info(f"File saved to database with ID {db_file.id}, verified=False")
-                        
-                    except Exception as db_error:
-                        db.session.rollback()
-                        app.logger.error(f"Database save error: {str(db_error)}")
-                        # Continue even if DB save fails - file is still in JSON
+                    finally:
+                        ingested.discard()
                     
-                    app.logger.info(f"File uploaded successfully: {filename}")
+                    if notice:
+                        flash(notice, 'info')
                     try:
                         flash('File uploaded successfully!', 'success')
                     except:
                         app.logger.error("Could not flash success message")
                     
                     return redirect(url_for('category_view', 
-                                  course_type_id=normalized_course_type,
-                                  dept_id=normalized_department, 
+                                  course_type_id=file_data['course_type'],
+                                  dept_id=file_data['department'], 
                                   semester_id=semester, 
                                   category=category))
                 
@@ -1598,36 +1568,140 @@ def upload():
             except:
                 app.logger.error("Failed to display error message to user")
     
-    return render_template('upload.html', course_types=data['course_types'])
+    return render_template('upload.html', course_types=catalog.current.course_types)
+
+@app.route('/api/uploads', methods=['POST'])
+@contributor_required
+def start_chunked_upload():
+    """Start a chunked upload; the body carries the same fields as the upload form"""
+    try:
+        data = request.get_json(silent=True) or {}
+        original_filename = data.get('original_filename', '')
+        custom_filename = data.get('filename')
+        
+        if not original_filename or not allowed_file(original_filename):
+            return jsonify({'success': False, 'error': 'File type not allowed'}), 400
+        missing = [field for field in ('course_type', 'department', 'semester', 'category', 'subject') if not data.get(field)]
+        if missing:
+            return jsonify({'success': False, 'error': f"Missing fields: {', '.join(missing)}"}), 400
+        upload_filename(original_filename, custom_filename)
+        
+        metadata = {
+            'custom_filename': custom_filename,
+            'course_type': data['course_type'],
+            'department': data['department'],
+            'semester': data['semester'],
+            'category': data['category'],
+            'subject': data['subject'],
+            'description': (data.get('description') or '').strip()
+        }
+        manifest = chunked_uploads.create(current_user.id, original_filename, data.get('size'), metadata)
+        return jsonify({'success': True, **chunked_uploads.status(manifest)}), 201
+        
+    except (ChunkedUploadError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error starting chunked upload: {str(e)}")
+        return jsonify({'success': False, 'error': 'Could not start upload'}), 500
+
+@app.route('/api/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+@contributor_required
+def put_upload_chunk(upload_id, index):
+    """Store one chunk; the X-Chunk-SHA256 header must match its content"""
+    try:
+        manifest = chunked_uploads.write_chunk(
+            upload_id, current_user.id, index, request.stream, request.headers.get('X-Chunk-SHA256')
+        )
+        return jsonify({'success': True, **chunked_uploads.status(manifest)})
+    except ChunkedUploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error storing chunk {index} of upload {upload_id}: {str(e)}")
+        return jsonify({'success': False, 'error': 'Could not store chunk'}), 500
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+@contributor_required
+def chunked_upload_status(upload_id):
+    """Which chunks have arrived, so an interrupted client can resume"""
+    try:
+        manifest = chunked_uploads.get(upload_id, current_user.id)
+        return jsonify({'success': True, **chunked_uploads.status(manifest)})
+    except ChunkedUploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        app.logger.error(f"Error reading upload {upload_id}: {str(e)}")
+        return jsonify({'success': False, 'error': 'Could not read upload'}), 500
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+@contributor_required
+def finalize_chunked_upload(upload_id):
+    """Assemble a complete upload and add it like a form upload"""
+    try:
+        expected = ((request.get_json(silent=True) or {}).get('sha256') or '').strip().lower()
+        
+        # Held until the File exists, so a repeated finalize cannot add it twice
+        with chunked_uploads.finalizing(upload_id, current_user.id) as (manifest, ingested):
+            if expected and expected != ingested.digest:
+                raise ChunkedUploadError('File checksum does not match')
+            
+            metadata = manifest['metadata']
+            # data.part is moved into the blob store (or dropped if the content is already there)
+            file_data, notice = save_question_paper(
+                ingested, manifest['filename'], metadata['custom_filename'], metadata['course_type'],
+                metadata['department'], metadata['semester'], metadata['category'],
+                metadata['subject'], metadata['description']
+            )
+        
+        return jsonify({
+            'success': True,
+            'message': 'File uploaded successfully!',
+            'notice': notice,
+            'file_id': file_data.get('db_file_id'),
+            'redirect': url_for('category_view',
+                                course_type_id=file_data['course_type'],
+                                dept_id=file_data['department'],
+                                semester_id=file_data['semester'],
+                                category=file_data['category'])
+        })
+        
+    except ChunkedUploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error finalizing upload {upload_id}: {str(e)}")
+        return jsonify({'success': False, 'error': 'Could not finalize upload'}), 500
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+@contributor_required
+def cancel_chunked_upload(upload_id):
+    """Abandon an upload and drop its chunks"""
+    try:
+        chunked_uploads.cancel(upload_id, current_user.id)
+        return jsonify({'success': True})
+    except ChunkedUploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        app.logger.error(f"Error cancelling upload {upload_id}: {str(e)}")
+        return jsonify({'success': False, 'error': 'Could not cancel upload'}), 500
 
 @app.route('/delete/<int:file_id>', methods=['POST', 'GET'])
 @contributor_required
 def delete_file(file_id):
     """Delete a file"""
     try:
-        data = load_data()
-        file_data = None
-        
-        # Find the file
-        for file_info in data.get('files', []):
-            if file_info.get('id') == file_id:
-                file_data = file_info
-                break
+        file_data = files_collection.get(file_id)
         
         if not file_data:
             flash('File not found', 'error')
             return redirect(url_for('index'))
         
-        # Delete physical file
+        # Remove from data.json, then the physical file unless another record shares it
+        files_collection.delete(file_id)
+        page_cache.invalidate()
+        
         file_path = file_data.get('file_path')
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
+        if blob_store.release(file_path):
             app.logger.info(f"Physical file deleted: {file_path}")
         
-        # Remove from data.json
-        data['files'] = [f for f in data['files'] if f.get('id') != file_id]
-        save_data(data)
-        
         flash('File deleted successfully!', 'success')
         app.logger.info(f"File deleted successfully: {file_data.get('custom_filename', 'Unknown')}")
         
@@ -1658,20 +1732,14 @@ def download(file_id):
             
             filepath = db_file.file_path
             if os.path.exists(filepath) and os.path.isfile(filepath):
-                return send_file(filepath, as_attachment=True, download_name=db_file.custom_filename)
+                return serve_file(filepath, as_attachment=True, download_name=db_file.custom_filename, mimetype=db_file.mime_type)
             else:
                 app.logger.error(f"Database file not found on disk: {filepath}")
                 flash('File not found on disk', 'error')
                 return redirect(url_for('index'))
         
         # Fallback to JSON for backward compatibility
-        data = load_data()
-        file_data = None
-        
-        for f in data['files']:
-            if f['id'] == file_id:
-                file_data = f
-                break
+        file_data = files_collection.get(file_id)
         
         if not file_data:
             flash('File not found', 'error')
@@ -1684,7 +1752,7 @@ def download(file_id):
         
         filepath = file_data['file_path']
         if os.path.exists(filepath) and os.path.isfile(filepath):
-            return send_file(filepath, as_attachment=True, download_name=file_data['custom_filename'])
+            return serve_file(filepath, as_attachment=True, download_name=file_data['custom_filename'], mimetype=file_data.get('mime_type'))
         else:
             flash('File not found on disk', 'error')
             return redirect(url_for('index'))
@@ -1696,170 +1764,63 @@ def download(file_id):
 
 # Syllabus Routes
 @app.route('/syllabus')
+@page_cache.conditional()
+@page_cache.cached
 def syllabus_home():
     """Syllabus homepage showing course types"""
-    course_types = {
-        'ug': {
-            'name': 'Under Graduate (UG)',
-            'icon': 'fas fa-user-graduate',
-            'color': 'primary'
-        },
-        'pg': {
-            'name': 'Post Graduate (PG)', 
-            'icon': 'fas fa-graduation-cap',
-            'color': 'success'
-        },
-        'mba': {
-            'name': 'Master of Business Administration (MBA)',
-            'icon': 'fas fa-briefcase',
-            'color': 'warning'
-        }
-    }
-    return render_template('syllabus/home.html', course_types=course_types)
+    return render_template('syllabus/home.html', course_types=catalog.current.syllabus_course_types)
 
 @app.route('/syllabus/<course_type>')
+@page_cache.conditional()
+@page_cache.cached
 def syllabus_course_type(course_type):
     """Syllabus course type page showing departments"""
-    departments = {
-        'ug': {
-            'name': 'Under Graduate (UG)',
-            'departments': {
-                'cse': 'Computer Science & Engineering',
-                'mech': 'Mechanical Engineering',
-                'eee': 'Electrical & Electronics Engineering',
-                'ece': 'Electronics & Communication Engineering',
-                'it': 'Information Technology',
-                'chem': 'Chemical Engineering',
-                'civil': 'Civil Engineering'
-            }
-        },
-        'pg': {
-            'name': 'Post Graduate (PG)',
-            'departments': {
-                'mtech_cse_5yr': 'M.Tech CSE (5-Year)',
-                'me_applied_electronics': 'M.E Applied Electronics',
-                'me_structural': 'M.E Structural',
-                'me_ped': 'M.E PED'
-            }
-        },
-        'mba': {
-            'name': 'Master of Business Administration (MBA)',
-            'departments': {
-                'general_mba': 'General MBA'
-            }
-        }
-    }
-    
-    if course_type not in departments:
+    course_data = catalog.current.syllabus_course_type(course_type)
+    if course_data is None:
         flash('Course type not found', 'error')
         return redirect(url_for('syllabus_home'))
     
-    course_data = departments[course_type]
     return render_template('syllabus/course_type.html', 
                          course_type=course_data,
                          course_type_id=course_type)
 
 @app.route('/syllabus/<course_type>/<dept_id>')
+@page_cache.conditional()
+@page_cache.cached
 def syllabus_department(course_type, dept_id):
     """Syllabus department page showing regulations"""
-    regulations = ['2017', '2023', '2025']
-    
-    departments = {
-        'ug': {
-            'name': 'Under Graduate (UG)',
-            'departments': {
-                'cse': 'Computer Science & Engineering',
-                'mech': 'Mechanical Engineering',
-                'eee': 'Electrical & Electronics Engineering',
-                'ece': 'Electronics & Communication Engineering',
-                'it': 'Information Technology',
-                'chem': 'Chemical Engineering',
-                'civil': 'Civil Engineering'
-            }
-        },
-        'pg': {
-            'name': 'Post Graduate (PG)',
-            'departments': {
-                'mtech_cse_5yr': 'M.Tech CSE (5-Year)',
-                'me_applied_electronics': 'M.E Applied Electronics',
-                'me_structural': 'M.E Structural',
-                'me_ped': 'M.E PED'
-            }
-        },
-        'mba': {
-            'name': 'Master of Business Administration (MBA)',
-            'departments': {
-                'general_mba': 'General MBA'
-            }
-        }
-    }
-    
-    if course_type not in departments or dept_id not in departments[course_type]['departments']:
+    dept_name = catalog.current.syllabus_department(course_type, dept_id)
+    if dept_name is None:
         flash('Department not found', 'error')
         return redirect(url_for('syllabus_home'))
     
-    course_data = departments[course_type]
-    dept_name = departments[course_type]['departments'][dept_id]
-    
     return render_template('syllabus/department.html',
-                         course_type=course_data,
+                         course_type=catalog.current.syllabus_course_type(course_type),
                          course_type_id=course_type,
                          dept_name=dept_name,
                          dept_id=dept_id,
-                         regulations=regulations)
+                         regulations=catalog.current.regulations)
 
 @app.route('/syllabus/<course_type>/<dept_id>/<regulation>')
+@page_cache.conditional()
+@page_cache.cached
 def syllabus_regulation(course_type, dept_id, regulation):
     """Syllabus regulation page showing files and upload"""
-    data = load_data()
+    dept_name = catalog.current.syllabus_department(course_type, dept_id)
+    if dept_name is None:
+        flash('Department not found', 'error')
+        return redirect(url_for('syllabus_home'))
     
     # Filter syllabus files for this specific regulation
     syllabus_files = []
-    for file_data in data.get('syllabus_files', []):
+    for file_data in syllabus_collection.all():
         if (file_data['course_type'] == course_type and 
             file_data['department'] == dept_id and 
             file_data['regulation'] == regulation):
             syllabus_files.append(file_data)
     
-    departments = {
-        'ug': {
-            'name': 'Under Graduate (UG)',
-            'departments': {
-                'cse': 'Computer Science & Engineering',
-                'mech': 'Mechanical Engineering',
-                'eee': 'Electrical & Electronics Engineering',
-                'ece': 'Electronics & Communication Engineering',
-                'it': 'Information Technology',
-                'chem': 'Chemical Engineering',
-                'civil': 'Civil Engineering'
-            }
-        },
-        'pg': {
-            'name': 'Post Graduate (PG)',
-            'departments': {
-                'mtech_cse_5yr': 'M.Tech CSE (5-Year)',
-                'me_applied_electronics': 'M.E Applied Electronics',
-                'me_structural': 'M.E Structural',
-                'me_ped': 'M.E PED'
-            }
-        },
-        'mba': {
-            'name': 'Master of Business Administration (MBA)',
-            'departments': {
-                'general_mba': 'General MBA'
-            }
-        }
-    }
-    
-    if course_type not in departments or dept_id not in departments[course_type]['departments']:
-        flash('Department not found', 'error')
-        return redirect(url_for('syllabus_home'))
-    
-    course_data = departments[course_type]
-    dept_name = departments[course_type]['departments'][dept_id]
-    
     return render_template('syllabus/regulation.html',
-                         course_type=course_data,
+                         course_type=catalog.current.syllabus_course_type(course_type),
                          course_type_id=course_type,
                          dept_name=dept_name,
                          dept_id=dept_id,
@@ -1881,11 +1842,6 @@ def upload_syllabus(course_type, dept_id, regulation):
         
         if file and file.filename and allowed_file(file.filename):
             try:
-                # Load existing data
-                data = load_data()
-                if 'syllabus_files' not in data:
-                    data['syllabus_files'] = []
-                
                 # Generate unique filename
                 original_filename = file.filename
                 filename = secure_filename(original_filename)
@@ -1894,57 +1850,46 @@ def upload_syllabus(course_type, dept_id, regulation):
                 if not filename or filename == '':
                     raise ValueError("Invalid filename after security processing")
                 
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                unique_filename = f"syllabus_{timestamp}_{filename}"
-                filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-                
-                # Ensure upload directory exists
-                os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                
-                # Save file
-                file.save(filepath)
-                
-                # Verify file was saved
-                if not os.path.exists(filepath):
-                    raise IOError("Syllabus file was not saved successfully")
-                
-                # Get file info
-                file_size = os.path.getsize(filepath)
-                file_extension = filename.rsplit('.', 1)[1].lower()
-                
-                # Generate unique ID safely
-                max_id = 0
-                for existing_file in data.get('syllabus_files', []):
-                    if existing_file.get('id', 0) > max_id:
-                        max_id = existing_file['id']
-                new_id = max_id + 1
-                
-                # Add to data
-                # Get form data for syllabus
-                custom_filename = request.form.get('custom_filename', '').strip()
-                description = request.form.get('description', '').strip()
-                
-                file_info = {
-                    'id': new_id,
-                    'filename': unique_filename,
-                    'original_filename': original_filename,
-                    'custom_filename': custom_filename or original_filename,
-                    'file_size': file_size,
-                    'file_extension': file_extension,
-                    'course_type': course_type,
-                    'department': dept_id,
-                    'regulation': regulation,
-                    'description': description,
-                    'size': f"{file_size / (1024*1024):.1f} MB" if file_size > 1024*1024 else f"{file_size / 1024:.1f} KB",
-                    'upload_date': datetime.now().isoformat(),
-                    'file_path': filepath,
-                    'likes': 0,
-                    'dislikes': 0,
-                    'comments': []
-                }
-                
-                data['syllabus_files'].append(file_info)
-                save_data(data)
+                # Identical files share one blob; the lock keeps it alive until our record exists
+                with blob_store.lock():
+                    filepath, ingested, created = blob_store.store(file, os.path.splitext(filename)[1])
+                    unique_filename = blob_store.filename_for(filepath)
+                    if created:
+                        thumbnails.schedule(filepath)
+                    else:
+                        flash('This file is already on the portal. Your upload was added without storing a second copy.', 'info')
+                    
+                    # Get file info
+                    file_size = ingested.size
+                    file_extension = filename.rsplit('.', 1)[1].lower()
+                    
+                    # Add to data
+                    # Get form data for syllabus
+                    custom_filename = request.form.get('custom_filename', '').strip()
+                    description = request.form.get('description', '').strip()
+                    
+                    file_info = {
+                        'filename': unique_filename,
+                        'original_filename': original_filename,
+                        'custom_filename': custom_filename or original_filename,
+                        'file_size': file_size,
+                        'file_extension': file_extension,
+                        'course_type': course_type,
+                        'department': dept_id,
+                        'regulation': regulation,
+                        'description': description,
+                        'size': f"{file_size / (1024*1024):.1f} MB" if file_size > 1024*1024 else f"{file_size / 1024:.1f} KB",
+                        'upload_date': datetime.now().isoformat(),
+                        'file_path': filepath,
+                        'content_hash': ingested.digest,
+                        'mime_type': ingested.mimetype,
+                        'likes': 0,
+                        'dislikes': 0,
+                        'comments': []
+                    }
+                    
+                    syllabus_collection.insert(file_info)
+                page_cache.invalidate()
                 
                 app.logger.info(f"Syllabus uploaded successfully: {original_filename}")
                 try:
@@ -1974,13 +1919,7 @@ def upload_syllabus(course_type, dept_id, regulation):
 def download_syllabus(file_id):
     """Download syllabus file"""
     try:
-        data = load_data()
-        file_data = None
-        
-        for f in data.get('syllabus_files', []):
-            if f['id'] == file_id:
-                file_data = f
-                break
+        file_data = syllabus_collection.get(file_id)
         
         if not file_data:
             flash('File not found', 'error')
@@ -1988,7 +1927,7 @@ def download_syllabus(file_id):
         
         filepath = file_data['file_path']
         if os.path.exists(filepath) and os.path.isfile(filepath):
-            return send_file(filepath, as_attachment=True, download_name=file_data['original_filename'])
+            return serve_file(filepath, as_attachment=True, download_name=file_data['original_filename'], mimetype=file_data.get('mime_type'))
         else:
             flash('File not found on disk', 'error')
             return redirect(url_for('syllabus_home'))
@@ -2002,30 +1941,16 @@ def download_syllabus(file_id):
 def delete_syllabus(file_id):
     """Delete syllabus file"""
     try:
-        data = load_data()
-        file_data = None
-        file_index = -1
-        
-        for i, f in enumerate(data.get('syllabus_files', [])):
-            if f['id'] == file_id:
-                file_data = f
-                file_index = i
-                break
+        file_data = syllabus_collection.get(file_id)
         
         if not file_data:
             flash('File not found', 'error')
             return redirect(url_for('syllabus_home'))
         
-        # Delete physical file
-        filepath = file_data['file_path']
-        if os.path.exists(filepath) and os.path.isfile(filepath):
-            os.remove(filepath)
-        
-        # Remove from JSON data
-        if 'syllabus_files' not in data:
-            data['syllabus_files'] = []
-        data['syllabus_files'].pop(file_index)
-        save_data(data)
+        # Remove from JSON data, then the physical file unless another record shares it
+        syllabus_collection.delete(file_id)
+        page_cache.invalidate()
+        blob_store.release(file_data['file_path'])
         
         flash('Syllabus deleted successfully', 'success')
         return redirect(url_for('syllabus_regulation',
@@ -2049,12 +1974,18 @@ def page_not_found(error):
     """Handle 404 errors"""
     return redirect(url_for('index'))
 
+def is_public_upload_path(filename):
+    """True if filename may be served from the uploads folder"""
+    if '..' in filename or filename.startswith('/'):
+        return False
+    return not any(segment.startswith('.') for segment in filename.split('/'))
+
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
     """Serve uploaded files securely"""
     try:
-        # Security check: ensure filename doesn't contain path traversal
-        if '..' in filename or filename.startswith('/'):
+        # Security check: no path traversal, and nothing from hidden folders (.thumbs, temp files)
+        if not is_public_upload_path(filename):
             app.logger.warning(f"Invalid file path attempted: {filename}")
             return "Invalid file path", 400
         
@@ -2076,17 +2007,70 @@ def uploaded_file(filename):
             app.logger.warning(f"File path outside uploads directory: {file_path}")
             return "Invalid file path", 400
             
-        return send_from_directory(os.path.abspath(UPLOAD_FOLDER), filename, as_attachment=False)
+        return serve_file(file_path)
     except Exception as e:
         app.logger.error(f"Error serving file {filename}: {str(e)}")
         return f"Error serving file: {str(e)}", 500
 
+@app.route('/thumbnails/<int:width>/<path:filename>')
+def thumbnail(width, filename):
+    """Downscaled copy of an uploaded image, or the first page of a PDF"""
+    try:
+        # Same rules as /uploads/<path:filename>
+        if not is_public_upload_path(filename):
+            app.logger.warning(f"Invalid file path attempted: {filename}")
+            return "Invalid file path", 400
+        if width not in thumbnails.widths:
+            return "Unknown thumbnail size", 404
+        
+        file_path = os.path.join(os.path.abspath(UPLOAD_FOLDER), filename)
+        if not file_path.startswith(os.path.abspath(UPLOAD_FOLDER)):
+            app.logger.warning(f"File path outside uploads directory: {file_path}")
+            return "Invalid file path", 400
+        if not os.path.isfile(file_path):
+            return "File not found", 404
+        
+        fmt = 'webp' if 'image/webp' in request.accept_mimetypes.values() else 'jpeg'
+        thumbnail_path = thumbnails.get(file_path, width, fmt)
+        if thumbnail_path:
+            response = serve_file(thumbnail_path, mimetype=thumbnails.mimetype(fmt))
+        elif thumbnails.is_image(file_path):
+            # Not rendered yet (now scheduled); the original still shows the picture
+            response = serve_file(file_path)
+        elif thumbnails.rendering(file_path):
+            response = make_response("Preview is being rendered", 202)
+            response.headers['Retry-After'] = '2'
+            return response
+        else:
+            return "No preview available", 404
+        response.vary.add('Accept')
+        return response
+    except Exception as e:
+        app.logger.error(f"Error serving thumbnail of {filename}: {str(e)}")
+        return f"Error serving file: {str(e)}", 500
+
+@app.template_global()
+def thumbnail_url(filename, width=640):
+    """URL of a thumbnail for a file under the uploads folder, at the nearest configured width"""
+    width = next((w for w in thumbnails.widths if w >= width), thumbnails.widths[-1])
+    return url_for('thumbnail', width=width, filename=filename)
+
+@app.template_global()
+def thumbnail_srcset(filename):
+    """srcset attribute value listing every thumbnail width"""
+    return ', '.join(f"{thumbnail_url(filename, width)} {width}w" for width in thumbnails.widths)
+
+@app.template_global()
+def has_preview(filename):
+    """True if a thumbnail can be made for a file under the uploads folder"""
+    return thumbnails.previewable(filename)
+
 @app.route('/community')
+@page_cache.conditional(discussions_collection.version)
 def community():
     """Community discussion page"""
     try:
-        community_data = load_community_data()
-        discussions = community_data.get('discussions', [])
+        discussions = discussions_collection.all()
         
         # Get sorting parameter
         sort_by = request.args.get('sort', 'latest')
@@ -2117,18 +2101,8 @@ def create_discussion():
         if not title or not description:
             return jsonify({'success': False, 'error': 'Title and description are required'}), 400
         
-        community_data = load_community_data()
-        
-        # Generate unique ID
-        max_id = 0
-        for discussion in community_data.get('discussions', []):
-            if discussion.get('id', 0) > max_id:
-                max_id = discussion['id']
-        new_id = max_id + 1
-        
-        # Create new discussion
+        # Create new discussion (id is assigned by the collection)
         new_discussion = {
-            'id': new_id,
             'name': name,
             'title': title,
             'description': description,
@@ -2138,8 +2112,7 @@ def create_discussion():
             'replies': []
         }
         
-        community_data['discussions'].insert(0, new_discussion)  # Add to beginning
-        save_community_data(community_data)
+        discussions_collection.insert(new_discussion, first=True)  # Add to beginning
         
         return jsonify({'success': True, 'discussion': new_discussion})
         
@@ -2159,39 +2132,20 @@ def add_discussion_reply():
         if not discussion_id or not message:
             return jsonify({'success': False, 'error': 'Discussion ID and message are required'}), 400
         
-        community_data = load_community_data()
-        
-        # Find the discussion
-        discussion_found = False
-        for discussion in community_data.get('discussions', []):
-            if discussion['id'] == discussion_id:
-                discussion_found = True
-                
-                # Initialize replies if not present
-                if 'replies' not in discussion:
-                    discussion['replies'] = []
-                
-                # Generate unique reply ID within discussion
-                reply_id = len(discussion['replies']) + 1
-                
-                # Add new reply
-                new_reply = {
-                    'id': reply_id,
-                    'name': name,
-                    'message': message,
-                    'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'likes': 0,
-                    'dislikes': 0
-                }
-                
-                discussion['replies'].append(new_reply)
-                break
+        def append_reply(discussion):
+            replies = discussion.setdefault('replies', [])
+            replies.append({
+                'id': len(replies) + 1,  # Unique reply ID within discussion
+                'name': name,
+                'message': message,
+                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'likes': 0,
+                'dislikes': 0
+            })
         
-        if not discussion_found:
+        if not discussions_collection.update(discussion_id, append_reply):
             return jsonify({'success': False, 'error': 'Discussion not found'}), 404
         
-        save_community_data(community_data)
-        
         return jsonify({'success': True})
         
     except Exception as e:
@@ -2208,36 +2162,9 @@ def vote_reply(discussion_id, reply_id):
         if vote_type not in ['like', 'dislike']:
             return jsonify({'success': False, 'error': 'Invalid vote type'}), 400
         
-        community_data = load_community_data()
-        
-        # Find the discussion and reply
-        reply_found = False
-        for discussion in community_data.get('discussions', []):
-            if discussion['id'] == discussion_id:
-                for reply in discussion.get('replies', []):
-                    if reply['id'] == reply_id:
-                        reply_found = True
-                        
-                        # Initialize vote counts if not present
-                        if 'likes' not in reply:
-                            reply['likes'] = 0
-                        if 'dislikes' not in reply:
-                            reply['dislikes'] = 0
-                        
-                        # Update vote count
-                        if vote_type == 'like':
-                            reply['likes'] += 1
-                        else:  # dislike
-                            reply['dislikes'] += 1
-                        
-                        break
-                break
-        
-        if not reply_found:
+        if not vote_buffer.vote(discussions_collection, discussion_id, vote_type, reply_id=reply_id):
             return jsonify({'success': False, 'error': 'Reply not found'}), 404
         
-        save_community_data(community_data)
-        
         return jsonify({'success': True})
         
     except Exception as e:
@@ -2245,10 +2172,10 @@ def vote_reply(discussion_id, reply_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/clubs')
+@page_cache.conditional(clubs_collection.version)
 def clubs():
     """Student Clubs page"""
-    clubs_data = load_clubs_data()
-    return render_template('clubs.html', clubs=clubs_data.get('clubs', []))
+    return render_template('clubs.html', clubs=clubs_collection.all())
 
 @app.route('/clubs/add')
 def add_club():
@@ -2293,14 +2220,11 @@ def add_club_post():
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
                 screenshot_filename = timestamp + filename
                 file_path = os.path.join(clubs_upload_dir, screenshot_filename)
-                file.save(file_path)
-        
-        # Load existing clubs data
-        clubs_data = load_clubs_data()
+                photos.save(file, file_path)
+                thumbnails.schedule(file_path)
         
-        # Create new club entry
+        # Create new club entry (id is assigned by the collection)
         new_club = {
-            'id': clubs_data.get('next_id', 1),
             'name': club_name,
             'description': description if description else None,
             'instagram_link': instagram_link if instagram_link else None,
@@ -2309,12 +2233,8 @@ def add_club_post():
             'created_at': datetime.now().isoformat()
         }
         
-        # Add to clubs list and update next_id
-        clubs_data['clubs'].append(new_club)
-        clubs_data['next_id'] = clubs_data.get('next_id', 1) + 1
-        
-        # Save to file
-        save_clubs_data(clubs_data)
+        # Add to clubs list and save
+        clubs_collection.insert(new_club)
         
         flash(f'Club "{club_name}" added successfully!', 'success')
         return redirect(url_for('clubs'))
@@ -2348,7 +2268,7 @@ def club_screenshot(filename):
             app.logger.warning(f"File path outside clubs directory: {file_path_abs}")
             return "Invalid file path", 400
             
-        return send_from_directory(clubs_dir_abs, filename, as_attachment=False)
+        return serve_file(file_path_abs)
     except Exception as e:
         app.logger.error(f"Error serving club screenshot {filename}: {str(e)}")
         return f"Error serving file: {str(e)}", 500
@@ -2358,19 +2278,10 @@ def club_screenshot(filename):
 def delete_club(club_id):
     """Delete a club (admin only)"""
     try:
-        clubs_data = load_clubs_data()
-        clubs = clubs_data.get('clubs', [])
-        
         # Find and remove the club
-        club_found = False
-        club_to_delete = None
-        for i, club in enumerate(clubs):
-            if club['id'] == club_id:
-                club_to_delete = clubs.pop(i)
-                club_found = True
-                break
-        
-        if not club_found:
+        club_to_delete = clubs_collection.delete(club_id)
+        
+        if not club_to_delete:
             return jsonify({'success': False, 'error': 'Club not found'}), 404
         
         # Delete screenshot file if exists
@@ -2379,12 +2290,11 @@ def delete_club(club_id):
             if os.path.exists(screenshot_path):
                 try:
                     os.remove(screenshot_path)
+                    thumbnails.discard(screenshot_path)
+                    photos.discard(screenshot_path)
                 except Exception as e:
                     app.logger.warning(f"Could not delete screenshot file: {str(e)}")
         
-        # Save updated data
-        save_clubs_data(clubs_data)
-        
         return jsonify({'success': True})
         
     except Exception as e:
@@ -2393,11 +2303,11 @@ def delete_club(club_id):
 
 # Bus Routes Routes
 @app.route('/bus-routes')
+@page_cache.conditional(bus_routes_collection.version)
 def bus_routes():
     """Bus Routes page showing all uploaded routes"""
     try:
-        data = load_transportation_data()
-        bus_routes = data.get('bus_routes', [])
+        bus_routes = bus_routes_collection.all()
         
         # Sort by upload date (newest first)
         bus_routes = sorted(bus_routes, key=lambda x: x.get('upload_date', ''), reverse=True)
@@ -2436,9 +2346,6 @@ def upload_bus_route():
             return redirect(url_for('bus_routes'))
         
         if file and file.filename and allowed_file(file.filename):
-            # Load existing data
-            data = load_transportation_data()
-            
             # Generate unique filename
             original_filename = file.filename
             filename = secure_filename(original_filename)
@@ -2455,24 +2362,20 @@ def upload_bus_route():
             
             filepath = os.path.join(bus_routes_dir, unique_filename)
             
-            # Save file
-            file.save(filepath)
-            
-            # Verify file was saved
-            if not os.path.exists(filepath):
-                raise IOError("File was not saved successfully")
+            # Stream to a temp file (hashing, counting and sniffing on the way), then move into place
+            ingested = ingest(file, bus_routes_dir)
+            try:
+                ingested.move_to(filepath)
+            except Exception:
+                ingested.discard()
+                raise
             
             # Get file info
-            file_size = os.path.getsize(filepath)
+            file_size = ingested.size
             file_extension = filename.rsplit('.', 1)[1].lower()
             
-            # Generate unique ID
-            new_id = data.get('next_id', 1)
-            data['next_id'] = new_id + 1
-            
-            # Create file info
+            # Create file info (id is assigned by the collection)
             file_info = {
-                'id': new_id,
                 'title': title,
                 'description': description,
                 'filename': unique_filename,
@@ -2482,13 +2385,14 @@ def upload_bus_route():
                 'size': f"{file_size / (1024*1024):.1f} MB" if file_size > 1024*1024 else f"{file_size / 1024:.1f} KB",
                 'upload_date': datetime.now().isoformat(),
                 'file_path': filepath,
+                'content_hash': ingested.digest,
+                'mime_type': ingested.mimetype,
                 'likes': 0,
                 'dislikes': 0,
                 'comments': []
             }
             
-            data['bus_routes'].append(file_info)
-            save_transportation_data(data)
+            bus_routes_collection.insert(file_info)
             
             flash('Bus route uploaded successfully!', 'success')
             
@@ -2505,13 +2409,7 @@ def upload_bus_route():
 def download_bus_route(file_id):
     """Download bus route file"""
     try:
-        data = load_transportation_data()
-        file_data = None
-        
-        for f in data.get('bus_routes', []):
-            if f['id'] == file_id:
-                file_data = f
-                break
+        file_data = bus_routes_collection.get(file_id)
         
         if not file_data:
             flash('File not found', 'error')
@@ -2519,7 +2417,7 @@ def download_bus_route(file_id):
         
         filepath = file_data['file_path']
         if os.path.exists(filepath) and os.path.isfile(filepath):
-            return send_file(filepath, as_attachment=True, download_name=file_data['original_filename'])
+            return serve_file(filepath, as_attachment=True, download_name=file_data['original_filename'], mimetype=file_data.get('mime_type'))
         else:
             flash('File not found on disk', 'error')
             return redirect(url_for('bus_routes'))
@@ -2534,16 +2432,7 @@ def download_bus_route(file_id):
 def delete_bus_route(file_id):
     """Delete bus route file (admin only)"""
     try:
-        
-        data = load_transportation_data()
-        file_data = None
-        file_index = -1
-        
-        for i, f in enumerate(data.get('bus_routes', [])):
-            if f['id'] == file_id:
-                file_data = f
-                file_index = i
-                break
+        file_data = bus_routes_collection.get(file_id)
         
         if not file_data:
             return jsonify({'success': False, 'error': 'File not found'}), 404
@@ -2554,8 +2443,7 @@ def delete_bus_route(file_id):
             os.remove(filepath)
         
         # Remove from data
-        data['bus_routes'].pop(file_index)
-        save_transportation_data(data)
+        bus_routes_collection.delete(file_id)
         
         return jsonify({'success': True})
         
@@ -2587,7 +2475,7 @@ def bus_route_file(filename):
             app.logger.warning(f"File path outside bus_routes directory: {file_path_abs}")
             return "Invalid file path", 400
             
-        return send_from_directory(bus_routes_dir_abs, filename, as_attachment=False)
+        return serve_file(file_path_abs)
     except Exception as e:
         app.logger.error(f"Error serving bus route file {filename}: {str(e)}")
         return f"Error serving file: {str(e)}", 500
@@ -2600,29 +2488,16 @@ def vote_bus_route(file_id):
         if vote_type not in ['like', 'dislike']:
             return jsonify({'error': 'Invalid vote type'}), 400
         
-        data = load_transportation_data()
-        file_data = None
-        
-        for file_item in data.get('bus_routes', []):
-            if file_item['id'] == file_id:
-                file_data = file_item
-                break
+        # Update vote counts (buffered write-behind)
+        totals = vote_buffer.vote(bus_routes_collection, file_id, vote_type)
         
-        if not file_data:
+        if not totals:
             return jsonify({'error': 'File not found'}), 404
         
-        # Update vote counts
-        if vote_type == 'like':
-            file_data['likes'] = file_data.get('likes', 0) + 1
-        else:
-            file_data['dislikes'] = file_data.get('dislikes', 0) + 1
-        
-        save_transportation_data(data)
-        
         return jsonify({
             'success': True,
-            'likes': file_data.get('likes', 0),
-            'dislikes': file_data.get('dislikes', 0)
+            'likes': totals['likes'],
+            'dislikes': totals['dislikes']
         })
     
     except Exception as e:
@@ -2642,17 +2517,6 @@ def add_bus_route_comment(file_id):
         if not commenter_name:
             commenter_name = 'Anonymous'
         
-        data = load_transportation_data()
-        file_data = None
-        
-        for file_item in data.get('bus_routes', []):
-            if file_item['id'] == file_id:
-                file_data = file_item
-                break
-        
-        if not file_data:
-            return jsonify({'error': 'File not found'}), 404
-        
         # Add comment
         new_comment = {
             'name': commenter_name,
@@ -2660,11 +2524,10 @@ def add_bus_route_comment(file_id):
             'timestamp': datetime.now().isoformat()
         }
         
-        if 'comments' not in file_data:
-            file_data['comments'] = []
+        file_data = bus_routes_collection.update(file_id, lambda file_item: file_item.setdefault('comments', []).append(new_comment))
         
-        file_data['comments'].append(new_comment)
-        save_transportation_data(data)
+        if not file_data:
+            return jsonify({'error': 'File not found'}), 404
         
         return jsonify({
             'success': True,
@@ -2679,13 +2542,7 @@ def add_bus_route_comment(file_id):
 def bus_route_detail(file_id):
     """Display detailed view of a bus route file"""
     try:
-        data = load_transportation_data()
-        file_data = None
-        
-        for file_item in data.get('bus_routes', []):
-            if file_item['id'] == file_id:
-                file_data = file_item
-                break
+        file_data = bus_routes_collection.get(file_id)
         
         if not file_data:
             flash('File not found', 'error')
@@ -2705,11 +2562,11 @@ def bus_route_detail(file_id):
 
 # Canteen Routes
 @app.route('/canteen')
+@page_cache.conditional(canteens_collection.version)
 def canteen():
     """Canteen page showing all canteens"""
     try:
-        data = load_canteen_data()
-        canteens = data.get('canteens', [])
+        canteens = canteens_collection.all()
         
         # Sort by upload date (newest first)
         canteens = sorted(canteens, key=lambda x: x.get('date_added', ''), reverse=True)
@@ -2764,14 +2621,11 @@ def add_canteen():
         file_path = os.path.join(canteen_dir, filename)
         
         # Save file
-        file.save(file_path)
-        
-        # Load existing data
-        data = load_canteen_data()
+        photos.save(file, file_path)
+        thumbnails.schedule(file_path)
         
         # Create new canteen entry
         new_canteen = {
-            'id': data.get('next_id', 1),
             'name': canteen_name,
             'description': canteen_description,
             'maps_link': canteen_maps_link,
@@ -2780,15 +2634,8 @@ def add_canteen():
             'date_added': datetime.now().isoformat()
         }
         
-        # Add to data
-        if 'canteens' not in data:
-            data['canteens'] = []
-        
-        data['canteens'].append(new_canteen)
-        data['next_id'] = data.get('next_id', 1) + 1
-        
-        # Save data
-        save_canteen_data(data)
+        # Add to data (id is assigned by the collection)
+        canteens_collection.insert(new_canteen)
         
         flash('Canteen added successfully!', 'success')
         return redirect(url_for('canteen'))
@@ -2803,17 +2650,9 @@ def add_canteen():
 def delete_canteen(canteen_id):
     """Delete canteen (admin only)"""
     try:
-        data = load_canteen_data()
-        canteen_found = False
-        canteen_to_delete = None
-        
-        for i, canteen in enumerate(data.get('canteens', [])):
-            if canteen['id'] == canteen_id:
-                canteen_to_delete = data['canteens'].pop(i)
-                canteen_found = True
-                break
+        canteen_to_delete = canteens_collection.delete(canteen_id)
         
-        if not canteen_found:
+        if not canteen_to_delete:
             return jsonify({'success': False, 'error': 'Canteen not found'}), 404
         
         # Delete photo file if exists
@@ -2822,12 +2661,11 @@ def delete_canteen(canteen_id):
             if os.path.exists(photo_path):
                 try:
                     os.remove(photo_path)
+                    thumbnails.discard(photo_path)
+                    photos.discard(photo_path)
                 except Exception as e:
                     app.logger.warning(f"Could not delete photo file: {str(e)}")
         
-        # Save updated data
-        save_canteen_data(data)
-        
         return jsonify({'success': True})
         
     except Exception as e:
@@ -2858,18 +2696,18 @@ def canteen_photo(filename):
             app.logger.warning(f"File path outside canteen directory: {file_path_abs}")
             return "Invalid file path", 400
             
-        return send_from_directory(canteen_dir_abs, filename, as_attachment=False)
+        return serve_file(file_path_abs)
     except Exception as e:
         app.logger.error(f"Error serving canteen photo {filename}: {str(e)}")
         return f"Error serving file: {str(e)}", 500
 
 # Campus Places Routes
 @app.route('/places')
+@page_cache.conditional(places_collection.version)
 def campus_places():
     """Campus Places page showing all places"""
     try:
-        data = load_places_data()
-        places = data.get('places', [])
+        places = places_collection.all()
         
         # Sort by upload date (newest first)
         places = sorted(places, key=lambda x: x.get('date_added', ''), reverse=True)
@@ -2917,14 +2755,11 @@ def add_place():
                 photo_path = os.path.join(places_dir, photo_filename)
                 
                 # Save file
-                file.save(photo_path)
-        
-        # Load existing data
-        data = load_places_data()
+                photos.save(file, photo_path)
+                thumbnails.schedule(photo_path)
         
         # Create new place entry
         new_place = {
-            'id': data.get('next_id', 1),
             'name': place_name,
             'description': place_description,
             'maps_link': maps_link,
@@ -2933,15 +2768,8 @@ def add_place():
             'date_added': datetime.now().isoformat()
         }
         
-        # Add to data
-        if 'places' not in data:
-            data['places'] = []
-        
-        data['places'].append(new_place)
-        data['next_id'] = data.get('next_id', 1) + 1
-        
-        # Save data
-        save_places_data(data)
+        # Add to data (id is assigned by the collection)
+        places_collection.insert(new_place)
         
         flash('Campus place added successfully!', 'success')
         return redirect(url_for('campus_places'))
@@ -2956,17 +2784,9 @@ def add_place():
 def delete_place(place_id):
     """Delete campus place (admin only)"""
     try:
-        data = load_places_data()
-        place_found = False
-        place_to_delete = None
-        
-        for i, place in enumerate(data.get('places', [])):
-            if place['id'] == place_id:
-                place_to_delete = data['places'].pop(i)
-                place_found = True
-                break
+        place_to_delete = places_collection.delete(place_id)
         
-        if not place_found:
+        if not place_to_delete:
             return jsonify({'success': False, 'error': 'Place not found'}), 404
         
         # Delete photo file if exists
@@ -2975,12 +2795,11 @@ def delete_place(place_id):
             if os.path.exists(photo_path):
                 try:
                     os.remove(photo_path)
+                    thumbnails.discard(photo_path)
+                    photos.discard(photo_path)
                 except Exception as e:
                     app.logger.warning(f"Could not delete photo file: {str(e)}")
         
-        # Save updated data
-        save_places_data(data)
-        
         return jsonify({'success': True})
         
     except Exception as e:
@@ -3011,18 +2830,18 @@ def place_photo(filename):
             app.logger.warning(f"File path outside places directory: {file_path_abs}")
             return "Invalid file path", 400
             
-        return send_from_directory(places_dir_abs, filename, as_attachment=False)
+        return serve_file(file_path_abs)
     except Exception as e:
         app.logger.error(f"Error serving place photo {filename}: {str(e)}")
         return f"Error serving file: {str(e)}", 500
 
 # Hostel Information Routes
 @app.route('/hostels')
+@page_cache.conditional(hostels_collection.version)
 def hostel_info():
     """Hostel Information page showing all hostels"""
     try:
-        data = load_hostels_data()
-        hostels = data.get('hostels', [])
+        hostels = hostels_collection.all()
         
         # Sort by upload date (newest first)
         hostels = sorted(hostels, key=lambda x: x.get('date_added', ''), reverse=True)
@@ -3082,14 +2901,11 @@ def add_hostel():
         photo_path = os.path.join(hostels_dir, photo_filename)
         
         # Save file
-        file.save(photo_path)
-        
-        # Load existing data
-        data = load_hostels_data()
+        photos.save(file, photo_path)
+        thumbnails.schedule(photo_path)
         
         # Create new hostel entry
         new_hostel = {
-            'id': data.get('next_id', 1),
             'name': hostel_name,
             'category': hostel_category,
             'description': hostel_description,
@@ -3101,15 +2917,8 @@ def add_hostel():
             'date_added': datetime.now().isoformat()
         }
         
-        # Add to data
-        if 'hostels' not in data:
-            data['hostels'] = []
-        
-        data['hostels'].append(new_hostel)
-        data['next_id'] = data.get('next_id', 1) + 1
-        
-        # Save data
-        save_hostels_data(data)
+        # Add to data (id is assigned by the collection)
+        hostels_collection.insert(new_hostel)
         
         flash('Hostel information added successfully!', 'success')
         return redirect(url_for('hostel_info'))
@@ -3124,17 +2933,9 @@ def add_hostel():
 def delete_hostel(hostel_id):
     """Delete hostel information (admin only)"""
     try:
-        data = load_hostels_data()
-        hostel_found = False
-        hostel_to_delete = None
+        hostel_to_delete = hostels_collection.delete(hostel_id)
         
-        for i, hostel in enumerate(data.get('hostels', [])):
-            if hostel['id'] == hostel_id:
-                hostel_to_delete = data['hostels'].pop(i)
-                hostel_found = True
-                break
-        
-        if not hostel_found:
+        if not hostel_to_delete:
             return jsonify({'success': False, 'error': 'Hostel not found'}), 404
         
         # Delete photo file if exists
@@ -3143,12 +2944,11 @@ def delete_hostel(hostel_id):
             if os.path.exists(photo_path):
                 try:
                     os.remove(photo_path)
+                    thumbnails.discard(photo_path)
+                    photos.discard(photo_path)
                 except Exception as e:
                     app.logger.warning(f"Could not delete photo file: {str(e)}")
         
-        # Save updated data
-        save_hostels_data(data)
-        
         return jsonify({'success': True})
         
     except Exception as e:
@@ -3179,18 +2979,18 @@ def hostel_photo(filename):
             app.logger.warning(f"File path outside hostels directory: {file_path_abs}")
             return "Invalid file path", 400
             
-        return send_from_directory(hostels_dir_abs, filename, as_attachment=False)
+        return serve_file(file_path_abs)
     except Exception as e:
         app.logger.error(f"Error serving hostel photo {filename}: {str(e)}")
         return f"Error serving file: {str(e)}", 500
 
 # Upcoming Events Routes
 @app.route('/events')
+@page_cache.conditional()
 def upcoming_events():
     """Upcoming Events page showing all events"""
     try:
-        data = load_events_data()
-        events = data.get('events', [])
+        events = events_collection.all()
         
         # Sort events by date (upcoming first)
         from datetime import datetime
@@ -3281,14 +3081,11 @@ def add_event():
                 poster_path = os.path.join(events_dir, poster_filename)
                 
                 # Save file
-                file.save(poster_path)
-        
-        # Load existing data
-        data = load_events_data()
+                photos.save(file, poster_path)
+                thumbnails.schedule(poster_path)
         
         # Create new event entry
         new_event = {
-            'id': data.get('next_id', 1),
             'name': event_name,
             'description': event_description,
             'event_datetime': event_datetime,
@@ -3298,15 +3095,8 @@ def add_event():
             'date_added': datetime.now().isoformat()
         }
         
-        # Add to data
-        if 'events' not in data:
-            data['events'] = []
-        
-        data['events'].append(new_event)
-        data['next_id'] = data.get('next_id', 1) + 1
-        
-        # Save data
-        save_events_data(data)
+        # Add to data (id is assigned by the collection)
+        events_collection.insert(new_event)
         
         flash('Event added successfully!', 'success')
         return redirect(url_for('upcoming_events'))
@@ -3464,17 +3254,9 @@ def resend_otp():
 def delete_event(event_id):
     """Delete event (admin only)"""
     try:
-        data = load_events_data()
-        event_found = False
-        event_to_delete = None
-        
-        for i, event in enumerate(data.get('events', [])):
-            if event['id'] == event_id:
-                event_to_delete = data['events'].pop(i)
-                event_found = True
-                break
+        event_to_delete = events_collection.delete(event_id)
         
-        if not event_found:
+        if not event_to_delete:
             return jsonify({'success': False, 'error': 'Event not found'}), 404
         
         # Delete poster file if exists
@@ -3483,12 +3265,11 @@ def delete_event(event_id):
             if os.path.exists(poster_path):
                 try:
                     os.remove(poster_path)
+                    thumbnails.discard(poster_path)
+                    photos.discard(poster_path)
                 except Exception as e:
                     app.logger.warning(f"Could not delete poster file: {str(e)}")
         
-        # Save updated data
-        save_events_data(data)
-        
         return jsonify({'success': True})
         
     except Exception as e:
@@ -3519,7 +3300,7 @@ def event_poster(filename):
             app.logger.warning(f"File path outside events directory: {file_path_abs}")
             return "Invalid file path", 400
             
-        return send_from_directory(events_dir_abs, filename, as_attachment=False)
+        return serve_file(file_path_abs)
     except Exception as e:
         app.logger.error(f"Error serving event poster {filename}: {str(e)}")
         return f"Error serving file: {str(e)}", 500
@@ -3538,7 +3319,9 @@ def verify_file(file_id):
         file.verified = True
         file.verified_by_id = current_user.id
         file.verified_at = datetime.utcnow()
+        search_index.index_file(file)
         db.session.commit()
+        page_cache.invalidate()
         
         app.logger.info(f"File {file_id} verified by admin {current_user.email}")
         return jsonify({'success': True, 'message': 'File verified successfully'})
@@ -3561,20 +3344,26 @@ def delete_file_api(file_id):
         if not current_user.is_admin and file.uploader_id != current_user.id:
             return jsonify({'success': False, 'error': 'You can only delete your own files'}), 403
         
-        # Delete the physical file
-        if os.path.exists(file.file_path):
-            try:
-                os.remove(file.file_path)
-                app.logger.info(f"Deleted file: {file.file_path}")
-            except Exception as e:
-                app.logger.warning(f"Could not delete physical file: {str(e)}")
+        file_path = file.file_path
         
-        # Delete all reports associated with this file
+        # Delete all reports, votes and comments associated with this file
         Report.query.filter_by(file_id=file_id).delete()
+        FileVote.query.filter_by(file_id=file_id).delete()
+        FileComment.query.filter_by(file_id=file_id).delete()
+        search_index.remove_file(file_id)
         
         # Delete the database record
         db.session.delete(file)
         db.session.commit()
+        hidden_files.invalidate()
+        page_cache.invalidate()
+        
+        # The physical file may still back other uploads of the same content
+        try:
+            if blob_store.release(file_path):
+                app.logger.info(f"Deleted file: {file_path}")
+        except Exception as e:
+            app.logger.warning(f"Could not delete physical file: {str(e)}")
         
         app.logger.info(f"File {file_id} deleted by {current_user.email}")
         return jsonify({'success': True, 'message': 'File deleted successfully'})
@@ -3615,7 +3404,10 @@ def report_file_api(file_id):
             status='Pending'
         )
         db.session.add(report)
+        File.change_pending_reports(file_id, 1, app.config['REPORT_HIDE_THRESHOLD'])
         db.session.commit()
+        hidden_files.invalidate()
+        page_cache.invalidate()
         
         app.logger.info(f"File {file_id} reported by {current_user.email}: {reason}")
         return jsonify({'success': True, 'message': 'File reported successfully'})
@@ -3632,10 +3424,11 @@ def get_reports():
     try:
         status_filter = request.args.get('status', 'Pending')
         
+        reports_query = Report.query.options(*Report.list_options())
         if status_filter == 'all':
-            reports = Report.query.order_by(Report.created_at.desc()).all()
+            reports = reports_query.order_by(Report.created_at.desc()).all()
         else:
-            reports = Report.query.filter_by(status=status_filter).order_by(Report.created_at.desc()).all()
+            reports = reports_query.filter_by(status=status_filter).order_by(Report.created_at.desc()).all()
         
         return jsonify({
             'success': True,
@@ -3663,7 +3456,11 @@ def review_report(report_id):
             report.reviewed_by_id = current_user.id
             report.reviewed_at = datetime.utcnow()
             report.admin_notes = admin_notes
+            db.session.flush()
+            File.recount_reports(app.config['REPORT_HIDE_THRESHOLD'], file_id=report.file_id)
             db.session.commit()
+            hidden_files.invalidate()
+            page_cache.invalidate()
             
             return jsonify({'success': True, 'message': 'Report dismissed'})
             
@@ -3671,24 +3468,27 @@ def review_report(report_id):
             # Delete the file and mark report as reviewed
             file = report.file
             if file:
-                # Delete physical file
-                if os.path.exists(file.file_path):
-                    try:
-                        os.remove(file.file_path)
-                    except Exception as e:
-                        app.logger.warning(f"Could not delete physical file: {str(e)}")
+                file_id = file.id
+                file_path = file.file_path
                 
-                # Mark all reports for this file as reviewed
-                Report.query.filter_by(file_id=file.id).update({
-                    'status': 'Reviewed',
-                    'reviewed_by_id': current_user.id,
-                    'reviewed_at': datetime.utcnow(),
-                    'admin_notes': admin_notes
-                })
-                
-                # Delete the file
+                # Reports point at the file (file_id is NOT NULL), so they go before it,
+                # along with its votes and comments; its report counters go with the row
+                Report.query.filter_by(file_id=file_id).delete()
+                FileVote.query.filter_by(file_id=file_id).delete()
+                FileComment.query.filter_by(file_id=file_id).delete()
+                search_index.remove_file(file_id)
+                db.session.expire(file, ['reports'])
                 db.session.delete(file)
                 db.session.commit()
+                hidden_files.invalidate()
+                page_cache.invalidate()
+                app.logger.info(f"File {file_id} deleted after report {report_id} by admin {current_user.email}: {admin_notes}")
+                
+                # Physical file goes once no other upload shares it
+                try:
+                    blob_store.release(file_path)
+                except Exception as e:
+                    app.logger.warning(f"Could not delete physical file: {str(e)}")
                 
                 return jsonify({'success': True, 'message': 'File deleted and report reviewed'})
             else:
@@ -3708,19 +3508,44 @@ def review_report(report_id):
 def admin_verify_files():
     """Admin page to view and verify unverified files"""
     try:
-        unverified_files = File.query.filter_by(verified=False).order_by(File.upload_date.desc()).all()
-        return render_template('admin/verify_files.html', files=unverified_files)
+        unverified_query = File.query.filter_by(verified=False)
+        page = file_page(unverified_query)
+        if request.args.get('format') == 'json':
+            return file_page_json(page)
+        
+        return render_template('admin/verify_files.html', files=page.items, page=page,
+                               links=page_links(page), total=unverified_query.count())
     except Exception as e:
         app.logger.error(f"Error loading verify files page: {str(e)}")
         flash('Error loading files', 'error')
         return redirect(url_for('admin_dashboard'))
 
+@app.route('/admin/catalog/reload', methods=['POST'])
+@admin_required
+def admin_reload_catalog():
+    """Rebuild the course catalog from data.json (this worker; SIGHUP reaches all of them)"""
+    if catalog.reload():
+        page_cache.invalidate()
+        app.logger.info(f"Course catalog reloaded by {current_user.email}")
+        flash('Course catalog reloaded.', 'success')
+    else:
+        flash('Course catalog in data.json is invalid; keeping the current one.', 'error')
+    return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/metrics')
+@admin_required
+def admin_metrics():
+    """Counters collected by this worker since it started, plus the email outbox backlog"""
+    snapshot = metrics.snapshot()
+    snapshot['email_outbox'] = email_outbox.counts()
+    return jsonify(snapshot)
+
 @app.route('/admin/reported-files')
 @admin_required
 def admin_reported_files():
     """Admin page to view and manage reported files"""
     try:
-        pending_reports = Report.query.filter_by(status='Pending').order_by(Report.created_at.desc()).all()
+        pending_reports = Report.query.options(*Report.list_options()).filter_by(status='Pending').order_by(Report.created_at.desc()).all()
         return render_template('admin/reported_files.html', reports=pending_reports)
     except Exception as e:
         app.logger.error(f"Error loading reported files page: {str(e)}")
@@ -3732,14 +3557,12 @@ def admin_reported_files():
 def manage_uploads():
     """Manage uploads page for contributors and admin"""
     try:
-        if current_user.is_admin:
-            # Admin sees all files
-            files = File.query.order_by(File.upload_date.desc()).all()
-        else:
-            # Contributors see all files (verified or not)
-            files = File.query.order_by(File.upload_date.desc()).all()
+        # Admins and contributors both see all files (verified or not), one page at a time
+        page = file_page(File.query)
+        if request.args.get('format') == 'json':
+            return file_page_json(page)
         
-        return render_template('manage_uploads.html', files=files)
+        return render_template('manage_uploads.html', files=page.items, page=page, links=page_links(page))
     except Exception as e:
         app.logger.error(f"Error loading manage uploads page: {str(e)}")
         flash('Error loading files', 'error')
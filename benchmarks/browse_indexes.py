@@ -0,0 +1,140 @@
+# p50/p99 of the browse and report queries with and without the secondary indexes
+#
+#     python benchmarks/browse_indexes.py --files 250000
+#
+# Seeds --files files, 1000 users and 20000 reports into a scratch SQLite
+# database, drops every secondary index on files and reports, times each query,
+# then restores the indexes with upgrade_schema() (the migration path existing
+# databases take) and times them again.
+#
+# The file listings run the way the routes build them: visible_files_query()
+# for a guest or a contributor and file_page() (keyset pagination) inside a
+# request context, first page and a page deep into the listing. The EXPLAIN
+# QUERY PLAN of each query's files statement is printed next to its timings.
+
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from scratch import enter_scratch_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Browse query latency with and without indexes')
+    parser.add_argument('--files', type=int, default=250000)
+    parser.add_argument('--reports', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=40)
+    options = parser.parse_args()
+
+    enter_scratch_dir()
+    import app as portal
+    from flask_login import login_user
+    from models import db, File, Report, User, upgrade_schema
+    from pagination import encode_cursor
+
+    random.seed(1)
+    now = datetime.utcnow()
+    departments = ['cse', 'it', 'mech', 'ece', 'eee', 'civil', 'chem']
+
+    with portal.app.app_context():
+        db.session.execute(db.insert(File), [dict(
+            filename=f'f{i}.pdf', original_filename=f'f{i}.pdf', custom_filename=f'Paper {i}',
+            course_type=random.choice(['ug', 'pg', 'mba']), department=random.choice(departments),
+            semester=str(random.randint(1, 8)), category=random.choice(['CAT', 'ESE', 'SAT', 'PRACTICAL']),
+            file_type='QP', file_path=f'uploads/f{i}.pdf', upload_date=now - timedelta(seconds=i),
+            verified=random.random() > 0.02, auto_hidden=random.random() < 0.001
+        ) for i in range(options.files)])
+        db.session.execute(db.insert(User), [dict(
+            name=f'User {i}', email=f'user{i}@example.com', role='guest'
+        ) for i in range(1000)])
+        db.session.execute(db.insert(Report), [dict(
+            file_id=random.randint(1, options.files), reporter_id=random.randint(1, 1000), reason='Duplicate',
+            status=random.choice(['Pending', 'Reviewed', 'Dismissed']), created_at=now
+        ) for _ in range(options.reports)])
+        contributor = User(name='Contributor', email='contributor@example.com', role='contributor')
+        db.session.add(contributor)
+        db.session.commit()
+
+        deep_file = File.query.order_by(File.upload_date.desc()).offset(options.files // 2).first()
+        deep_cursor = encode_cursor(deep_file)
+
+        def listing(build, user=None, cursor=None):
+            """Run build() in a request for user (anonymous if None) on the page at cursor"""
+            def run():
+                path = f'/search?cursor={cursor}' if cursor else '/search'
+                with portal.app.test_request_context(path):
+                    if user is not None:
+                        login_user(db.session.get(User, user.id))
+                    return build()
+            return run
+
+        def category_view():
+            return portal.visible_files_query().options(*File.list_options()).filter_by(
+                course_type='ug', department='cse', semester='3', category='CAT'
+            ).order_by(File.upload_date.desc()).all()
+
+        queries = {
+            'category_view (guest)': listing(category_view),
+            'search (guest, first)': listing(lambda: portal.file_page(portal.visible_files_query())),
+            'search (guest, deep)': listing(lambda: portal.file_page(portal.visible_files_query()), cursor=deep_cursor),
+            'search (contributor, first)': listing(lambda: portal.file_page(portal.visible_files_query()), contributor),
+            'search (contributor, deep)': listing(lambda: portal.file_page(portal.visible_files_query()), contributor, deep_cursor),
+            'admin_verify_files': listing(lambda: portal.file_page(File.query.filter_by(verified=False))),
+            'report duplicate check': lambda: Report.query.filter_by(
+                file_id=random.randint(1, options.files), reporter_id=5, status='Pending').first(),
+            'pending report count': lambda: Report.query.filter_by(
+                file_id=random.randint(1, options.files), status='Pending').count(),
+            'admin_reported_files': lambda: Report.query.options(*Report.list_options()).filter_by(
+                status='Pending').order_by(Report.created_at.desc()).all(),
+        }
+
+        def plan(query):
+            """EXPLAIN QUERY PLAN of the first statement query sends"""
+            statements = []
+
+            def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+                statements.append((statement, parameters))
+
+            event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+            try:
+                query()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+            statement, parameters = next(s for s in statements if 'FROM files' in s[0] or 'FROM reports' in s[0])
+            rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+            return ' | '.join(row[-1] for row in rows)
+
+        def run(label):
+            for name, query in queries.items():
+                timings = []
+                for _ in range(options.repeat):
+                    started = time.perf_counter()
+                    query()
+                    db.session.expire_all()
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                p99 = timings[max(int(len(timings) * 0.99) - 1, 0)]
+                print(f"{label:8s} {name:28s} p50 {statistics.median(timings):8.2f} ms  p99 {p99:8.2f} ms")
+                print(f"{'':8s}   {plan(query)}")
+
+        for table in ('files', 'reports'):
+            for index in db.metadata.tables[table].indexes:
+                db.session.execute(db.text(f'DROP INDEX IF EXISTS {index.name}'))
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        run('without')
+
+        upgrade_schema()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        run('with')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
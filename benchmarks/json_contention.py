@@ -0,0 +1,67 @@
+# Contention benchmark for JSON read-modify-write cycles across processes
+#
+#     python benchmarks/json_contention.py --workers 8 --votes 200
+#
+# Starts --workers processes that each add --votes likes to the same record
+# through JsonCollection.update (the path vote flushes, comments and replies
+# take), against a scratch copy of a small document. Every update must land:
+# the script exits non-zero if the final count is short or the file is not
+# valid JSON.
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_store import JsonDocument, JsonCollection  # noqa: E402
+
+
+def open_collection(path):
+    return JsonCollection(JsonDocument(path, lambda: {"files": []}), 'files')
+
+
+def like(record):
+    record['likes'] = record.get('likes', 0) + 1
+
+
+def worker(path, votes):
+    collection = open_collection(path)
+    for _ in range(votes):
+        collection.update(1, like)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel JSON read-modify-write benchmark')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--votes', type=int, default=200, help='Votes per worker')
+    options = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='json-contention-')
+    path = os.path.join(directory, 'data.json')
+    with open(path, 'w') as f:
+        json.dump({"files": [{"id": 1, "likes": 0, "dislikes": 0}]}, f)
+
+    started = time.perf_counter()
+    processes = [multiprocessing.Process(target=worker, args=(path, options.votes)) for _ in range(options.workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    expected = options.workers * options.votes
+    with open(path) as f:
+        likes = json.load(f)['files'][0]['likes']
+
+    print(f"workers {options.workers}  votes {expected}  stored {likes}  lost {expected - likes}")
+    print(f"{expected / elapsed:.0f} votes/s ({elapsed:.2f} s)")
+    return 0 if likes == expected else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# Per-send latency of the mail API with and without a pooled keep-alive session
+#
+#     python benchmarks/mail_session.py --sends 200
+#
+# Starts a local HTTPS stub of the mail API (self-signed certificate made with
+# the openssl command; --plain uses HTTP instead) and sends the same message
+# --sends times with a fresh requests.post each, which pays the TCP and TLS
+# handshake every time, and through EmailService.deliver, which reuses pooled
+# connections. Prints mean and p95 per send and the email.send_seconds timing.
+
+import os
+import sys
+import ssl
+import time
+import socket
+import argparse
+import threading
+import statistics
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scratch import enter_scratch_dir
+
+
+class StubMailHandler(BaseHTTPRequestHandler):
+    """Accepts every message, over keep-alive connections"""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        body = b'{"id": 1}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(workdir, plain):
+    """Serve the stub on a free port; returns the /send URL"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubMailHandler)
+    scheme = 'http'
+    if not plain:
+        cert, key = os.path.join(workdir, 'cert.pem'), os.path.join(workdir, 'key.pem')
+        subprocess.run(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=localhost',
+             '-addext', 'subjectAltName=DNS:localhost', '-keyout', key, '-out', cert],
+            check=True, capture_output=True
+        )
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        os.environ['REQUESTS_CA_BUNDLE'] = cert
+        scheme = 'https'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"{scheme}://localhost:{server.server_address[1]}/send"
+
+
+def timed(fn, sends):
+    timings = []
+    for _ in range(sends):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(timings), statistics.quantiles(timings, n=20)[18]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mail API latency with and without connection reuse')
+    parser.add_argument('--sends', type=int, default=200)
+    parser.add_argument('--plain', action='store_true', help='Stub over HTTP instead of HTTPS')
+    options = parser.parse_args()
+
+    workdir = enter_scratch_dir()
+    url = start_stub(workdir, options.plain)
+    os.environ.update({'MAIL_API_URL': url, 'REPL_IDENTITY': 'benchmark'})
+
+    import requests
+    import app as portal
+    from email_service import email_service
+    from metrics import metrics
+
+    message = {'to': 'student@example.com', 'subject': 'Your code', 'html': '<p>Code</p>' * 200, 'text': 'Code'}
+
+    def fresh_connection():
+        response = requests.post(url, json=message, headers={'X_REPLIT_TOKEN': email_service.auth_token}, timeout=30)
+        assert response.status_code == 200
+
+    def pooled():
+        with portal.app.app_context():
+            email_service.deliver(message['to'], message['subject'], message['html'], message['text'])
+
+    for name, fn in [('requests.post per send', fresh_connection), ('EmailService session', pooled)]:
+        mean, p95 = timed(fn, options.sends)
+        print(f"{name:24s} mean {mean:6.2f} ms  p95 {p95:6.2f} ms  ({options.sends} sends)")
+    print('email.send_seconds', metrics.snapshot()['timings'].get('email.send_seconds'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,31 @@
+# Run a benchmark against a scratch copy of the portal
+#
+# Like tests/conftest.py: the app runs from a temporary directory with its own
+# SQLite database, page cache, chunk and photo directories, so benchmarks never
+# read or write data.json, uploads/ or instance/ in the checkout.
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def enter_scratch_dir(prefix='portal-bench-', **environ):
+    """chdir into a new scratch directory and point the app's storage at it; returns the path
+
+    Keyword arguments are set as environment variables too; call this before
+    importing the app.
+    """
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'portal.db')}",
+        'PAGE_CACHE_DIR': os.path.join(workdir, 'instance', 'page_cache'),
+        'CHUNKED_UPLOAD_DIR': os.path.join(workdir, 'instance', 'chunks'),
+        'PHOTO_ORIGINALS_DIR': os.path.join(workdir, 'instance', 'photo_originals'),
+        **{key: str(value) for key, value in environ.items()},
+    })
+    return workdir
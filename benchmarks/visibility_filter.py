@@ -0,0 +1,80 @@
+# Latency of filtering file visibility in Python vs in SQL
+#
+#     python benchmarks/visibility_filter.py --rows 100000
+#
+# Seeds --rows File rows (one in five unverified) into a scratch SQLite
+# database and times, for an anonymous visitor, the category, /api/search and
+# /search queries written both ways: loading every match and dropping hidden
+# files with is_file_visible_to_user, and visible_files_query() doing it in the
+# WHERE clause. Prints the median of each and the number of rows returned.
+
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+from scratch import enter_scratch_dir
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Python vs SQL visibility filtering')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    options = parser.parse_args()
+
+    enter_scratch_dir()
+    import app as portal
+    from models import db, File
+
+    random.seed(1)
+    now = datetime.utcnow()
+    with portal.app.app_context():
+        db.session.execute(db.insert(File), [dict(
+            filename=f'f{i}.pdf', original_filename=f'f{i}.pdf', custom_filename=f'Paper {i}',
+            course_type='ug', department=random.choice(['cse', 'it', 'mech']),
+            semester=str(random.randint(1, 8)), category=random.choice(['CAT', 'ESE']),
+            subject_name=f'Subject {i % 500}', file_type='QP', file_path=f'uploads/f{i}.pdf',
+            upload_date=now - timedelta(minutes=i), verified=(i % 5 != 0)
+        ) for i in range(options.rows)])
+        db.session.commit()
+
+    visible = portal.is_file_visible_to_user
+    category = dict(course_type='ug', department='cse', semester='3', category='CAT')
+    newest = File.upload_date.desc()
+    cases = {
+        'category_view': (
+            lambda: [f for f in File.query.filter_by(**category).order_by(newest).all() if visible(f)],
+            lambda: portal.visible_files_query().filter_by(**category).order_by(newest).all(),
+            options.repeat),
+        'api_search (50)': (
+            lambda: [f for f in File.query.filter(File.subject_name.ilike('%Subject 1%')).order_by(newest).limit(100).all() if visible(f)][:50],
+            lambda: portal.visible_files_query().filter(File.subject_name.ilike('%Subject 1%')).order_by(newest).limit(50).all(),
+            options.repeat),
+        'search (all)': (
+            lambda: [f for f in File.query.order_by(newest).all() if visible(f)],
+            lambda: portal.visible_files_query().order_by(newest).all(),
+            max(options.repeat // 4, 1)),
+    }
+
+    print(f"{options.rows} files, anonymous visitor")
+    with portal.app.test_request_context('/'):
+        for name, (in_python, in_sql, repeat) in cases.items():
+            python_ms, sql_ms = median_ms(in_python, repeat), median_ms(in_sql, repeat)
+            print(f"{name:16s} python {python_ms:8.1f} ms ({len(in_python())} rows)  "
+                  f"sql {sql_ms:8.1f} ms ({len(in_sql())} rows)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
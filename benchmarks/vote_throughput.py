@@ -0,0 +1,50 @@
+# Votes per second with and without the write-behind vote buffer
+#
+#     python benchmarks/vote_throughput.py --votes 1000
+#
+# Posts likes to /bus-routes/vote/<id> through the test client, first with the
+# buffer flushing after every vote (one transportation.json rewrite each, as
+# before buffering) and then with the default batching. Checks that every vote
+# reached the file after the final flush.
+
+import sys
+import time
+import argparse
+
+from scratch import enter_scratch_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vote throughput with and without write-behind buffering')
+    parser.add_argument('--votes', type=int, default=1000)
+    options = parser.parse_args()
+
+    enter_scratch_dir()
+    import app as portal
+    from vote_buffer import vote_buffer
+
+    portal.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    client = portal.app.test_client()
+    route = portal.bus_routes_collection.insert({'route_name': 'Benchmark', 'likes': 0, 'dislikes': 0})
+
+    def run(label, flush_every):
+        vote_buffer.flush_every = flush_every
+        started = time.perf_counter()
+        for _ in range(options.votes):
+            response = client.post(f"/bus-routes/vote/{route['id']}", json={'vote_type': 'like'})
+            assert response.status_code == 200, response.data
+        elapsed = time.perf_counter() - started
+        vote_buffer.flush()
+        print(f"{label:28s} {options.votes / elapsed:8.0f} votes/s")
+
+    default_every = vote_buffer.flush_every
+    run('unbuffered (flush every 1)', 1)
+    run(f'buffered (flush every {default_every})', default_every)
+
+    stored = portal.bus_routes_collection.get(route['id'])['likes']
+    print(f"stored {stored} of {2 * options.votes} votes")
+    return 0 if stored == 2 * options.votes else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
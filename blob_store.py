@@ -0,0 +1,110 @@
+# Content-addressed storage for uploaded files
+#
+# Each distinct upload is stored once, named by the SHA-256 of its content in a
+# sharded tree under the uploads folder:
+#
+#     uploads/blobs/ab/cd/abcdef0123...<64 hex>.pdf
+#
+# The extension is kept so previews and MIME detection keep working. Records in
+# the database and the JSON files point at the blob; a blob is only deleted once
+# no record references it any more. Reference counts are taken from the
+# registered counters at delete time, so there is no separate counter to drift.
+
+import os
+import re
+from json_store import FileLock
+from ingest import ingest
+
+BLOB_NAME = re.compile(r'^([0-9a-f]{64})(\.[A-Za-z0-9]+)?$')
+
+
+class BlobStore:
+    def __init__(self, app=None):
+        self.upload_folder = 'uploads'
+        self.root = os.path.join(self.upload_folder, 'blobs')
+        self._reference_counters = []
+        self._delete_listeners = []
+        self._lock = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.upload_folder = app.config['UPLOAD_FOLDER']
+        self.root = os.path.join(self.upload_folder, 'blobs')
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = FileLock(os.path.join(self.root, '.lock'))
+
+    def lock(self):
+        """Hold while adding or dropping references so a blob is never removed under a new record"""
+        return self._lock.hold()
+
+    def add_reference_counter(self, counter):
+        """counter(file_path) returns how many records point at file_path"""
+        self._reference_counters.append(counter)
+
+    def add_delete_listener(self, listener):
+        """listener(file_path) is called after a blob is deleted, e.g. to drop derived files"""
+        self._delete_listeners.append(listener)
+
+    def path_for(self, digest, extension=''):
+        """Storage path of a blob, relative to the working directory like File.file_path"""
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + extension)
+
+    def filename_for(self, path):
+        """Path relative to the uploads folder, as served by /uploads/<path:filename>"""
+        return os.path.relpath(path, self.upload_folder).replace(os.sep, '/')
+
+    def digest_of(self, path):
+        """SHA-256 encoded in a blob's name, or None for files stored elsewhere"""
+        match = BLOB_NAME.match(os.path.basename(path))
+        if not match:
+            return None
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(os.path.join(self.root, match.group(1)[:2], match.group(1)[2:4])):
+            return None
+        return match.group(1)
+
+    def store(self, source, extension='', filename=''):
+        """Save an uploaded file (FileStorage or binary file object); returns (path, ingested, created)
+
+        ingested carries the digest, size and sniffed MIME type. created is
+        False when an identical blob already existed. Call with lock() held
+        until the referencing record is saved.
+        """
+        ingested = ingest(source, self.root, filename)
+        try:
+            path, created = self.add(ingested, extension)
+            return path, ingested, created
+        except Exception:
+            ingested.discard()
+            raise
+
+    def add(self, ingested, extension=''):
+        """Move an IngestedFile (temp file on the same filesystem) into the store; returns (path, created)"""
+        path = self.path_for(ingested.digest, extension.lower())
+        if os.path.exists(path):
+            ingested.discard()
+            return path, False
+        ingested.move_to(path)
+        return path, True
+
+    def references(self, path):
+        return sum(counter(path) for counter in self._reference_counters)
+
+    def release(self, path):
+        """Delete the file at path unless some record still references it; returns True if deleted
+
+        Call after the record that pointed at it has been removed.
+        """
+        if not path:
+            return False
+        with self.lock():
+            if self.references(path) > 0 or not os.path.exists(path):
+                return False
+            os.remove(path)
+        for listener in self._delete_listeners:
+            listener(path)
+        return True
+
+
+# Global blob store instance
+blob_store = BlobStore()
@@ -0,0 +1,160 @@
+# Course catalog shared by the materials and syllabus pages
+#
+# The materials hierarchy (course type -> department -> semester) comes from the
+# "course_types" section of data.json; the syllabus pages use their own
+# department list below (note 'mtech_cse_5yr' there vs 'mtech_cse' in materials).
+# Both are validated and frozen into read-only mappings once, so hierarchy pages
+# never touch disk. Reload with SIGHUP or the admin "reload catalog" action.
+
+import signal
+import logging
+import threading
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+SYLLABUS_COURSE_TYPES = {
+    'ug': {
+        'name': 'Under Graduate (UG)',
+        'icon': 'fas fa-user-graduate',
+        'color': 'primary',
+        'departments': {
+            'cse': 'Computer Science & Engineering',
+            'mech': 'Mechanical Engineering',
+            'eee': 'Electrical & Electronics Engineering',
+            'ece': 'Electronics & Communication Engineering',
+            'it': 'Information Technology',
+            'chem': 'Chemical Engineering',
+            'civil': 'Civil Engineering'
+        }
+    },
+    'pg': {
+        'name': 'Post Graduate (PG)',
+        'icon': 'fas fa-graduation-cap',
+        'color': 'success',
+        'departments': {
+            'mtech_cse_5yr': 'M.Tech CSE (5-Year)',
+            'me_applied_electronics': 'M.E Applied Electronics',
+            'me_structural': 'M.E Structural',
+            'me_ped': 'M.E PED'
+        }
+    },
+    'mba': {
+        'name': 'Master of Business Administration (MBA)',
+        'icon': 'fas fa-briefcase',
+        'color': 'warning',
+        'departments': {
+            'general_mba': 'General MBA'
+        }
+    }
+}
+
+SYLLABUS_REGULATIONS = ('2017', '2023', '2025')
+
+QUESTION_PAPER_CATEGORIES = ('CAT', 'ESE', 'SAT', 'Practical')
+
+
+def _freeze(value):
+    """Deep read-only copy: dicts become mapping proxies, lists become tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _validate(course_types, syllabus_course_types):
+    """Raise ValueError describing the first malformed entry"""
+    for course_id, course in course_types.items():
+        if not isinstance(course, dict) or not course.get('name'):
+            raise ValueError(f"course type '{course_id}' needs a name")
+        if not isinstance(course.get('departments'), dict):
+            raise ValueError(f"course type '{course_id}' needs a departments mapping")
+        for dept_id, dept in course['departments'].items():
+            if not isinstance(dept, dict) or not dept.get('name'):
+                raise ValueError(f"department '{course_id}/{dept_id}' needs a name")
+            if not isinstance(dept.get('semesters'), dict):
+                raise ValueError(f"department '{course_id}/{dept_id}' needs a semesters mapping")
+
+    for course_id, course in syllabus_course_types.items():
+        if not course.get('name') or not isinstance(course.get('departments'), dict):
+            raise ValueError(f"syllabus course type '{course_id}' needs a name and departments")
+
+
+class Catalog:
+    """Immutable course hierarchy with O(1) lookups"""
+
+    def __init__(self, course_types, syllabus_course_types=SYLLABUS_COURSE_TYPES):
+        _validate(course_types, syllabus_course_types)
+        self.course_types = _freeze(course_types)
+        self.syllabus_course_types = _freeze(syllabus_course_types)
+        self.regulations = SYLLABUS_REGULATIONS
+        self.categories = QUESTION_PAPER_CATEGORIES
+
+        self._departments = {
+            (course_id, dept_id): dept
+            for course_id, course in self.course_types.items()
+            for dept_id, dept in course['departments'].items()
+        }
+        self._syllabus_departments = {
+            (course_id, dept_id): dept_name
+            for course_id, course in self.syllabus_course_types.items()
+            for dept_id, dept_name in course['departments'].items()
+        }
+
+    def course_type(self, course_type_id):
+        """Materials course type mapping, or None"""
+        return self.course_types.get(course_type_id)
+
+    def department(self, course_type_id, dept_id):
+        """Materials department mapping, or None"""
+        return self._departments.get((course_type_id, dept_id))
+
+    def syllabus_course_type(self, course_type_id):
+        """Syllabus course type mapping, or None"""
+        return self.syllabus_course_types.get(course_type_id)
+
+    def syllabus_department(self, course_type_id, dept_id):
+        """Syllabus department display name, or None"""
+        return self._syllabus_departments.get((course_type_id, dept_id))
+
+
+class CatalogRegistry:
+    """Holds the current Catalog and swaps in a new one on reload"""
+
+    def __init__(self):
+        self._loader = None
+        self._catalog = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, loader):
+        """loader returns the materials course_types dict (e.g. from data.json)"""
+        self._loader = loader
+        self.reload()
+
+        # Let operators refresh every worker with `kill -HUP`, unless the server owns SIGHUP
+        if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+            if signal.getsignal(signal.SIGHUP) == signal.SIG_DFL:
+                signal.signal(signal.SIGHUP, lambda signum, frame: self.reload())
+
+    @property
+    def current(self):
+        return self._catalog
+
+    def reload(self):
+        """Rebuild the catalog; keeps the previous one if the new data is invalid"""
+        with self._lock:
+            try:
+                catalog = Catalog(self._loader())
+            except Exception as e:
+                logger.error(f"Error building course catalog: {str(e)}")
+                if self._catalog is None:
+                    raise
+                return False
+            self._catalog = catalog
+            logger.info("Course catalog loaded")
+            return True
+
+
+# Global catalog instance
+catalog = CatalogRegistry()
@@ -0,0 +1,271 @@
+# Resumable chunked uploads for large question papers
+#
+# Protocol (see the /api/uploads routes in app.py):
+#   POST   /api/uploads                        -> upload_id, chunk_size, total_chunks
+#   PUT    /api/uploads/<id>/chunks/<n>        body = chunk n, X-Chunk-SHA256 = its hex digest
+#   GET    /api/uploads/<id>                   -> which chunks have arrived (for resuming)
+#   POST   /api/uploads/<id>/finalize          -> creates the File like a normal upload
+#   DELETE /api/uploads/<id>                   -> abandons the upload
+#
+# Each upload lives in instance/chunks/<id>/, outside the served uploads folder
+# since the manifest names its owner: "data.part" is preallocated to the
+# final size and every chunk is written straight to its offset, so nothing is
+# concatenated at the end; "manifest.json" records metadata and the checksum of
+# each chunk received. While chunks arrive in order the worker also keeps a
+# running SHA-256, so finalizing usually needs no second read of the file.
+#
+# Finalizing and cancelling hold a per-upload FileLock, and the manifest is
+# marked finalized before the File is created, so a repeated finalize request
+# (from any worker) cannot add the same upload twice.
+
+import os
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager, ExitStack
+from json_store import JsonDocument, FileLock, json_cache
+from ingest import IngestedFile, sniff_mimetype, SNIFF_BYTES, CHUNK_SIZE as READ_SIZE
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_ID_LENGTH = 32
+
+
+class ChunkedUploadError(ValueError):
+    """Client error in the chunked upload protocol"""
+
+
+class ChunkedUploads:
+    def __init__(self, app=None):
+        self.root = os.path.join('instance', 'chunks')
+        self.chunk_size = 5 * 1024 * 1024
+        self.max_size = 500 * 1024 * 1024
+        self.ttl = 24 * 3600
+        self._hashers = {}  # upload_id -> (next chunk index, running sha256) in this worker
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.root = app.config.get('CHUNKED_UPLOAD_DIR') or os.path.join(app.instance_path, 'chunks')
+        self.chunk_size = app.config.get('CHUNKED_UPLOAD_CHUNK_SIZE', self.chunk_size)
+        self.max_size = app.config.get('CHUNKED_UPLOAD_MAX_SIZE', self.max_size)
+        self.ttl = app.config.get('CHUNKED_UPLOAD_TTL', self.ttl)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _directory(self, upload_id):
+        if len(upload_id) != UPLOAD_ID_LENGTH or not all(c in '0123456789abcdef' for c in upload_id):
+            raise ChunkedUploadError('Unknown upload')
+        return os.path.join(self.root, upload_id)
+
+    def _manifest(self, upload_id):
+        directory = self._directory(upload_id)
+        if not os.path.isdir(directory):
+            raise ChunkedUploadError('Unknown upload')
+        return JsonDocument(os.path.join(directory, 'manifest.json'), dict)
+
+    def create(self, owner_id, filename, size, metadata):
+        """Start an upload of size bytes; returns its manifest"""
+        if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+            raise ChunkedUploadError('File size must be a positive number of bytes')
+        if size > self.max_size:
+            raise ChunkedUploadError(f'File is larger than {self.max_size // (1024 * 1024)} MB')
+
+        self.purge_expired()
+
+        upload_id = uuid.uuid4().hex
+        directory = os.path.join(self.root, upload_id)
+        os.makedirs(directory)
+        with open(os.path.join(directory, 'data.part'), 'wb') as f:
+            f.truncate(size)
+
+        manifest = {
+            'upload_id': upload_id,
+            'owner_id': owner_id,
+            'filename': filename,
+            'size': size,
+            'chunk_size': self.chunk_size,
+            'total_chunks': -(-size // self.chunk_size),
+            'metadata': metadata,
+            'chunks': {},  # str(index) -> sha256 hex
+            'created_at': time.time()
+        }
+        self._manifest(upload_id).save(manifest)
+        return manifest
+
+    def get(self, upload_id, owner_id):
+        manifest = self._manifest(upload_id).load(strict=True)
+        if manifest.get('owner_id') != owner_id:
+            raise ChunkedUploadError('Unknown upload')
+        return manifest
+
+    @staticmethod
+    def status(manifest):
+        received = sorted(int(index) for index in manifest['chunks'])
+        return {
+            'upload_id': manifest['upload_id'],
+            'size': manifest['size'],
+            'chunk_size': manifest['chunk_size'],
+            'total_chunks': manifest['total_chunks'],
+            'received': received,
+            'missing': [i for i in range(manifest['total_chunks']) if str(i) not in manifest['chunks']]
+        }
+
+    def write_chunk(self, upload_id, owner_id, index, stream, checksum):
+        """Write chunk index from stream at its offset after checking length and SHA-256"""
+        manifest = self.get(upload_id, owner_id)
+        if manifest.get('finalized'):
+            raise ChunkedUploadError('Upload is already finalized')
+        if not 0 <= index < manifest['total_chunks']:
+            raise ChunkedUploadError('Chunk index out of range')
+        if not checksum:
+            raise ChunkedUploadError('X-Chunk-SHA256 header is required')
+
+        offset = index * manifest['chunk_size']
+        expected = min(manifest['chunk_size'], manifest['size'] - offset)
+
+        # Read and verify the whole chunk before touching data.part, so a bad
+        # retry never overwrites good bytes
+        sha = hashlib.sha256()
+        body = bytearray()
+        for piece in iter(lambda: stream.read(min(READ_SIZE, expected + 1 - len(body))), b''):
+            body += piece
+            if len(body) > expected:
+                break
+        if len(body) != expected:
+            raise ChunkedUploadError(f'Chunk {index} must be {expected} bytes, got {len(body)}')
+        sha.update(body)
+        if sha.hexdigest() != checksum.strip().lower():
+            raise ChunkedUploadError(f'Checksum mismatch for chunk {index}')
+
+        directory = self._directory(upload_id)
+        with open(os.path.join(directory, 'data.part'), 'r+b') as f:
+            f.seek(offset)
+            f.write(body)
+
+        document = self._manifest(upload_id)
+        with document.lock():
+            manifest = document.load(strict=True)
+            previous = manifest['chunks'].get(str(index))
+            manifest['chunks'][str(index)] = sha.hexdigest()
+            document.save(manifest)
+
+        self._advance_hasher(upload_id, index, body, replaced=previous not in (None, sha.hexdigest()))
+        return manifest
+
+    def _advance_hasher(self, upload_id, index, body, replaced=False):
+        with self._lock:
+            next_index, sha = self._hashers.get(upload_id, (0, None))
+            if index != next_index:
+                if index > next_index or replaced:
+                    # A gap, or bytes already hashed changed; the running hash can no longer be trusted
+                    self._hashers[upload_id] = (-1, None)
+                return
+            sha = sha or hashlib.sha256()
+            sha.update(body)
+            self._hashers[upload_id] = (next_index + 1, sha)
+
+    def assemble(self, upload_id, owner_id):
+        """Check every chunk arrived; returns (manifest, IngestedFile for the assembled data)"""
+        manifest = self.get(upload_id, owner_id)
+        status = self.status(manifest)
+        if status['missing']:
+            raise ChunkedUploadError(f"{len(status['missing'])} chunks are still missing")
+
+        path = os.path.join(self._directory(upload_id), 'data.part')
+        with self._lock:
+            next_index, sha = self._hashers.pop(upload_id, (0, None))
+
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+            if sha is None or next_index != manifest['total_chunks']:
+                # Chunks came out of order or through another worker: hash the file once
+                sha = hashlib.sha256(head)
+                for piece in iter(lambda: f.read(READ_SIZE), b''):
+                    sha.update(piece)
+
+        mimetype = sniff_mimetype(head, manifest['filename'])
+        return manifest, IngestedFile(path, sha.hexdigest(), manifest['size'], mimetype)
+
+    @contextmanager
+    def _held(self, upload_id):
+        """Hold the upload's finalize lock, across threads and workers"""
+        directory = self._directory(upload_id)
+        with ExitStack() as stack:
+            try:
+                stack.enter_context(FileLock(os.path.join(directory, 'upload.lock')).hold())
+            except FileNotFoundError:
+                raise ChunkedUploadError('Unknown upload')
+            # Whoever held it before may have finalized or cancelled the upload
+            if not os.path.exists(os.path.join(directory, 'manifest.json')):
+                raise ChunkedUploadError('Unknown upload')
+            yield
+
+    def _set_finalized(self, upload_id, finalized):
+        document = self._manifest(upload_id)
+        with document.lock():
+            manifest = document.load(strict=True)
+            manifest['finalized'] = finalized
+            document.save(manifest)
+
+    @contextmanager
+    def finalizing(self, upload_id, owner_id):
+        """Assemble an upload and yield (manifest, IngestedFile) to store it
+
+        The upload is removed once the block completes; if the block raises it
+        is left in place, unfinalized, so the client can try again.
+        """
+        with self._held(upload_id):
+            manifest = self.get(upload_id, owner_id)
+            if manifest.get('finalized'):
+                raise ChunkedUploadError('Upload is already finalized')
+            manifest, ingested = self.assemble(upload_id, owner_id)
+            self._set_finalized(upload_id, True)
+            try:
+                yield manifest, ingested
+            except Exception:
+                if os.path.exists(os.path.join(self._directory(upload_id), 'data.part')):
+                    self._set_finalized(upload_id, False)
+                raise
+            self.discard(upload_id)
+
+    def cancel(self, upload_id, owner_id):
+        """Abandon an upload unless it is being finalized"""
+        with self._held(upload_id):
+            manifest = self.get(upload_id, owner_id)
+            if manifest.get('finalized'):
+                raise ChunkedUploadError('Upload is already finalized')
+            self.discard(upload_id)
+
+    def discard(self, upload_id):
+        """Remove an upload's chunks and manifest"""
+        directory = self._directory(upload_id)
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+        json_cache.invalidate(os.path.join(directory, 'manifest.json'))
+        for name in ('data.part', 'manifest.json', 'manifest.json.lock', 'upload.lock'):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+        try:
+            os.rmdir(directory)
+        except OSError as e:
+            logger.warning(f"Could not remove chunk directory {directory}: {str(e)}")
+
+    def purge_expired(self):
+        """Drop uploads nobody has touched for CHUNKED_UPLOAD_TTL seconds"""
+        cutoff = time.time() - self.ttl
+        for upload_id in os.listdir(self.root):
+            directory = os.path.join(self.root, upload_id)
+            try:
+                if os.path.getmtime(os.path.join(directory, 'manifest.json')) < cutoff:
+                    self.discard(upload_id)
+            except (OSError, ChunkedUploadError):
+                continue
+
+
+# Global chunked upload store instance
+chunked_uploads = ChunkedUploads()
@@ -0,0 +1,82 @@
+# Stand-in for the mail API during development and manual testing
+#
+#     python dev_mail_server.py --port 8025
+#     MAIL_API_URL=http://127.0.0.1:8025/send REPL_IDENTITY=dev python main.py
+#
+# Accepts the same JSON POST as the real API, prints the recipient and subject
+# and saves each message to instance/dev_mail/. --fail-rate answers that share
+# of requests with 503 and --delay sleeps before answering, to watch the email
+# outbox retry and back off; --reject answers every request with 400.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+counter = itertools.count(1)
+
+
+def make_handler(options):
+    class MailHandler(BaseHTTPRequestHandler):
+        def _answer(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                message = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return self._answer(400, {'error': 'Body is not JSON'})
+
+            if options.delay:
+                time.sleep(options.delay)
+            if options.reject:
+                return self._answer(400, {'error': 'Rejected by --reject'})
+            if random.random() < options.fail_rate:
+                return self._answer(503, {'error': 'Simulated outage'})
+            if not message.get('to') or not message.get('subject'):
+                return self._answer(400, {'error': 'to and subject are required'})
+
+            number = next(counter)
+            with open(os.path.join(options.spool, f"{number:05d}.json"), 'w') as f:
+                json.dump(message, f, indent=2)
+            print(f"[{number}] to {message['to']}: {message['subject']}", flush=True)
+            self._answer(200, {'id': number})
+
+        def log_message(self, format, *args):
+            pass
+
+    return MailHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the mail API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--spool', default=os.path.join('instance', 'dev_mail'))
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--delay', type=float, default=0.0)
+    parser.add_argument('--reject', action='store_true')
+    options = parser.parse_args()
+
+    os.makedirs(options.spool, exist_ok=True)
+    server = ThreadingHTTPServer((options.host, options.port), make_handler(options))
+    print(f"Dev mail server on http://{options.host}:{options.port}/, saving to {options.spool}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+# Outbox for emails sent by request handlers
+#
+# A request only inserts an OutboundEmail row; a background thread in each
+# worker process delivers due rows through the sender given to init_app. A row
+# is claimed by pushing its next_attempt_at forward with a conditional UPDATE,
+# so two workers never send the same message and a message claimed by a worker
+# that died is picked up again once the claim lapses.
+#
+# Failed deliveries are retried with exponential backoff (EMAIL_OUTBOX_BACKOFF,
+# doubling up to EMAIL_OUTBOX_BACKOFF_MAX). A message is dead-lettered (status
+# "dead", with the last error kept) after EMAIL_OUTBOX_MAX_ATTEMPTS tries, on a
+# permanent error from the mail API, or once it is older than
+# EMAIL_OUTBOX_MAX_AGE, since OTP codes expire anyway.
+
+import os
+import random
+import logging
+import threading
+from datetime import datetime, timedelta
+from models import db, OutboundEmail
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLAIM_SECONDS = 120  # A claimed message is retried after this if its worker never reports back
+
+
+class EmailDeliveryError(Exception):
+    """Sending failed; permanent errors are not retried"""
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class EmailOutbox:
+    def __init__(self, app=None, sender=None):
+        self.app = None
+        self.sender = None
+        self.max_attempts = 6
+        self.backoff = 5.0
+        self.backoff_max = 300.0
+        self.max_age = 600
+        self.poll_interval = 5.0
+        self.batch_size = 20
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, sender)
+
+    def init_app(self, app, sender):
+        """sender(to_email, subject, html, text) delivers one message or raises EmailDeliveryError"""
+        self.app = app
+        self.sender = sender
+        self.max_attempts = app.config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', self.max_attempts)
+        self.backoff = app.config.get('EMAIL_OUTBOX_BACKOFF', self.backoff)
+        self.backoff_max = app.config.get('EMAIL_OUTBOX_BACKOFF_MAX', self.backoff_max)
+        self.max_age = app.config.get('EMAIL_OUTBOX_MAX_AGE', self.max_age)
+        self.poll_interval = app.config.get('EMAIL_OUTBOX_POLL_INTERVAL', self.poll_interval)
+        # Each worker process starts its own delivery thread on its first request
+        app.before_request(self.start)
+
+    def enqueue(self, kind, to_email, subject, html_body, text_body):
+        """Queue a message for delivery; returns the OutboundEmail"""
+        message = OutboundEmail(
+            kind=kind,
+            to_email=to_email,
+            subject=subject,
+            html_body=html_body,
+            text_body=text_body
+        )
+        db.session.add(message)
+        db.session.commit()
+        metrics.increment('email.queued')
+        self.start()
+        self._wake.set()
+        return message
+
+    def start(self):
+        """Start the delivery thread in this process if it is not running"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    # Keep going while full batches come back
+                    while self.drain() == self.batch_size:
+                        pass
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Email outbox error: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    def _claim(self, message, now):
+        """Take a due message for this worker; False if another worker got it first"""
+        claimed = db.session.execute(
+            db.update(OutboundEmail)
+            .where(OutboundEmail.id == message.id,
+                   OutboundEmail.status == 'pending',
+                   OutboundEmail.next_attempt_at == message.next_attempt_at)
+            .values(next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS),
+                    attempts=OutboundEmail.attempts + 1)
+        ).rowcount == 1
+        db.session.commit()
+        return claimed
+
+    def _backoff(self, attempts):
+        delay = min(self.backoff_max, self.backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def drain(self):
+        """Try every due message once; returns how many were due"""
+        now = datetime.utcnow()
+        due = OutboundEmail.query.filter(
+            OutboundEmail.status == 'pending',
+            OutboundEmail.next_attempt_at <= now
+        ).order_by(OutboundEmail.next_attempt_at).limit(self.batch_size).all()
+
+        for message in due:
+            if not self._claim(message, now):
+                continue
+            db.session.refresh(message)
+
+            if message.created_at and (now - message.created_at).total_seconds() > self.max_age:
+                self._dead_letter(message, message.last_error or 'Expired before it could be sent')
+                continue
+
+            try:
+                self.sender(message.to_email, message.subject, message.html_body, message.text_body)
+            except EmailDeliveryError as e:
+                self._failed(message, str(e), e.permanent)
+                continue
+            except Exception as e:
+                self._failed(message, str(e), False)
+                continue
+
+            message.status = 'sent'
+            message.sent_at = datetime.utcnow()
+            message.last_error = None
+            # The bodies carry OTP codes; nothing needs them once delivered
+            message.html_body = None
+            message.text_body = None
+            db.session.commit()
+            metrics.increment('email.sent')
+        return len(due)
+
+    def _failed(self, message, error, permanent):
+        if permanent or message.attempts >= self.max_attempts:
+            self._dead_letter(message, error)
+            return
+        delay = self._backoff(message.attempts)
+        message.last_error = error
+        message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        db.session.commit()
+        metrics.increment('email.retried')
+        logger.warning(f"Email {message.id} to {message.to_email} failed (attempt {message.attempts}), "
+                       f"retrying in {delay:.0f}s: {error}")
+
+    def _dead_letter(self, message, error):
+        message.status = 'dead'
+        message.last_error = error
+        db.session.commit()
+        metrics.increment('email.dead')
+        logger.error(f"Email {message.id} ({message.kind}) to {message.to_email} dead-lettered "
+                     f"after {message.attempts} attempts: {error}")
+
+    def counts(self):
+        """Number of messages per status"""
+        rows = db.session.query(OutboundEmail.status, db.func.count(OutboundEmail.id)).group_by(OutboundEmail.status)
+        return dict(rows.all())
+
+
+# Global email outbox instance
+email_outbox = EmailOutbox()
@@ -1,15 +1,70 @@
 # Email service for OTP verification using Replit Mail API
 # Referenced from blueprint:replitmail integration
+#
+# Messages are queued in the email outbox and delivered by its background
+# thread, so a slow mail API never holds up a request. MAIL_API_URL points the
+# service at another endpoint, e.g. dev_mail_server.py during development.
+#
+# Deliveries share one requests.Session, so the TCP and TLS handshake with the
+# mail API is paid once per pooled connection instead of once per email. The
+# adapter retries connection failures and 502/503/504 answers; read errors are
+# left to the outbox, as the API may already have accepted the message.
+#
+# Bodies come from templates/emails/. Each template is compiled once in
+# init_app and rendered with a placeholder per field; a send only joins the
+# pre-rendered pieces with its (escaped) values.
 
 import os
+import re
+import html
+import time
 import requests
 import json
 from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from models import db
+from email_outbox import email_outbox, EmailDeliveryError
+from metrics import metrics
+
+DEFAULT_MAIL_API_URL = "https://connectors.replit.com/api/v2/mailer/send"
+
+# Template name -> fields substituted per send
+EMAIL_TEMPLATES = {
+    'otp': ('otp_code', 'user_name', 'expiry_minutes'),
+    'verification_success': ('user_name',),
+}
+
+PLACEHOLDER = re.compile(r'\x00(\w+)\x00')
+
+
+class PrerenderedTemplate:
+    """Template rendered once with placeholders; render() only splices in the values"""
+    
+    def __init__(self, template, fields, escape_value):
+        marked = template.render(**{field: f"\x00{field}\x00" for field in fields})
+        parts = PLACEHOLDER.split(marked)
+        self.static_parts = parts[0::2]
+        self.fields = parts[1::2]
+        self.escape_value = escape_value
+    
+    def render(self, **values):
+        escape_value = self.escape_value
+        pieces = [self.static_parts[0]]
+        for field, static in zip(self.fields, self.static_parts[1:]):
+            pieces.append(escape_value(values[field]))
+            pieces.append(static)
+        return ''.join(pieces)
+
 
 class EmailService:
     def __init__(self, app=None):
         self.app = app
         self.auth_token = None
+        self.api_url = DEFAULT_MAIL_API_URL
+        self.timeout = (3.05, 20)  # (connect, read) seconds
+        self.session = None
+        self.templates = {}  # name -> (html PrerenderedTemplate, text PrerenderedTemplate)
         if app is not None:
             self.init_app(app)
     
@@ -24,18 +79,48 @@ class EmailService:
         elif web_repl_renewal:
             self.auth_token = f"depl {web_repl_renewal}"
         else:
-            current_app.logger.warning("No Replit authentication token found")
+            app.logger.warning("No Replit authentication token found")
             self.auth_token = None
         
+        self.api_url = app.config.get('MAIL_API_URL', self.api_url)
+        self.timeout = (app.config.get('MAIL_CONNECT_TIMEOUT', self.timeout[0]),
+                        app.config.get('MAIL_READ_TIMEOUT', self.timeout[1]))
+        self.session = self._create_session(app.config.get('MAIL_POOL_SIZE', 4))
+        self.templates = {
+            name: (
+                PrerenderedTemplate(app.jinja_env.get_template(f'emails/{name}.html'), fields, lambda v: html.escape(str(v))),
+                PrerenderedTemplate(app.jinja_env.get_template(f'emails/{name}.txt'), fields, str)
+            )
+            for name, fields in EMAIL_TEMPLATES.items()
+        }
         self.app = app
+        email_outbox.init_app(app, self.deliver)
     
-    def _send_replit_email(self, to_email, subject, html_content, text_content):
-        """Send email using Replit's mail API"""
+    @staticmethod
+    def _create_session(pool_size):
+        """Keep-alive session with a connection pool and retries for the mail API"""
+        retry = Retry(
+            total=3,
+            connect=3,
+            read=0,
+            status=2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({'POST'}),
+            backoff_factor=0.5,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def deliver(self, to_email, subject, html_content, text_content):
+        """Send one email through the mail API now; raises EmailDeliveryError on failure"""
         if not self.auth_token:
-            current_app.logger.error("No authentication token available for email service")
-            return False
+            raise EmailDeliveryError("No authentication token available for email service", permanent=True)
         
-        url = "https://connectors.replit.com/api/v2/mailer/send"
         headers = {
             "Content-Type": "application/json",
             "X_REPLIT_TOKEN": self.auth_token,
@@ -48,159 +133,49 @@ class EmailService:
             "text": text_content
         }
         
+        started = time.perf_counter()
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                current_app.logger.info(f"Email sent successfully to {to_email}: {result}")
-                return True
-            else:
-                current_app.logger.error(f"Failed to send email to {to_email}: {response.status_code} - {response.text}")
-                return False
-                
+            response = self.session.post(self.api_url, headers=headers, json=data, timeout=self.timeout)
         except requests.exceptions.RequestException as e:
-            current_app.logger.error(f"Request error sending email to {to_email}: {str(e)}")
-            return False
+            metrics.observe('email.send_failed_seconds', time.perf_counter() - started)
+            raise EmailDeliveryError(f"Request error: {str(e)}")
+        elapsed = time.perf_counter() - started
+        metrics.observe('email.send_seconds', elapsed)
+        
+        if response.status_code != 200:
+            # Client errors other than timeouts and rate limits will fail the same way again
+            permanent = 400 <= response.status_code < 500 and response.status_code not in (408, 429)
+            raise EmailDeliveryError(f"{response.status_code} - {response.text[:500]}", permanent=permanent)
+        
+        current_app.logger.info(f"Email sent successfully to {to_email} in {elapsed * 1000:.0f} ms: {response.text[:200]}")
+    
+    def _render(self, name, **values):
+        """(html, text) bodies of an email template"""
+        html_template, text_template = self.templates[name]
+        return html_template.render(**values), text_template.render(**values)
+    
+    def _queue(self, kind, to_email, subject, html_content, text_content):
+        """Put an email in the outbox; True once it is queued"""
+        try:
+            email_outbox.enqueue(kind, to_email, subject, html_content, text_content)
+            return True
         except Exception as e:
-            current_app.logger.error(f"Unexpected error sending email to {to_email}: {str(e)}")
+            db.session.rollback()
+            current_app.logger.error(f"Could not queue email to {to_email}: {str(e)}")
             return False
     
-    def send_otp_email(self, recipient_email, otp_code, user_name):
+    def send_otp_email(self, recipient_email, otp_code, user_name, expiry_minutes=10):
         """Send OTP verification email to SSN email address"""
         if not self.auth_token:
             current_app.logger.error("Email service not properly initialized - no auth token")
             return False
         
         subject = "SSN Email Verification - College Portal"
+        html_body, text_body = self._render('otp', otp_code=otp_code, user_name=user_name,
+                                            expiry_minutes=expiry_minutes)
         
-        # Create HTML email content
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <title>SSN Email Verification</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                    max-width: 600px;
-                    margin: 0 auto;
-                    padding: 20px;
-                }}
-                .header {{
-                    background-color: #0d6efd;
-                    color: white;
-                    padding: 20px;
-                    text-align: center;
-                    border-radius: 8px 8px 0 0;
-                }}
-                .content {{
-                    background-color: #f8f9fa;
-                    padding: 30px;
-                    border-radius: 0 0 8px 8px;
-                }}
-                .otp-code {{
-                    background-color: #fff;
-                    border: 2px solid #0d6efd;
-                    border-radius: 8px;
-                    padding: 20px;
-                    text-align: center;
-                    margin: 20px 0;
-                }}
-                .otp-number {{
-                    font-size: 36px;
-                    font-weight: bold;
-                    color: #0d6efd;
-                    letter-spacing: 8px;
-                }}
-                .warning {{
-                    background-color: #fff3cd;
-                    border-left: 4px solid #ffc107;
-                    padding: 15px;
-                    margin: 20px 0;
-                }}
-                .footer {{
-                    text-align: center;
-                    color: #6c757d;
-                    font-size: 14px;
-                    margin-top: 20px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h2>🎓 College Materials & PYQs Portal</h2>
-                <h3>SSN Email Verification</h3>
-            </div>
-            
-            <div class="content">
-                <p>Hello <strong>{user_name}</strong>,</p>
-                
-                <p>You have requested to verify your SSN email address to gain <strong>Contributor</strong> privileges on the College Materials & PYQs Portal.</p>
-                
-                <div class="otp-code">
-                    <p>Your verification code is:</p>
-                    <div class="otp-number">{otp_code}</div>
-                </div>
-                
-                <p>Please enter this code on the verification page to complete the process.</p>
-                
-                <div class="warning">
-                    <strong>⚠️ Important Security Notes:</strong>
-                    <ul>
-                        <li>This code will expire in <strong>10 minutes</strong></li>
-                        <li>Do not share this code with anyone</li>
-                        <li>Only use this code on the official College Portal website</li>
-                        <li>We will never ask for your password</li>
-                    </ul>
-                </div>
-                
-                <p>After verification, you will have access to:</p>
-                <ul>
-                    <li>✅ Upload academic files and materials</li>
-                    <li>✅ Edit and manage content</li>
-                    <li>✅ Delete inappropriate content</li>
-                    <li>✅ Full contributor privileges</li>
-                </ul>
-                
-                <p>If you didn't request this verification, please ignore this email.</p>
-            </div>
-            
-            <div class="footer">
-                <p>This is an automated email from College Materials & PYQs Portal</p>
-                <p>Please do not reply to this email</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Create plain text version
-        text_body = f"""
-        SSN Email Verification - College Portal
-        
-        Hello {user_name},
-        
-        You have requested to verify your SSN email address to gain Contributor privileges.
-        
-        Your verification code is: {otp_code}
-        
-        Please enter this code on the verification page within 10 minutes.
-        
-        SECURITY NOTES:
-        - This code expires in 10 minutes
-        - Do not share this code with anyone
-        - We will never ask for your password
-        
-        If you didn't request this verification, please ignore this email.
-        
-        College Materials & PYQs Portal
-        """
-        
-        # Use the new Replit email API
-        return self._send_replit_email(recipient_email, subject, html_body, text_body)
+        # Delivered in the background by the email outbox
+        return self._queue('otp', recipient_email, subject, html_body, text_body)
     
     def send_verification_success_email(self, recipient_email, user_name):
         """Send confirmation email after successful verification"""
@@ -209,73 +184,10 @@ class EmailService:
             return False
         
         subject = "Welcome to College Portal - Contributor Access Granted"
+        html_body, text_body = self._render('verification_success', user_name=user_name)
         
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <title>Contributor Access Granted</title>
-        </head>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background-color: #28a745; color: white; padding: 20px; text-align: center; border-radius: 8px;">
-                <h2>🎉 Verification Successful!</h2>
-                <h3>Welcome to the Contributors Team</h3>
-            </div>
-            
-            <div style="background-color: #f8f9fa; padding: 30px; border-radius: 8px; margin-top: 10px;">
-                <p>Congratulations <strong>{user_name}</strong>!</p>
-                
-                <p>Your SSN email address has been successfully verified. You now have <strong>Contributor</strong> access to the College Materials & PYQs Portal.</p>
-                
-                <h4>Your new privileges include:</h4>
-                <ul>
-                    <li>✅ Upload academic files, question papers, and study materials</li>
-                    <li>✅ Edit and update existing content</li>
-                    <li>✅ Delete inappropriate or outdated content</li>
-                    <li>✅ Manage events, clubs, and campus information</li>
-                    <li>✅ Full administrative access to help build the portal</li>
-                </ul>
-                
-                <p>Thank you for contributing to the academic community at SSN!</p>
-                
-                <div style="text-align: center; margin: 30px 0;">
-                    <p style="background-color: #e9ecef; padding: 15px; border-radius: 8px;">
-                        <strong>🚀 Start contributing today!</strong><br>
-                        Visit the portal and click on your name in the navigation bar to access upload features.
-                    </p>
-                </div>
-                
-                <p>Best regards,<br>College Materials & PYQs Portal Team</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        text_body = f"""
-        Welcome to College Portal - Contributor Access Granted
-        
-        Congratulations {user_name}!
-        
-        Your SSN email address has been successfully verified. You now have Contributor access to the College Materials & PYQs Portal.
-        
-        Your new privileges include:
-        - Upload academic files, question papers, and study materials
-        - Edit and update existing content
-        - Delete inappropriate or outdated content
-        - Manage events, clubs, and campus information
-        - Full administrative access to help build the portal
-        
-        Thank you for contributing to the academic community at SSN!
-        
-        Start contributing today! Visit the portal and access upload features.
-        
-        Best regards,
-        College Materials & PYQs Portal Team
-        """
-        
-        # Use the new Replit email API
-        return self._send_replit_email(recipient_email, subject, html_body, text_body)
+        # Delivered in the background by the email outbox
+        return self._queue('verification_success', recipient_email, subject, html_body, text_body)
 
 # Global email service instance
 email_service = EmailService()
\ No newline at end of file
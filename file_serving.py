@@ -0,0 +1,303 @@
+# Serving stored files (uploads, syllabus, bus routes, photos and posters)
+#
+# Every file gets a strong ETag derived from the SHA-256 of its content, so a
+# repeat download with If-None-Match (or If-Modified-Since, from the file mtime)
+# is answered with 304 instead of the whole body. Hashes are remembered per
+# (path, mtime, size, inode); a file is only re-hashed after it changes on disk.
+#
+# Byte ranges (RFC 9110) are answered here rather than by Werkzeug, which
+# applies Range before If-None-Match and refuses suffixes longer than the file.
+# Ranges are merged where they overlap; several are sent as multipart/byteranges.
+# If-None-Match/If-Modified-Since are evaluated first, then If-Range; malformed
+# Range headers are ignored, and unsatisfiable ranges (including the zero-length
+# suffix "-0") get 416 "bytes */size".
+#
+# With FILE_OFFLOAD = 'x-accel' (nginx) or 'x-sendfile' (Apache mod_xsendfile)
+# the route only does its checks and answers 304s; the body is left to the
+# proxy, which also handles ranges. For nginx, map FILE_OFFLOAD_PREFIX to the
+# uploads folder with an internal location:
+#
+#     location /_protected/ {
+#         internal;
+#         alias /srv/portal/uploads/;
+#     }
+
+import os
+import hashlib
+import secrets
+import threading
+from urllib.parse import quote
+from collections import OrderedDict
+from flask import request, send_file, Response
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.http import is_resource_modified
+from blob_store import blob_store
+
+HASH_CHUNK_SIZE = 1024 * 1024
+RANGE_CHUNK_SIZE = 64 * 1024
+MAX_RANGES = 16  # More ranges than this are ignored and the whole file is sent
+
+
+class ContentHashCache:
+    """SHA-256 of files on disk, recomputed only when the file changes"""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # abspath -> (stat token, hex digest)
+        self._lock = threading.Lock()
+
+    def digest(self, path):
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        token = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        sha = hashlib.sha256()
+        with open(key, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+
+        with self._lock:
+            self._entries[key] = (token, digest)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return digest
+
+
+# Global content hash cache instance
+content_hashes = ContentHashCache()
+
+
+def file_etag(path):
+    """Strong ETag value for a stored file; free for blobs, whose name is their hash"""
+    return blob_store.digest_of(path) or content_hashes.digest(path)
+
+
+class FileOffload:
+    """Hands file bodies to the front proxy instead of streaming them from Python"""
+
+    def __init__(self, app=None):
+        self.mode = None
+        self.root = None
+        self.prefix = '/_protected/'
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        mode = app.config.get('FILE_OFFLOAD', 'none')
+        if mode not in ('none', 'x-accel', 'x-sendfile'):
+            app.logger.warning(f"Unknown FILE_OFFLOAD '{mode}', serving files from Python")
+            mode = 'none'
+        self.mode = None if mode == 'none' else mode
+        self.root = os.path.abspath(app.config.get('FILE_OFFLOAD_ROOT') or app.config['UPLOAD_FOLDER'])
+        self.prefix = app.config.get('FILE_OFFLOAD_PREFIX', self.prefix)
+
+    def internal_location(self, path):
+        """Header value telling the proxy which file to send, or None to serve it here"""
+        if self.mode is None:
+            return None
+        path = os.path.abspath(path)
+        if os.path.commonpath([path, self.root]) != self.root:
+            return None
+        if self.mode == 'x-sendfile':
+            return path
+        relative = os.path.relpath(path, self.root).replace(os.sep, '/')
+        return self.prefix.rstrip('/') + '/' + quote(relative)
+
+    def header_name(self):
+        return 'X-Accel-Redirect' if self.mode == 'x-accel' else 'X-Sendfile'
+
+
+# Global file offload instance
+file_offload = FileOffload()
+
+
+def _without_range(environ):
+    environ = dict(environ)
+    environ.pop('HTTP_RANGE', None)
+    return environ
+
+
+def _offloaded_response(response, location):
+    """Empty response carrying the file's headers plus the proxy's internal redirect"""
+    response.close()
+    offloaded = Response(status=200)
+    offloaded.automatically_set_content_length = False
+    for header in ('Content-Type', 'Content-Disposition', 'ETag', 'Last-Modified', 'Cache-Control'):
+        if header in response.headers:
+            offloaded.headers[header] = response.headers[header]
+    offloaded.headers[file_offload.header_name()] = location
+
+    # 304s are answered here; ranges are left to the proxy
+    offloaded.make_conditional(_without_range(request.environ))
+    if offloaded.status_code != 200:
+        offloaded.headers.pop(file_offload.header_name(), None)
+    return offloaded
+
+
+def _parse_byte_ranges(header):
+    """(start, stop) pairs of a Range header, stop None for open ranges; None if malformed
+
+    Unlike Werkzeug's parser this accepts ranges out of order or overlapping.
+    Zero-length suffixes ("-0") can never be satisfied and are left out, so the
+    list may be empty.
+    """
+    units, _, spec = header.partition('=')
+    if units.strip().lower() != 'bytes':
+        return None
+
+    ranges = []
+    found = False
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        found = True
+        first, dash, last = item.partition('-')
+        first, last = first.strip(), last.strip()
+        if not dash or not (first or last):
+            return None
+        try:
+            if not first:
+                suffix = int(last)
+                if suffix < 0:
+                    return None
+                if suffix > 0:
+                    ranges.append((-suffix, None))
+            else:
+                start = int(first)
+                stop = int(last) + 1 if last else None
+                if stop is not None and stop <= start:
+                    return None
+                ranges.append((start, stop))
+        except ValueError:
+            return None
+    return ranges if found else None
+
+
+def _satisfiable_ranges(byte_ranges, size):
+    """Sorted, merged (start, stop) pairs that fall inside the file"""
+    ranges = []
+    for start, stop in byte_ranges:
+        if stop is None:
+            stop = size
+            if start < 0:
+                start = max(size + start, 0)
+        stop = min(stop, size)
+        if start < stop:
+            ranges.append((start, stop))
+
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def _if_range_matches(etag, last_modified):
+    """False when If-Range names another version of the file"""
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return last_modified is not None and last_modified <= if_range.date
+    return True
+
+
+def _range_not_satisfiable(size):
+    return Response(status=416, headers={'Content-Range': f"bytes */{size}"})
+
+
+def _partial_response(path, response, ranges, size):
+    """206 response for ranges of path; multipart/byteranges when there are several"""
+    if len(ranges) == 1:
+        part_headers = [b'']
+        closing = b''
+        mimetype = response.mimetype
+    else:
+        boundary = secrets.token_hex(16)
+        part_headers = [
+            f"\r\n--{boundary}\r\nContent-Type: {response.mimetype}\r\n"
+            f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n".encode()
+            for start, stop in ranges
+        ]
+        closing = f"\r\n--{boundary}--\r\n".encode()
+        mimetype = f"multipart/byteranges; boundary={boundary}"
+    length = sum(len(header) + stop - start for header, (start, stop) in zip(part_headers, ranges)) + len(closing)
+
+    def generate():
+        with open(path, 'rb') as f:
+            for header, (start, stop) in zip(part_headers, ranges):
+                yield header
+                f.seek(start)
+                remaining = stop - start
+                while remaining > 0:
+                    chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        return
+                    remaining -= len(chunk)
+                    yield chunk
+        yield closing
+
+    partial = Response(generate(), status=206, mimetype=mimetype)
+    for header in ('ETag', 'Last-Modified', 'Cache-Control', 'Content-Disposition'):
+        if header in response.headers:
+            partial.headers[header] = response.headers[header]
+    if len(ranges) == 1:
+        partial.headers['Content-Range'] = f"bytes {ranges[0][0]}-{ranges[0][1] - 1}/{size}"
+    partial.accept_ranges = 'bytes'
+    partial.content_length = length
+    return partial
+
+
+def serve_file(path, as_attachment=False, download_name=None, mimetype=None):
+    """send_file with a content ETag, conditional requests and byte ranges"""
+    etag = file_etag(path)
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        etag=etag,
+        conditional=False
+    )
+    size = response.content_length
+
+    location = file_offload.internal_location(path)
+    if location is not None:
+        return _offloaded_response(response, location)
+
+    header = request.headers.get('Range')
+    byte_ranges = _parse_byte_ranges(header) if header else None
+    if header and byte_ranges is None:
+        # Malformed or non-byte ranges are ignored and the whole file is sent
+        return response.make_conditional(_without_range(request.environ), accept_ranges=True, complete_length=size)
+
+    if byte_ranges is None or not size or request.method not in ('GET', 'HEAD'):
+        try:
+            return response.make_conditional(request, accept_ranges=True, complete_length=size)
+        except RequestedRangeNotSatisfiable:
+            response.close()
+            return _range_not_satisfiable(size)
+
+    # Conditional headers other than Range are evaluated first
+    environ = _without_range(request.environ)
+    if (len(byte_ranges) > MAX_RANGES
+            or not is_resource_modified(environ, etag, last_modified=response.last_modified)
+            or not _if_range_matches(etag, response.last_modified)):
+        return response.make_conditional(environ, accept_ranges=True, complete_length=size)
+
+    response.close()
+    ranges = _satisfiable_ranges(byte_ranges, size)
+    if not ranges:
+        return _range_not_satisfiable(size)
+    return _partial_response(path, response, ranges, size)
@@ -0,0 +1,66 @@
+# Set of files hidden because of user reports
+#
+# Folds the anonymous reports in reports.json and the File.auto_hidden flags in
+# the database into one frozenset of "{type}_{id}" keys, so is_hidden() is a set
+# lookup instead of a JSON read per file. The set is rebuilt when this process
+# changes reports (invalidate()) and at most every HIDDEN_FILES_TTL seconds to
+# pick up reports made through other workers.
+
+import time
+import logging
+import threading
+from models import db, File
+
+logger = logging.getLogger(__name__)
+
+
+class HiddenFileSet:
+    def __init__(self, reports_document, app=None):
+        self.reports_document = reports_document
+        self.ttl = 5.0
+        self._keys = frozenset()
+        self._loaded_at = None  # None forces a rebuild on next use
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('HIDDEN_FILES_TTL', self.ttl)
+
+    def _build(self):
+        keys = set()
+
+        reports_data = self.reports_document.load()
+        threshold = reports_data.get("report_threshold", 3)
+        for file_key, reports in reports_data.get("reports", {}).items():
+            if len(reports) >= threshold:
+                keys.add(file_key)
+
+        # Database reports only exist for question papers; File keeps the flag up to date
+        rows = db.session.query(File.id).filter(File.auto_hidden == True)
+        keys.update(f"QP_{file_id}" for (file_id,) in rows)
+
+        return frozenset(keys)
+
+    def keys(self):
+        """Current set of hidden "{type}_{id}" keys"""
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.ttl:
+            return self._keys
+
+        with self._lock:
+            # Another thread may have rebuilt it while we waited
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+                try:
+                    self._keys = self._build()
+                except Exception as e:
+                    logger.error(f"Error building hidden file set: {str(e)}")
+                self._loaded_at = time.monotonic()
+            return self._keys
+
+    def is_hidden(self, file_id, file_type='QP'):
+        return f"{file_type}_{file_id}" in self.keys()
+
+    def invalidate(self):
+        """Call after reports are created, reviewed or deleted"""
+        self._loaded_at = None
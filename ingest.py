@@ -0,0 +1,137 @@
+# Single-pass ingestion of uploaded files
+#
+# The upload stream is copied to a temporary file next to its destination in
+# fixed-size chunks. The same pass computes the SHA-256, the byte count and a
+# MIME type sniffed from the first bytes, so nothing has to re-read the file
+# afterwards. The temporary file is then renamed into place (or discarded).
+
+import os
+import errno
+import shutil
+import hashlib
+import mimetypes
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024
+SNIFF_BYTES = 512
+
+# Leading bytes -> MIME type; container formats are refined by extension below
+SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'Rar!\x1a\x07', 'application/vnd.rar'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),
+)
+
+# Office documents are ZIP (docx, pptx, xlsx) or OLE (doc, ppt, xls) containers
+CONTAINER_EXTENSIONS = {
+    'application/zip': ('.docx', '.pptx', '.xlsx'),
+    'application/x-ole-storage': ('.doc', '.ppt', '.xls'),
+}
+
+
+def sniff_mimetype(head, filename=''):
+    """MIME type from the first bytes of a file, using the name only to tell containers apart"""
+    guessed = mimetypes.guess_type(filename)[0] if filename else None
+    extension = os.path.splitext(filename)[1].lower()
+
+    for signature, mimetype in SIGNATURES:
+        if head.startswith(signature):
+            if extension in CONTAINER_EXTENSIONS.get(mimetype, ()) and guessed:
+                return guessed
+            if mimetype == 'application/x-ole-storage':
+                return 'application/octet-stream'
+            return mimetype
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+
+    try:
+        head.decode('utf-8')
+        return 'text/plain' if not guessed or guessed.startswith('text/') else guessed
+    except UnicodeDecodeError:
+        # A multi-byte character may be cut at the sniff boundary
+        if b'\x00' not in head and guessed and guessed.startswith('text/'):
+            return guessed
+    return 'application/octet-stream'
+
+
+def format_file_size(size):
+    """Human readable file size"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024.0:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
+
+
+class IngestedFile:
+    """An upload written to a temporary file, with its metadata"""
+
+    def __init__(self, tmp_path, digest, size, mimetype):
+        self.tmp_path = tmp_path
+        self.digest = digest
+        self.size = size
+        self.mimetype = mimetype
+
+    @property
+    def human_size(self):
+        return format_file_size(self.size)
+
+    def move_to(self, path):
+        """Atomically place the file at path"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        os.chmod(self.tmp_path, 0o644)
+        try:
+            os.replace(self.tmp_path, path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Assembled chunked uploads may sit on another filesystem: copy next to path, then rename
+            copy_path = f"{path}.{os.getpid()}.tmp"
+            shutil.copyfile(self.tmp_path, copy_path)
+            os.chmod(copy_path, 0o644)
+            os.replace(copy_path, path)
+            os.remove(self.tmp_path)
+        self.tmp_path = None
+
+    def discard(self):
+        if self.tmp_path:
+            try:
+                os.remove(self.tmp_path)
+            except OSError:
+                pass
+            self.tmp_path = None
+
+
+def ingest(source, directory, filename=''):
+    """Stream source (FileStorage or binary file object) into a temp file in directory
+
+    Returns an IngestedFile; call move_to() or discard() on it.
+    """
+    stream = getattr(source, 'stream', source)
+    filename = filename or getattr(source, 'filename', '') or ''
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload.', suffix='.tmp')
+    try:
+        sha = hashlib.sha256()
+        size = 0
+        head = b''
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                sha.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+        return IngestedFile(tmp_path, sha.hexdigest(), size, sniff_mimetype(head, filename))
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -13,7 +13,7 @@ from werkzeug.security import generate_password_hash
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app import app
-from models import db, Subject, File, User
+from models import db, Subject, File, User, FileComment, upgrade_schema
 
 # Sample subject data
 SUBJECT_DATA = {
@@ -167,6 +167,7 @@ def create_tables():
     with app.app_context():
         try:
             db.create_all()
+            upgrade_schema()
             print("Tables created successfully!")
         except Exception as e:
             print(f"Tables already exist or error creating tables: {str(e)}")
@@ -305,6 +306,128 @@ def migrate_existing_files():
         except Exception as e:
             print(f"Error migrating files: {str(e)}")
 
+def migrate_social_data():
+    """Move likes, dislikes and comments of question papers from data.json into the database (safe for repeated runs)"""
+    print("Migrating file votes and comments...")
+    
+    from app import load_data
+    
+    with app.app_context():
+        try:
+            existing_files = load_data().get('files', [])
+            db_files = {f.file_path: f for f in File.query.all()}
+            
+            migrated_count = 0
+            comment_rows = []
+            for file_data in existing_files:
+                likes = file_data.get('likes', 0) or 0
+                dislikes = file_data.get('dislikes', 0) or 0
+                comments = file_data.get('comments', [])
+                if not (likes or dislikes or comments):
+                    continue
+                
+                # JSON and database ids are separate sequences; the stored path ties them together
+                file_record = db_files.get(file_data.get('file_path'))
+                if not file_record:
+                    continue
+                
+                # Anything already counted means this file was migrated (or voted on) before
+                if file_record.likes or file_record.dislikes or file_record.comment_count:
+                    continue
+                
+                file_record.likes = likes
+                file_record.dislikes = dislikes
+                file_record.comment_count = len(comments)
+                for comment in comments:
+                    try:
+                        created_at = datetime.strptime(comment.get('date') or comment.get('timestamp') or '', '%Y-%m-%d %H:%M')
+                    except ValueError:
+                        created_at = datetime.utcnow()
+                    comment_rows.append({
+                        'file_id': file_record.id,
+                        'name': comment.get('name', 'Anonymous'),
+                        'comment': comment.get('comment') or comment.get('text', ''),
+                        'created_at': created_at
+                    })
+                migrated_count += 1
+            
+            if comment_rows:
+                db.session.execute(db.insert(FileComment), comment_rows)
+            db.session.commit()
+            print(f"Migrated votes and {len(comment_rows)} comments for {migrated_count} files!")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error migrating votes and comments: {str(e)}")
+
+def migrate_to_blob_store():
+    """Move stored question papers and syllabus files into the content-addressed blob store (safe for repeated runs)"""
+    print("Moving uploaded files into the blob store...")
+    
+    from app import data_document
+    from blob_store import blob_store
+    
+    with app.app_context():
+        try:
+            with blob_store.lock(), data_document.lock():
+                data = data_document.load(strict=True)
+                json_records = data.get('files', []) + data.get('syllabus_files', [])
+                question_papers = {id(record) for record in data.get('files', [])}
+                
+                paths = {record.get('file_path') for record in json_records}
+                paths.update(f.file_path for f in File.query.all())
+                
+                moved = {}  # old path -> (blob path, digest)
+                for path in paths:
+                    if not path or blob_store.digest_of(path) or not os.path.isfile(path):
+                        continue
+                    with open(path, 'rb') as f:
+                        blob_path, ingested, _ = blob_store.store(f, os.path.splitext(path)[1], path)
+                    moved[path] = (blob_path, ingested.digest)
+                
+                db_ids = {}
+                for file_record in File.query.all():
+                    if file_record.file_path in moved:
+                        old_path = file_record.file_path
+                        file_record.file_path, file_record.content_hash = moved[old_path]
+                        file_record.filename = blob_store.filename_for(file_record.file_path)
+                        db_ids.setdefault(old_path, file_record.id)
+                
+                for record in json_records:
+                    old_path = record.get('file_path')
+                    if old_path not in moved:
+                        continue
+                    # Question papers copied into the database are referenced through their row
+                    if id(record) in question_papers and old_path in db_ids:
+                        record['db_file_id'] = db_ids[old_path]
+                    record['file_path'], record['content_hash'] = moved[old_path]
+                    record['filename'] = blob_store.filename_for(record['file_path'])
+                
+                db.session.commit()
+                data_document.save(data)
+                
+                for path in moved:
+                    os.remove(path)
+            
+            print(f"Moved {len(moved)} files into the blob store!")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error moving files into the blob store: {str(e)}")
+
+def sync_report_counters():
+    """Recompute pending report counters and auto-hide flags from the reports table (safe for repeated runs)"""
+    print("Syncing file report counters...")
+    with app.app_context():
+        try:
+            File.recount_reports(app.config['REPORT_HIDE_THRESHOLD'])
+            db.session.commit()
+            hidden_count = File.query.filter_by(auto_hidden=True).count()
+            print(f"Report counters synced, {hidden_count} files hidden!")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error syncing report counters: {str(e)}")
+
 def main():
     """Main initialization function"""
     print("Initializing College Materials & PYQs Portal Database...")
@@ -322,6 +445,15 @@ def main():
     # Migrate existing files
     migrate_existing_files()
     
+    # Migrate votes and comments for those files
+    migrate_social_data()
+    
+    # Store each distinct file once
+    migrate_to_blob_store()
+    
+    # Bring report counters in line with existing reports
+    sync_report_counters()
+    
     print("=" * 60)
     print("Database initialization completed successfully!")
     print("\nYou can now:")
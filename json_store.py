@@ -0,0 +1,306 @@
+# JSON document store for the portal's flat-file data
+# (data.json, community.json, clubs.json, ...)
+#
+# JsonDocumentCache keeps parsed documents in memory and revalidates them
+# against the file on disk; JsonDocument wraps one file; JsonCollection exposes
+# a list of id-keyed records inside a document with an O(1) id index.
+#
+# Writes go to a temporary file that is fsynced and renamed over the target, so
+# readers only ever see a complete document. Read-modify-write cycles hold an
+# flock on "<file>.lock" so they are serialized across gunicorn workers too.
+
+import os
+import json
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; fall back to in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write_json(path, data):
+    """Write data as JSON to path via temp file + fsync + rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # mkstemp creates the file 0600; keep the permissions of the file we replace
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Persist the rename itself
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+
+class FileLock:
+    """Re-entrant exclusive lock held across threads and processes via flock"""
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    @contextmanager
+    def hold(self):
+        with self._thread_lock:
+            if self._depth == 0:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(fd, fcntl.LOCK_EX)
+                except Exception:
+                    os.close(fd)
+                    raise
+                self._fd = fd
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    # Closing the descriptor releases the flock
+                    os.close(self._fd)
+                    self._fd = None
+
+
+class JsonDocumentCache:
+    def __init__(self):
+        self._entries = {}  # abspath -> (stat token, parsed document)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat_token(path):
+        """Identify a version of the file on disk without reading it"""
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino, st.st_ctime_ns)
+
+    def load(self, path):
+        """Return the parsed document, re-parsing only when the file changed on disk"""
+        key = os.path.abspath(path)
+        token = self._stat_token(key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == token:
+            return entry[1]
+
+        with open(key, 'r') as f:
+            data = json.load(f)
+
+        with self._lock:
+            self._entries[key] = (token, data)
+        return data
+
+    def save(self, path, data):
+        """Write the document to disk and keep the cached copy in step with it"""
+        key = os.path.abspath(path)
+        try:
+            atomic_write_json(key, data)
+            token = self._stat_token(key)
+        except Exception:
+            # Never keep serving an in-memory copy that did not make it to disk
+            self.invalidate(key)
+            raise
+
+        with self._lock:
+            self._entries[key] = (token, data)
+
+    def invalidate(self, path=None):
+        """Drop one cached document, or all of them"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+
+# Global JSON document cache instance
+json_cache = JsonDocumentCache()
+
+
+class JsonDocument:
+    """A single JSON file read and written through the shared cache"""
+
+    def __init__(self, path, default, persist_default=False):
+        self.path = path
+        self.default = default  # Callable returning the document used when the file is missing
+        self.persist_default = persist_default
+        self._file_lock = FileLock(f"{path}.lock")
+
+    def lock(self):
+        """Context manager serializing read-modify-write cycles on this document"""
+        return self._file_lock.hold()
+
+    def load(self, strict=False):
+        """Load the document; on errors return the default unless strict"""
+        try:
+            if os.path.exists(self.path):
+                return json_cache.load(self.path)
+            data = self.default()
+            if self.persist_default:
+                with self.lock():
+                    if not os.path.exists(self.path):
+                        self.save(data)
+                    else:
+                        data = json_cache.load(self.path)
+            return data
+        except Exception as e:
+            logger.error(f"Error loading {self.path}: {str(e)}")
+            if strict:
+                raise
+            return self.default()
+
+    def version(self):
+        """Token that changes whenever the file on disk changes (None if missing)"""
+        try:
+            return JsonDocumentCache._stat_token(os.path.abspath(self.path))
+        except FileNotFoundError:
+            return None
+
+    def save(self, data):
+        """Save the whole document"""
+        try:
+            json_cache.save(self.path, data)
+        except Exception as e:
+            logger.error(f"Error saving {self.path}: {str(e)}")
+            raise
+
+
+class JsonCollection:
+    """A list of records with integer ids stored under one key of a JsonDocument"""
+
+    def __init__(self, document, key, counter_key=None):
+        self.document = document
+        self.key = key
+        self.counter_key = counter_key  # e.g. 'next_id'; None allocates max(id) + 1
+        self._lock = threading.RLock()
+        self._indexed = None  # The record list the index was built from
+        self._index = {}
+        self._max_id = 0
+
+    def _records(self, data):
+        if not isinstance(data.get(self.key), list):
+            data[self.key] = []
+        return data[self.key]
+
+    def _ensure_index(self, records):
+        # A re-parsed document comes with a new list object, so identity tells
+        # us when the index has to be rebuilt
+        if records is not self._indexed:
+            self._index = {record.get('id'): record for record in records}
+            self._max_id = max((i for i in self._index if isinstance(i, int)), default=0)
+            self._indexed = records
+        return self._index
+
+    def version(self):
+        """Changes whenever the underlying document is saved"""
+        return self.document.version()
+
+    def all(self):
+        """Return all records (shared with the cache - do not modify)"""
+        return self.document.load().get(self.key, [])
+
+    def get(self, record_id):
+        """Return the record with this id, or None"""
+        with self._lock:
+            records = self._records(self.document.load())
+            return self._ensure_index(records).get(record_id)
+
+    def _next_id(self, data):
+        next_id = self._max_id + 1
+        if self.counter_key:
+            next_id = max(next_id, data.get(self.counter_key, 1))
+            data[self.counter_key] = next_id + 1
+        return next_id
+
+    def insert(self, record, first=False):
+        """Assign the next id to record, add it and save; returns the record"""
+        with self.document.lock(), self._lock:
+            data = self.document.load(strict=True)
+            records = self._records(data)
+            index = self._ensure_index(records)
+
+            record['id'] = self._next_id(data)
+            if first:
+                records.insert(0, record)
+            else:
+                records.append(record)
+            index[record['id']] = record
+            self._max_id = record['id']
+
+            self.document.save(data)
+            return record
+
+    def update(self, record_id, changes):
+        """Apply a dict of fields, or a callable, to one record and save; returns it or None"""
+        with self.document.lock(), self._lock:
+            data = self.document.load(strict=True)
+            record = self._ensure_index(self._records(data)).get(record_id)
+            if record is None:
+                return None
+
+            if callable(changes):
+                changes(record)
+            else:
+                record.update(changes)
+
+            self.document.save(data)
+            return record
+
+    def update_many(self, changes):
+        """Apply {record_id: callable} in a single save; returns the ids that were found"""
+        with self.document.lock(), self._lock:
+            data = self.document.load(strict=True)
+            index = self._ensure_index(self._records(data))
+            found = [record_id for record_id in changes if record_id in index]
+            for record_id in found:
+                changes[record_id](index[record_id])
+
+            if found:
+                self.document.save(data)
+            return found
+
+    def delete(self, record_id):
+        """Remove one record and save; returns the removed record or None"""
+        with self.document.lock(), self._lock:
+            data = self.document.load(strict=True)
+            records = self._records(data)
+            record = self._ensure_index(records).pop(record_id, None)
+            if record is None:
+                return None
+
+            for i, existing in enumerate(records):
+                if existing is record:
+                    del records[i]
+                    break
+
+            self.document.save(data)
+            return record
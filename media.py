@@ -0,0 +1,307 @@
+# Thumbnails and previews for uploaded images and PDFs
+#
+# Every image (question papers, canteen/place/hostel photos, club screenshots,
+# event posters) gets downscaled copies at THUMBNAIL_WIDTHS in WebP and JPEG;
+# PDFs get the same from a raster of their first page when Ghostscript is
+# installed. Copies live in a ".thumbs" folder next to the original:
+#
+#     uploads/blobs/ab/cd/.thumbs/abcdef...pdf.320.webp
+#     uploads/canteen/.thumbs/canteen_20250101_120000_front.jpg.640.jpg
+#
+# They are rendered by a small thread pool, right after upload or on the first
+# request for them, and are re-rendered if the original is newer. A request
+# never waits for rendering: until the thumbnail exists the route falls back to
+# the original image, or answers 202 for a PDF preview.
+#
+# Photos uploaded for canteens, places, hostels, events and clubs are normalized
+# on the way in: turned upright from their EXIF orientation, stripped of all
+# metadata (GPS included), capped at PHOTO_MAX_DIMENSION and re-encoded. With
+# PHOTO_KEEP_ORIGINAL the untouched upload is kept under PHOTO_ORIGINALS_DIR,
+# outside the uploads folder so its EXIF is never served.
+
+import os
+import math
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, ExifTags, UnidentifiedImageError
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+
+# format name -> (Pillow format, file extension, MIME type)
+FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+}
+
+A4_WIDTH_INCHES = 8.27
+
+# Formats re-encoded by PhotoNormalizer; anything else is stored as uploaded
+PHOTO_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+
+# Image.info keys carried over by PhotoNormalizer; EXIF, XMP, comments and PNG
+# text chunks are dropped
+PHOTO_KEEP_INFO = {'transparency', 'icc_profile', 'gamma', 'srgb', 'chromaticity'}
+
+
+class Thumbnails:
+    def __init__(self, app=None):
+        self.widths = (320, 640, 1280)
+        self.quality = 80
+        self.ghostscript = None
+        self._executor = None
+        self._pending = {}  # source abspath -> Future
+        self._failed = {}  # source abspath -> mtime of the version that could not be rendered
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.widths = tuple(sorted(app.config.get('THUMBNAIL_WIDTHS', self.widths)))
+        self.quality = app.config.get('THUMBNAIL_QUALITY', self.quality)
+        self.ghostscript = app.config.get('THUMBNAIL_GHOSTSCRIPT') or shutil.which('gs')
+        if not self.ghostscript:
+            app.logger.info("Ghostscript not found, PDFs will have no preview images")
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('THUMBNAIL_WORKERS', 2),
+            thread_name_prefix='thumbnails'
+        )
+
+    @staticmethod
+    def is_image(path):
+        return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+    def previewable(self, path):
+        """True if thumbnails can be made for the file at path"""
+        if self.is_image(path):
+            return True
+        return bool(self.ghostscript) and path.lower().endswith('.pdf')
+
+    def path_for(self, source, width, fmt):
+        directory, name = os.path.split(source)
+        return os.path.join(directory, '.thumbs', f"{name}.{width}.{FORMATS[fmt][1]}")
+
+    @staticmethod
+    def mimetype(fmt):
+        return FORMATS[fmt][2]
+
+    def _fresh(self, source, path):
+        try:
+            return os.path.getmtime(path) >= os.path.getmtime(source)
+        except OSError:
+            return False
+
+    def schedule(self, source):
+        """Render the thumbnails of source in the background; returns the Future (None if not previewable)"""
+        if self._executor is None or not self.previewable(source):
+            return None
+        source = os.path.abspath(source)
+        with self._lock:
+            future = self._pending.get(source)
+            if future is None:
+                try:
+                    if self._failed.get(source) == os.path.getmtime(source):
+                        return None  # Already failed; not retried until the file changes
+                except OSError:
+                    return None
+                future = self._executor.submit(self._render, source)
+                self._pending[source] = future
+                future.add_done_callback(lambda done: self._finished(source, done))
+            return future
+
+    def rendering(self, source):
+        """True while thumbnails of source are queued or being rendered"""
+        with self._lock:
+            return os.path.abspath(source) in self._pending
+
+    def _finished(self, source, future):
+        with self._lock:
+            self._pending.pop(source, None)
+            if future.exception() is None:
+                self._failed.pop(source, None)
+                return
+            try:
+                self._failed[source] = os.path.getmtime(source)
+            except OSError:
+                self._failed.pop(source, None)
+        logger.error(f"Could not render thumbnails of {source}: {str(future.exception())}")
+
+    def get(self, source, width, fmt):
+        """Path of a current thumbnail of source; None (with rendering scheduled) if there is none yet"""
+        path = self.path_for(os.path.abspath(source), width, fmt)
+        if self._fresh(source, path):
+            return path
+        self.schedule(source)
+        return None
+
+    def discard(self, source):
+        """Remove the thumbnails of a deleted file"""
+        for width in self.widths:
+            for fmt in FORMATS:
+                try:
+                    os.remove(self.path_for(source, width, fmt))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Could not remove thumbnail of {source}: {str(e)}")
+
+    def _open(self, source):
+        """Pillow image for an image file or the first page of a PDF"""
+        if not source.lower().endswith('.pdf'):
+            image = Image.open(source)
+            # JPEG can decode straight to a reduced scale, much faster than a full decode;
+            # only the side that ends up as the width has to stay above the widest thumbnail
+            if image.getexif().get(ExifTags.Base.Orientation, 1) in (5, 6, 7, 8):
+                image.draft('RGB', (1, self.widths[-1]))
+            else:
+                image.draft('RGB', (self.widths[-1], 1))
+            return ImageOps.exif_transpose(image)
+
+        dpi = math.ceil(self.widths[-1] / A4_WIDTH_INCHES)
+        fd, raster = tempfile.mkstemp(suffix='.png')
+        os.close(fd)
+        try:
+            subprocess.run(
+                [self.ghostscript, '-q', '-dSAFER', '-dBATCH', '-dNOPAUSE', '-sDEVICE=png16m',
+                 '-dFirstPage=1', '-dLastPage=1', '-dTextAlphaBits=4', '-dGraphicsAlphaBits=4',
+                 f'-r{dpi}', f'-sOutputFile={raster}', source],
+                check=True, timeout=60, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+            with Image.open(raster) as page:
+                page.load()
+                return page
+        finally:
+            os.remove(raster)
+
+    def _render(self, source):
+        image = self._open(source)
+        if image.mode != 'RGB':
+            # Thumbnails are opaque; transparent areas become white
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+
+        os.makedirs(os.path.join(os.path.dirname(source), '.thumbs'), exist_ok=True)
+        # Largest first, each step downscaling the previous one
+        for width in reversed(self.widths):
+            if width < image.width:
+                image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            for fmt, (pil_format, _, _) in FORMATS.items():
+                path = self.path_for(source, width, fmt)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    image.save(tmp_path, pil_format, quality=self.quality, optimize=pil_format == 'JPEG')
+                    os.replace(tmp_path, path)
+                except Exception:
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+                    raise
+
+        if not os.path.exists(source):
+            # Deleted while rendering; discard() ran before these existed
+            self.discard(source)
+
+
+# Global thumbnail renderer instance
+thumbnails = Thumbnails()
+
+
+class PhotoNormalizer:
+    def __init__(self, app=None):
+        self.max_dimension = 2048
+        self.quality = 82
+        self.keep_original = False
+        self.upload_folder = 'uploads'
+        self.originals_dir = os.path.join('instance', 'photo_originals')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_dimension = app.config.get('PHOTO_MAX_DIMENSION', self.max_dimension)
+        self.quality = app.config.get('PHOTO_QUALITY', self.quality)
+        self.keep_original = app.config.get('PHOTO_KEEP_ORIGINAL', self.keep_original)
+        self.upload_folder = app.config.get('UPLOAD_FOLDER', self.upload_folder)
+        self.originals_dir = app.config.get('PHOTO_ORIGINALS_DIR') or os.path.join(app.instance_path, 'photo_originals')
+
+    def original_path(self, path):
+        """Where the untouched upload of the photo at path is kept, mirroring its place under the uploads folder"""
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.upload_folder))
+        return os.path.join(self.originals_dir, relative)
+
+    def save(self, file, path):
+        """Save an uploaded photo (FileStorage) to path, normalized; returns the bytes saved"""
+        stream = file.stream
+        stream.seek(0, os.SEEK_END)
+        original_size = stream.tell()
+        stream.seek(0)
+
+        if self.keep_original:
+            os.makedirs(os.path.dirname(self.original_path(path)), exist_ok=True)
+            file.save(self.original_path(path))
+            stream.seek(0)
+
+        try:
+            image = Image.open(stream)
+            image_format = image.format
+            if image_format not in PHOTO_FORMATS:
+                raise UnidentifiedImageError(f"{image_format} is not re-encoded")
+            # JPEG can decode straight to a reduced scale close to the cap
+            image.draft('RGB', (self.max_dimension, self.max_dimension))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+        except (UnidentifiedImageError, OSError) as e:
+            logger.warning(f"Storing {file.filename} as uploaded: {str(e)}")
+            stream.seek(0)
+            file.save(path)
+            metrics.increment('photos.stored_as_uploaded')
+            return 0
+
+        # Colour profile and transparency are carried over; EXIF, XMP and text chunks are dropped
+        icc_profile = image.info.get('icc_profile')
+        image.info = {key: value for key, value in image.info.items() if key in PHOTO_KEEP_INFO}
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if image_format == 'JPEG':
+                image.convert('RGB').save(tmp_path, 'JPEG', quality=self.quality, optimize=True, progressive=True,
+                                          icc_profile=icc_profile)
+            elif image_format == 'WEBP':
+                image.save(tmp_path, 'WEBP', quality=self.quality, icc_profile=icc_profile or '')
+            else:
+                image.save(tmp_path, 'PNG', optimize=True, icc_profile=icc_profile)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        saved = original_size - os.path.getsize(path)
+        logger.info(f"Normalized photo {os.path.basename(path)}: {original_size} -> {original_size - saved} bytes "
+                    f"({saved} saved)")
+        metrics.increment('photos.normalized')
+        metrics.increment('photos.bytes_in', original_size)
+        metrics.increment('photos.bytes_saved', saved)
+        return saved
+
+    def discard(self, path):
+        """Remove the kept original of a deleted photo"""
+        try:
+            os.remove(self.original_path(path))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove original of {path}: {str(e)}")
+
+
+# Global photo normalizer instance
+photos = PhotoNormalizer()
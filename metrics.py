@@ -0,0 +1,46 @@
+# In-process counters and timings for the admin metrics endpoint
+#
+# Every worker keeps its own numbers since it started; /admin/metrics reports
+# the worker that answered, together with its pid.
+
+import os
+import time
+import threading
+
+
+class Metrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self._counters = {}
+        self._timings = {}  # name -> [count, total seconds, max seconds]
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Record one duration"""
+        with self._lock:
+            timing = self._timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(sorted(self._counters.items()))
+            timings = {
+                name: {'count': count, 'avg_ms': round(total / count * 1000, 2), 'max_ms': round(longest * 1000, 2)}
+                for name, (count, total, longest) in sorted(self._timings.items())
+            }
+        return {
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started_at),
+            'counters': counters,
+            'timings': timings
+        }
+
+
+# Global metrics instance
+metrics = Metrics()
@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
 import hashlib
 import random
@@ -39,6 +40,16 @@ class Subject(db.Model):
 
 class File(db.Model):
     __tablename__ = 'files'
+    __table_args__ = (
+        # Category browse: equality on the hierarchy, newest first
+        db.Index('ix_files_browse', 'course_type', 'department', 'semester', 'category', 'upload_date'),
+        # Admin verification queue and guest visibility filter
+        db.Index('ix_files_verified_upload_date', 'verified', 'upload_date'),
+        # Search page / API ordering
+        db.Index('ix_files_upload_date', 'upload_date'),
+        # Listings skip report-hidden files (visible_files_query), newest first
+        db.Index('ix_files_auto_hidden_upload_date', 'auto_hidden', 'upload_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
@@ -52,8 +63,11 @@ class File(db.Model):
     subject_name = db.Column(db.String(200), nullable=True)  # For backward compatibility
     file_type = db.Column(db.String(20), nullable=False, default='QP')  # QP or Syllabus
     size = db.Column(db.String(50), nullable=True)
-    file_path = db.Column(db.String(500), nullable=False)
-    upload_date = db.Column(db.DateTime, default=datetime.utcnow)
+    file_path = db.Column(db.String(500), nullable=False, index=True)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256; file_path is the blob for it
+    mime_type = db.Column(db.String(100), nullable=True)  # Sniffed from the content at upload
+    description = db.Column(db.Text, nullable=True)
+    upload_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Listings are paged on it
     
     # Verification and ownership
     verified = db.Column(db.Boolean, nullable=False, default=False)  # Admin verification status
@@ -62,6 +76,15 @@ class File(db.Model):
     verified_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     verified_at = db.Column(db.DateTime, nullable=True)
     
+    # Social counters, kept in step with the file_votes / file_comments rows
+    likes = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    dislikes = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Report counters, kept in step with the Pending report rows
+    pending_report_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    auto_hidden = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    
     # Relationships
     subject = db.relationship('Subject', backref='files')
     uploader = db.relationship('User', foreign_keys=[uploader_id], backref='uploaded_files')
@@ -88,15 +111,91 @@ class File(db.Model):
             'uploader_id': self.uploader_id,
             'uploader_email': self.uploader_email,
             'uploader_name': self.uploader.name if self.uploader else None,
-            'verified_at': self.verified_at.isoformat() if self.verified_at else None
+            'verified_at': self.verified_at.isoformat() if self.verified_at else None,
+            'likes': self.likes or 0,
+            'dislikes': self.dislikes or 0,
+            'comment_count': self.comment_count or 0
         }
     
+    @classmethod
+    def list_options(cls):
+        """Loader options for listings that call to_dict() on every row (avoids N+1 queries)"""
+        return (joinedload(cls.subject), joinedload(cls.uploader))
+    
+    @classmethod
+    def change_pending_reports(cls, file_id, delta, threshold):
+        """Adjust the pending report counter in the caller's transaction and re-derive auto_hidden"""
+        return cls.query.filter_by(id=file_id).update({
+            cls.pending_report_count: cls.pending_report_count + delta,
+            cls.auto_hidden: cls.pending_report_count + delta >= threshold
+        }, synchronize_session=False)
+    
+    @classmethod
+    def recount_reports(cls, threshold, file_id=None):
+        """Recompute the report counters of every file (or just file_id) from the Pending report rows"""
+        pending = db.select(db.func.count(Report.id)).where(
+            Report.file_id == cls.id, Report.status == 'Pending'
+        ).scalar_subquery()
+        query = cls.query if file_id is None else cls.query.filter_by(id=file_id)
+        query.update({
+            cls.pending_report_count: pending,
+            cls.auto_hidden: pending >= threshold
+        }, synchronize_session=False)
+    
     def __repr__(self):
         return f'<File {self.filename}>'
 
 
+class FileVote(db.Model):
+    __tablename__ = 'file_votes'
+    __table_args__ = (
+        db.Index('ix_file_votes_file_id_created_at', 'file_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey('files.id'), nullable=False)
+    vote_type = db.Column(db.String(10), nullable=False)  # like or dislike
+    voter_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # Votes are open to anonymous users
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<FileVote {self.vote_type} on File {self.file_id}>'
+
+
+class FileComment(db.Model):
+    __tablename__ = 'file_comments'
+    __table_args__ = (
+        db.Index('ix_file_comments_file_id_created_at', 'file_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey('files.id'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    comment = db.Column(db.Text, nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        # Same shape as the comments stored in data.json, which the templates expect
+        return {
+            'id': self.id,
+            'name': self.name,
+            'comment': self.comment,
+            'date': self.created_at.strftime('%Y-%m-%d %H:%M') if self.created_at else None
+        }
+    
+    def __repr__(self):
+        return f'<FileComment {self.id} on File {self.file_id}>'
+
+
 class Report(db.Model):
     __tablename__ = 'reports'
+    __table_args__ = (
+        # Duplicate-report check and pending report counts per file
+        db.Index('ix_reports_file_id_reporter_id_status', 'file_id', 'reporter_id', 'status'),
+        # Admin report listings filtered by status, newest first
+        db.Index('ix_reports_status_created_at', 'status', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     file_id = db.Column(db.Integer, db.ForeignKey('files.id'), nullable=False)
@@ -129,6 +228,16 @@ class Report(db.Model):
             'admin_notes': self.admin_notes
         }
     
+    @classmethod
+    def list_options(cls):
+        """Loader options for listings that call to_dict() on every row (avoids N+1 queries)"""
+        return (
+            joinedload(cls.file).joinedload(File.subject),
+            joinedload(cls.file).joinedload(File.uploader),
+            joinedload(cls.reporter),
+            joinedload(cls.reviewed_by)
+        )
+    
     def __repr__(self):
         return f'<Report {self.id}: File {self.file_id} by User {self.reporter_id}>'
 
@@ -280,4 +389,93 @@ class User(UserMixin, db.Model):
         }
     
     def __repr__(self):
-        return f'<User {self.name} ({self.email})>'
\ No newline at end of file
+        return f'<User {self.name} ({self.email})>'
+
+
+class OutboundEmail(db.Model):
+    """Email waiting in the outbox (or already handled by it)"""
+    __tablename__ = 'outbound_emails'
+    __table_args__ = (
+        # The outbox worker picks due messages by status and time
+        db.Index('ix_outbound_emails_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # otp, verification_success
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html_body = db.Column(db.Text, nullable=True)  # Cleared once sent
+    text_body = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sent, dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<OutboundEmail {self.id} {self.kind} to {self.to_email} ({self.status})>'
+
+
+# Indexes replaced by better ones; dropped from existing databases so the
+# planner cannot pick them (table -> index names)
+RETIRED_INDEXES = {
+    'files': ('ix_files_auto_hidden',),  # Now ix_files_auto_hidden_upload_date
+}
+
+
+def upgrade_schema():
+    """Add columns and indexes introduced after a table was created (create_all never alters existing tables)"""
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=db.engine.dialect)}'
+            if column.server_default is not None:
+                default = column.server_default.arg
+                if isinstance(default, str):
+                    default = f"'{default}'"
+                else:
+                    default = default.compile(dialect=db.engine.dialect)
+                ddl += f" DEFAULT {default}"
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+            db.session.execute(db.text(ddl))
+        
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for name in RETIRED_INDEXES.get(table.name, ()):
+            if name in existing_indexes:
+                db.session.execute(db.text(f'DROP INDEX {name}'))
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=db.session.connection())
+    
+    if inspector.has_table('files'):
+        _require_upload_date(inspector)
+    db.session.commit()
+
+
+def _require_upload_date(inspector):
+    """Make files.upload_date NOT NULL in databases created while it was nullable"""
+    # Undated rows get the migration time, as init_db does for JSON files without a date
+    db.session.execute(db.update(File).where(File.upload_date.is_(None)).values(upload_date=datetime.utcnow()))
+    
+    column = next(column for column in inspector.get_columns('files') if column['name'] == 'upload_date')
+    if not column['nullable']:
+        return
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite cannot alter a column; refuse NULLs with triggers instead
+        for name, event in (('insert', 'INSERT'), ('update', 'UPDATE OF upload_date')):
+            db.session.execute(db.text(
+                f"CREATE TRIGGER IF NOT EXISTS files_upload_date_not_null_{name} BEFORE {event} ON files "
+                "WHEN NEW.upload_date IS NULL "
+                "BEGIN SELECT RAISE(ABORT, 'NOT NULL constraint failed: files.upload_date'); END"
+            ))
+    else:
+        db.session.execute(db.text('ALTER TABLE files ALTER COLUMN upload_date SET NOT NULL'))
@@ -0,0 +1,292 @@
+# Full-page response cache for the hierarchy / calculator / syllabus pages
+#
+# Responses are keyed by path + query string + role bucket (anonymous, guest,
+# contributor, admin), so every visitor with the same role shares one copy.
+#
+# Per-visitor parts are cut out before a page is stored and filled in when it
+# is served: the session's CSRF token in base.html is swapped for a placeholder,
+# and fragments rendered through the per_user() template global (the navbar user
+# menu, the homepage greeting) are stored as empty slots and re-rendered for the
+# visitor on every hit. Pages are never cached or served while flash messages are
+# pending.
+#
+# conditional() adds weak ETags to listing pages so an unchanged page is answered
+# with 304. The tag covers the visitor (role, user id and session version), the
+# session's CSRF secret and either caller-supplied data versions (checked before
+# rendering) or the rendered body.
+#
+# Backends: "memory" (LRU per worker) or "disk" (files under PAGE_CACHE_DIR,
+# shared by all workers). Either way invalidate() bumps a generation number kept
+# in PAGE_CACHE_DIR/generation, so an upload in one worker empties every cache.
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from functools import wraps
+from collections import OrderedDict
+from flask import current_app, request, session, g, make_response, render_template
+from markupsafe import Markup
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+from json_store import FileLock
+
+logger = logging.getLogger(__name__)
+
+CSRF_PLACEHOLDER = b'__PAGE_CACHE_CSRF_TOKEN__'
+
+# A per_user() fragment: <!--per-user:template-->rendered html<!--/per-user-->
+USER_FRAGMENT = re.compile(rb'<!--per-user:([\w./-]+)-->.*?<!--/per-user-->', re.S)
+
+
+class MemoryBackend:
+    """LRU of rendered pages, private to this worker"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskBackend:
+    """Rendered pages as files in a directory shared by all workers"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.page')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                header, body = f.read().split(b'\n', 1)
+        except (OSError, ValueError):
+            return None
+        meta = json.loads(header)
+        return meta['generation'], meta['stored_at'], meta['mimetype'], body
+
+    def set(self, key, entry):
+        generation, stored_at, mimetype, body = entry
+        header = json.dumps({'generation': generation, 'stored_at': stored_at, 'mimetype': mimetype}).encode()
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header + b'\n' + body)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.page'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+class PageCache:
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 60
+        self.directory = None
+        self._generation = (None, 0)  # (stat token of the generation file, value)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('PAGE_CACHE_BACKEND', 'memory')
+        self.ttl = app.config.get('PAGE_CACHE_TTL', self.ttl)
+        self.directory = app.config.get('PAGE_CACHE_DIR')
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._generation_lock = FileLock(os.path.join(self.directory, 'generation.lock'))
+
+        if backend == 'disk' and self.directory:
+            self.backend = DiskBackend(self.directory)
+        elif backend in ('memory', 'disk'):
+            self.backend = MemoryBackend(app.config.get('PAGE_CACHE_SIZE', 512))
+        else:
+            self.backend = None  # 'none' disables caching
+
+        app.add_template_global(self.per_user, 'per_user')
+
+    def _generation_path(self):
+        return os.path.join(self.directory, 'generation')
+
+    def generation(self):
+        """Current cache generation; pages stored under an older one are misses"""
+        if not self.directory:
+            return self._generation[1]
+        try:
+            st = os.stat(self._generation_path())
+        except FileNotFoundError:
+            return 0
+        token = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if token != self._generation[0]:
+            with open(self._generation_path()) as f:
+                self._generation = (token, int(f.read().strip() or 0))
+        return self._generation[1]
+
+    def invalidate(self):
+        """Drop every cached page, in all workers"""
+        if self.backend is None:
+            return
+        if self.directory:
+            with self._generation_lock.hold():
+                value = self.generation() + 1
+                tmp_path = f"{self._generation_path()}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    f.write(str(value))
+                os.replace(tmp_path, self._generation_path())
+        else:
+            self._generation = (None, self._generation[1] + 1)
+        try:
+            self.backend.clear()
+        except Exception as e:
+            logger.warning(f"Could not clear page cache: {str(e)}")
+
+    @staticmethod
+    def _bucket():
+        if not current_user.is_authenticated:
+            return 'anonymous'
+        return current_user.role
+
+    @staticmethod
+    def _visitor():
+        if not current_user.is_authenticated:
+            return 'anonymous'
+        return f"{current_user.role}:{current_user.id}:{current_user.auth_session_version}"
+
+    def _key(self):
+        return f"{self._bucket()}|{request.full_path}"
+
+    @staticmethod
+    def per_user(template_name):
+        """Render a fragment that differs between visitors of the same role (template global)"""
+        html = render_template(template_name)
+        return Markup(f"<!--per-user:{template_name}-->{html}<!--/per-user-->")
+
+    def _fill_user_fragments(self, body):
+        if b'<!--per-user:' not in body:
+            return body
+        return USER_FRAGMENT.sub(lambda m: self.per_user(m.group(1).decode()).encode(), body)
+
+    @staticmethod
+    def _empty_user_fragments(body):
+        return USER_FRAGMENT.sub(lambda m: b'<!--per-user:' + m.group(1) + b'--><!--/per-user-->', body)
+
+    def cached(self, view):
+        """Decorator serving a GET view from the cache when possible"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.backend is None or request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            key = self._key()
+            generation = self.generation()
+            try:
+                entry = self.backend.get(key)
+            except Exception as e:
+                logger.warning(f"Page cache read failed: {str(e)}")
+                entry = None
+
+            if entry is not None:
+                entry_generation, stored_at, mimetype, body = entry
+                if entry_generation == generation and time.time() - stored_at < self.ttl:
+                    body = self._fill_user_fragments(body)
+                    response = make_response(body.replace(CSRF_PLACEHOLDER, generate_csrf().encode()))
+                    response.mimetype = mimetype
+                    response.headers['X-Page-Cache'] = 'HIT'
+                    return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+
+            body = self._empty_user_fragments(response.get_data())
+            token = g.get('csrf_token')
+            if token:
+                body = body.replace(token.encode(), CSRF_PLACEHOLDER)
+            try:
+                self.backend.set(key, (generation, time.time(), response.mimetype, body))
+            except Exception as e:
+                logger.warning(f"Page cache write failed: {str(e)}")
+            response.headers['X-Page-Cache'] = 'MISS'
+            return response
+        return wrapper
+
+    def _etag(self, *parts):
+        # Rotate at half the CSRF token lifetime so a page revalidated with 304
+        # never carries a token that has already expired
+        time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+        window = int(time.time() // (time_limit / 2)) if time_limit else 0
+        seed = [self._visitor(), request.full_path, session.get('csrf_token', ''), window, *parts]
+        return hashlib.sha1(repr(seed).encode()).hexdigest()
+
+    def conditional(self, *versions):
+        """Decorator adding a weak ETag to a GET page and answering 304 when it matches
+
+        versions are callables (e.g. collection.version) whose results change
+        whenever the page data does; without them the ETag hashes the body.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method != 'GET' or session.get('_flashes'):
+                    return view(*args, **kwargs)
+
+                if versions:
+                    etag = self._etag(*[version() for version in versions])
+                    if request.if_none_match.contains_weak(etag):
+                        response = make_response('', 304)
+                        response.set_etag(etag, weak=True)
+                        response.cache_control.private = True
+                        response.cache_control.no_cache = True
+                        return response
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+
+                if versions:
+                    # Rendering may have created the session's CSRF secret
+                    etag = self._etag(*[version() for version in versions])
+                else:
+                    body = response.get_data()
+                    token = g.get('csrf_token')
+                    if token:
+                        body = body.replace(token.encode(), CSRF_PLACEHOLDER)
+                    etag = self._etag(hashlib.sha1(body).hexdigest())
+
+                response.set_etag(etag, weak=True)
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+
+# Global page cache instance
+page_cache = PageCache()
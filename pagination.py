@@ -0,0 +1,119 @@
+# Keyset (cursor) pagination for File listings
+#
+# Pages are ordered newest first on (upload_date, id). A cursor is the key of
+# the first or last row of a page plus a direction, base64-encoded, so a page is
+# found from its key instead of an OFFSET that grows with depth.
+#
+# upload_date is NOT NULL (upgrade_schema dates older rows), so the ordering is
+# served straight from the upload_date indexes; the plain range on upload_date
+# next to the (upload_date, id) tie-break lets a cursor page start its index
+# scan at the cursor instead of at the newest row.
+
+import json
+import base64
+from datetime import datetime
+from models import db, File
+
+
+def _cursor(upload_date, row_id, before=False):
+    payload = {'d': upload_date.isoformat(), 'i': row_id}
+    if before:
+        payload['b'] = 1
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def encode_cursor(file, before=False):
+    """Cursor pointing just past file: older rows, or newer rows if before"""
+    return _cursor(file.upload_date, file.id, before)
+
+
+def decode_cursor(cursor):
+    """Return (upload_date, id, before) or None for a missing or malformed cursor"""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(payload['d']), int(payload['i']), bool(payload.get('b'))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class Page:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor  # Older files
+        self.prev_cursor = prev_cursor  # Newer files
+
+
+def paginate_files(query, cursor=None, page_size=50):
+    """Return one Page of a File query, newest first"""
+    key = decode_cursor(cursor)
+
+    if key is None:
+        rows = query.order_by(File.upload_date.desc(), File.id.desc()).limit(page_size + 1).all()
+        has_more = len(rows) > page_size
+        items = rows[:page_size]
+        return Page(items, next_cursor=encode_cursor(items[-1]) if has_more else None)
+
+    upload_date, file_id, before = key
+    if before:
+        # Walk towards newer rows, then flip back to newest-first order
+        rows = query.filter(
+            File.upload_date >= upload_date,
+            db.or_(File.upload_date > upload_date, File.id > file_id)
+        ).order_by(File.upload_date.asc(), File.id.asc()).limit(page_size + 1).all()
+        has_more = len(rows) > page_size
+        items = list(reversed(rows[:page_size]))
+        return Page(
+            items,
+            next_cursor=encode_cursor(items[-1]) if items else None,
+            prev_cursor=encode_cursor(items[0], before=True) if has_more else None
+        )
+
+    rows = query.filter(
+        File.upload_date <= upload_date,
+        db.or_(File.upload_date < upload_date, File.id < file_id)
+    ).order_by(File.upload_date.desc(), File.id.desc()).limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+    return Page(
+        items,
+        next_cursor=encode_cursor(items[-1]) if has_more else None,
+        prev_cursor=encode_cursor(items[0], before=True) if items else None
+    )
+
+
+def _record_key(record):
+    """(upload_date, id) of a data.json file record; undated records sort oldest"""
+    try:
+        upload_date = datetime.fromisoformat(record.get('upload_date') or '').replace(tzinfo=None)
+    except (TypeError, ValueError):
+        upload_date = datetime.min
+    return upload_date, record.get('id') or 0
+
+
+def paginate_records(records, cursor=None, page_size=50):
+    """Return one Page of data.json file records, newest first, with the same cursors as paginate_files
+
+    For the JSON fallback of the listings when the database is unavailable.
+    """
+    records = sorted(records, key=_record_key, reverse=True)
+    keys = [_record_key(record) for record in records]
+    key = decode_cursor(cursor)
+
+    if key is None:
+        start, end = 0, page_size
+    elif key[2]:
+        # Newer records sit before the cursor's position
+        end = sum(1 for k in keys if k > key[:2])
+        start = max(end - page_size, 0)
+    else:
+        start = sum(1 for k in keys if k >= key[:2])
+        end = start + page_size
+
+    items = records[start:end]
+    return Page(
+        items,
+        next_cursor=_cursor(*_record_key(items[-1])) if items and end < len(records) else None,
+        prev_cursor=_cursor(*_record_key(items[0]), before=True) if items and start > 0 else None
+    )
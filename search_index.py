@@ -0,0 +1,223 @@
+# Full-text search over question papers for /api/search
+#
+# Indexes subject name, subject code, custom filename, original filename and
+# description of every File row. The backend is picked from the database
+# dialect:
+#   - SQLite:   FTS5 virtual table "file_search" (rowid = files.id), bm25 ranking
+#   - Postgres: "search_vector" tsvector column on files with a GIN index, ts_rank_cd ranking
+#   - Anything else, or SEARCH_BACKEND = 'like': ILIKE on subject name / filename
+#
+# Relevance is divided by (1 + age in years) so that newer papers win ties.
+
+import re
+import logging
+import sqlalchemy as sa
+from sqlalchemy.orm import joinedload
+from models import db, File
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text):
+    """Split filenames like 'data_structures_2023.pdf' into plain words"""
+    return re.sub(r'[\W_]+', ' ', text or '').strip()
+
+
+def _terms(query_text):
+    """Search words in the query; each one must match (as a prefix)"""
+    return re.findall(r'\w+', (query_text or '').lower().replace('_', ' '))
+
+
+def _document_fields(file):
+    """Weighted text fields of one File, highest weight first"""
+    return {
+        'subject_name': _normalize(file.subject_name),
+        'subject_code': _normalize(file.subject.code if file.subject else ''),
+        'custom_filename': _normalize(file.custom_filename),
+        'original_filename': _normalize(file.original_filename),
+        'description': _normalize(file.description),
+    }
+
+
+def _age_in_years():
+    """SQL expression for how old a file is, used to decay relevance"""
+    if db.engine.dialect.name == 'sqlite':
+        return (sa.func.julianday('now') - sa.func.julianday(File.upload_date)) / 365.0
+    return sa.extract('epoch', sa.func.now() - File.upload_date) / (86400 * 365.0)
+
+
+class LikeBackend:
+    """Substring match; used when no full-text engine is available"""
+
+    name = 'like'
+
+    def ensure(self):
+        pass
+
+    def index_file(self, file):
+        pass
+
+    def remove_file(self, file_id):
+        pass
+
+    def match(self, query, query_text):
+        search_pattern = f'%{query_text}%'
+        return query.filter(
+            db.or_(
+                File.subject_name.ilike(search_pattern),
+                File.custom_filename.ilike(search_pattern)
+            )
+        )
+
+    def search(self, query, query_text):
+        return self.match(query, query_text).order_by(File.upload_date.desc())
+
+
+class Fts5Backend:
+    """SQLite FTS5 external index keyed by files.id"""
+
+    name = 'fts5'
+    table = sa.table('file_search', sa.column('rowid'))
+
+    def ensure(self):
+        db.session.execute(sa.text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS file_search USING fts5("
+            "subject_name, subject_code, custom_filename, original_filename, description, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        ))
+        db.session.commit()
+
+        # Rows written before the index existed (or by init_db) are picked up here
+        indexed = db.session.execute(sa.text("SELECT count(*) FROM file_search")).scalar()
+        if indexed != File.query.count():
+            self.rebuild()
+
+    def rebuild(self):
+        db.session.execute(sa.text("DELETE FROM file_search"))
+        for file in File.query.options(joinedload(File.subject)).yield_per(1000):
+            self.index_file(file)
+        db.session.commit()
+
+    def index_file(self, file):
+        db.session.execute(sa.text(
+            "INSERT OR REPLACE INTO file_search (rowid, subject_name, subject_code, custom_filename, original_filename, description) "
+            "VALUES (:id, :subject_name, :subject_code, :custom_filename, :original_filename, :description)"
+        ), {'id': file.id, **_document_fields(file)})
+
+    def remove_file(self, file_id):
+        db.session.execute(sa.text("DELETE FROM file_search WHERE rowid = :id"), {'id': file_id})
+
+    def match(self, query, query_text):
+        match = ' '.join(f'"{term}"*' for term in _terms(query_text))
+        return query.join(self.table, self.table.c.rowid == File.id).filter(
+            sa.literal_column('file_search').op('MATCH')(match)
+        )
+
+    def search(self, query, query_text):
+        # bm25() is negative, lower is better; dividing by age pulls old papers towards 0
+        relevance = sa.func.bm25(sa.literal_column('file_search'), 10.0, 10.0, 4.0, 2.0, 1.0)
+        return self.match(query, query_text).order_by(relevance / (1 + _age_in_years()), File.upload_date.desc())
+
+
+class PostgresBackend:
+    """tsvector column on files with a GIN index"""
+
+    name = 'tsvector'
+    search_vector = sa.literal_column('files.search_vector')
+
+    def ensure(self):
+        db.session.execute(sa.text("ALTER TABLE files ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+        db.session.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_files_search_vector ON files USING GIN (search_vector)"
+        ))
+        db.session.commit()
+
+        # Rows written before the column existed (or by init_db) are picked up here
+        missing = File.query.filter(self.search_vector.is_(None))
+        for file in missing.options(joinedload(File.subject)).yield_per(1000):
+            self.index_file(file)
+        db.session.commit()
+
+    def index_file(self, file):
+        db.session.execute(sa.text(
+            "UPDATE files SET search_vector = "
+            "setweight(to_tsvector('simple', :subject_name), 'A') || "
+            "setweight(to_tsvector('simple', :subject_code), 'A') || "
+            "setweight(to_tsvector('simple', :custom_filename), 'B') || "
+            "setweight(to_tsvector('simple', :original_filename), 'C') || "
+            "setweight(to_tsvector('simple', :description), 'D') "
+            "WHERE id = :id"
+        ), {'id': file.id, **_document_fields(file)})
+
+    def remove_file(self, file_id):
+        # The vector lives on the row itself and goes away with it
+        pass
+
+    @staticmethod
+    def _tsquery(query_text):
+        return sa.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in _terms(query_text)))
+
+    def match(self, query, query_text):
+        return query.filter(self.search_vector.op('@@')(self._tsquery(query_text)))
+
+    def search(self, query, query_text):
+        relevance = sa.func.ts_rank_cd(self.search_vector, self._tsquery(query_text))
+        return self.match(query, query_text).order_by(
+            (relevance / (1 + _age_in_years())).desc(), File.upload_date.desc()
+        )
+
+
+class SearchIndex:
+    def __init__(self, app=None):
+        self.backend = LikeBackend()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Pick the backend for the configured database and make sure the index exists"""
+        choice = app.config.get('SEARCH_BACKEND', 'auto')
+        with app.app_context():
+            dialect = db.engine.dialect.name
+            if choice == 'like':
+                backend = LikeBackend()
+            elif dialect == 'sqlite':
+                backend = Fts5Backend()
+            elif dialect == 'postgresql':
+                backend = PostgresBackend()
+            else:
+                backend = LikeBackend()
+
+            try:
+                backend.ensure()
+                self.backend = backend
+            except Exception as e:
+                # e.g. SQLite compiled without FTS5
+                db.session.rollback()
+                logger.warning(f"Full-text search unavailable ({backend.name}), using ILIKE: {str(e)}")
+                self.backend = LikeBackend()
+
+        app.logger.info(f"Search backend: {self.backend.name}")
+
+    def index_file(self, file):
+        """Add or refresh one file in the index; commits with the caller's transaction"""
+        self.backend.index_file(file)
+
+    def remove_file(self, file_id):
+        """Drop one file from the index; commits with the caller's transaction"""
+        self.backend.remove_file(file_id)
+
+    def match(self, query, query_text):
+        """Restrict a File query to matches for query_text, leaving its order alone"""
+        if not _terms(query_text):
+            return query
+        return self.backend.match(query, query_text)
+
+    def search(self, query, query_text):
+        """Restrict a File query to matches for query_text, best matches first"""
+        if not _terms(query_text):
+            return query.order_by(File.upload_date.desc())
+        return self.backend.search(query, query_text)
+
+
+# Global search index instance
+search_index = SearchIndex()
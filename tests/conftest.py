@@ -0,0 +1,68 @@
+# Shared fixtures
+#
+# The app is imported once and runs from a scratch directory with its own
+# SQLite database, so data.json, uploads/ and instance/ in the checkout are
+# never touched. Every test starts with empty tables and an empty page cache.
+
+import os
+import sys
+import tempfile
+
+import pytest
+from flask import g
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix='portal-tests-')
+
+sys.path.insert(0, ROOT)
+os.chdir(WORKDIR)
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(WORKDIR, 'portal.db')}",
+    'PAGE_CACHE_DIR': os.path.join(WORKDIR, 'instance', 'page_cache'),
+    'CHUNKED_UPLOAD_DIR': os.path.join(WORKDIR, 'instance', 'chunks'),
+    'PHOTO_ORIGINALS_DIR': os.path.join(WORKDIR, 'instance', 'photo_originals'),
+})
+
+import app as portal  # noqa: E402
+from models import db, User  # noqa: E402
+from page_cache import page_cache  # noqa: E402
+
+
+@portal.app.teardown_request
+def forget_signed_in_user(error=None):
+    # The fixture's app context outlives each request; without this Flask-Login
+    # would keep serving the previous request's user from g
+    g.pop('_login_user', None)
+
+
+@pytest.fixture
+def app():
+    portal.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with portal.app.app_context():
+        yield portal.app
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        db.session.remove()
+    page_cache.invalidate()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """login(role) creates a user with that role and signs the test client in as them"""
+    def login(role='admin'):
+        user = User(email=f'{role}@example.com', name=role.title(), role=role)
+        db.session.add(user)
+        db.session.commit()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+            session['auth_session_version'] = user.auth_session_version
+        return user
+    return login
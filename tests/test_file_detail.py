@@ -0,0 +1,22 @@
+# Viewing a legacy JSON-only file never changes the cached data.json document
+
+import os
+
+import app as portal
+
+
+def test_json_file_detail_leaves_record_untouched(client):
+    os.makedirs(portal.UPLOAD_FOLDER, exist_ok=True)
+    with open(os.path.join(portal.UPLOAD_FOLDER, 'legacy.pdf'), 'wb') as f:
+        f.write(b'%PDF-1.4')
+    record = portal.files_collection.insert({
+        'filename': 'legacy.pdf', 'original_filename': 'legacy.pdf', 'custom_filename': 'Legacy paper',
+        'course_type': 'ug', 'department': 'cse', 'semester': '1', 'category': 'CAT', 'verified': True
+    })
+    try:
+        response = client.get(f"/file/{record['id']}")
+        assert response.status_code == 200
+        stored = portal.files_collection.get(record['id'])
+        assert not {'likes', 'dislikes', 'comments'} & set(stored)
+    finally:
+        portal.files_collection.delete(record['id'])
@@ -0,0 +1,207 @@
+# Byte ranges, conditional requests and proxy offload for stored files
+
+import os
+
+import pytest
+
+import app as portal
+from file_serving import file_offload
+from models import db, File
+
+CONTENT = bytes(range(256)) * 40  # 10240 bytes, every offset distinguishable
+SIZE = len(CONTENT)
+
+
+@pytest.fixture
+def upload_folder(app, tmp_path, monkeypatch):
+    """A temporary UPLOAD_FOLDER holding papers/sample.pdf"""
+    monkeypatch.setattr(portal, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(file_offload, 'root', str(tmp_path))
+    (tmp_path / 'papers').mkdir()
+    (tmp_path / 'papers' / 'sample.pdf').write_bytes(CONTENT)
+    return tmp_path
+
+
+def get(client, range_header=None, **headers):
+    if range_header is not None:
+        headers['Range'] = range_header
+    return client.get('/uploads/papers/sample.pdf', headers=headers)
+
+
+def byteranges(response):
+    """(Content-Range, body) of every part of a multipart/byteranges response"""
+    assert response.mimetype == 'multipart/byteranges'
+    boundary = response.mimetype_params['boundary'].encode()
+    body = response.get_data()
+    assert body.endswith(b'\r\n--' + boundary + b'--\r\n')
+    parts = []
+    for chunk in body.split(b'\r\n--' + boundary)[1:-1]:
+        head, _, data = chunk.partition(b'\r\n\r\n')
+        headers = dict(line.split(': ', 1) for line in head.decode().strip().split('\r\n'))
+        assert headers['Content-Type'] == 'application/pdf'
+        parts.append((headers['Content-Range'], data))
+    return parts
+
+
+def test_full_download_advertises_ranges(client, upload_folder):
+    response = get(client)
+    assert response.status_code == 200
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['ETag']
+    assert response.get_data() == CONTENT
+
+
+@pytest.mark.parametrize('header, start, stop', [
+    ('bytes=0-99', 0, 100),
+    ('bytes=100-', 100, SIZE),
+    ('bytes=-50', SIZE - 50, SIZE),
+    ('bytes=10000-20000', 10000, SIZE),
+    ('bytes=-20000', 0, SIZE),
+])
+def test_single_range(client, upload_folder, header, start, stop):
+    response = get(client, header)
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f"bytes {start}-{stop - 1}/{SIZE}"
+    assert response.content_length == stop - start
+    assert response.get_data() == CONTENT[start:stop]
+
+
+def test_multiple_ranges(client, upload_folder):
+    response = get(client, 'bytes=0-9, 100-109, -5')
+    assert response.status_code == 206
+    assert 'Content-Range' not in response.headers
+    assert response.content_length == len(response.get_data())
+    assert byteranges(response) == [
+        (f"bytes 0-9/{SIZE}", CONTENT[0:10]),
+        (f"bytes 100-109/{SIZE}", CONTENT[100:110]),
+        (f"bytes {SIZE - 5}-{SIZE - 1}/{SIZE}", CONTENT[-5:]),
+    ]
+
+
+def test_overlapping_ranges_are_sorted_and_merged(client, upload_folder):
+    response = get(client, 'bytes=500-599, 0-9, 5-19, 550-649')
+    assert response.status_code == 206
+    assert byteranges(response) == [
+        (f"bytes 0-19/{SIZE}", CONTENT[0:20]),
+        (f"bytes 500-649/{SIZE}", CONTENT[500:650]),
+    ]
+
+
+def test_ranges_merging_into_one_are_sent_as_one_part(client, upload_folder):
+    response = get(client, 'bytes=10-19, 0-9')
+    assert response.status_code == 206
+    assert response.mimetype == 'application/pdf'
+    assert response.headers['Content-Range'] == f"bytes 0-19/{SIZE}"
+    assert response.get_data() == CONTENT[0:20]
+
+
+def test_unsatisfiable_ranges_get_416(client, upload_folder):
+    for header in (f'bytes={SIZE}-', f'bytes={SIZE}-{SIZE + 10}, {SIZE + 100}-'):
+        response = get(client, header)
+        assert response.status_code == 416
+        assert response.headers['Content-Range'] == f"bytes */{SIZE}"
+
+
+def test_zero_length_suffix_is_unsatisfiable(client, upload_folder):
+    response = get(client, 'bytes=-0')
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f"bytes */{SIZE}"
+
+    # Dropped from a set with other ranges
+    response = get(client, 'bytes=-0, 0-9')
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f"bytes 0-9/{SIZE}"
+    assert response.get_data() == CONTENT[0:10]
+
+
+@pytest.mark.parametrize('header', ['bytes=abc', 'bytes=9-1', 'items=0-9', 'bytes=0-9,x'])
+def test_malformed_range_sends_whole_file(client, upload_folder, header):
+    response = get(client, header)
+    assert response.status_code == 200
+    assert response.get_data() == CONTENT
+
+
+@pytest.mark.parametrize('header', ['bytes=0-9', 'bytes=0-9, 20-29'])
+def test_if_range(client, upload_folder, header):
+    etag = get(client).headers['ETag']
+
+    response = get(client, header, **{'If-Range': etag})
+    assert response.status_code == 206
+
+    # Another version of the file: the whole new content is sent
+    response = get(client, header, **{'If-Range': '"not-the-current-version"'})
+    assert response.status_code == 200
+    assert response.get_data() == CONTENT
+
+
+def test_if_range_date(client, upload_folder):
+    last_modified = get(client).headers['Last-Modified']
+    assert get(client, 'bytes=0-9, 20-29', **{'If-Range': last_modified}).status_code == 206
+    assert get(client, 'bytes=0-9, 20-29', **{'If-Range': 'Mon, 01 Jan 2001 00:00:00 GMT'}).status_code == 200
+
+
+@pytest.mark.parametrize('header', [None, 'bytes=0-9', 'bytes=0-9, 20-29', 'bytes=-0'])
+def test_if_none_match_wins_over_range(client, upload_folder, header):
+    etag = get(client).headers['ETag']
+    response = get(client, header, **{'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+
+
+def test_changed_file_gets_new_etag(client, upload_folder):
+    etag = get(client).headers['ETag']
+    path = upload_folder / 'papers' / 'sample.pdf'
+    path.write_bytes(CONTENT[::-1])
+    os.utime(path, (1, 1))
+    response = get(client, 'bytes=0-9', **{'If-Range': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_hidden_folders_are_not_served(client, upload_folder):
+    (upload_folder / '.chunks').mkdir()
+    (upload_folder / '.chunks' / 'manifest.json').write_text('{}')
+    assert client.get('/uploads/.chunks/manifest.json').status_code == 400
+    assert client.get('/uploads/papers/../papers/sample.pdf').status_code == 400
+
+
+def test_download_route_supports_ranges(client, upload_folder):
+    row = File(
+        filename='sample.pdf', original_filename='sample.pdf', custom_filename='Sample Paper.pdf',
+        course_type='ug', department='cse', semester='1', category='CAT',
+        file_path=str(upload_folder / 'papers' / 'sample.pdf'), mime_type='application/pdf', verified=True
+    )
+    db.session.add(row)
+    db.session.commit()
+
+    response = client.get(f'/download/{row.id}', headers={'Range': 'bytes=0-9, 30-39'})
+    assert response.status_code == 206
+    assert 'attachment' in response.headers['Content-Disposition']
+    assert [data for _, data in byteranges(response)] == [CONTENT[0:10], CONTENT[30:40]]
+
+
+@pytest.mark.parametrize('mode, header', [('x-accel', 'X-Accel-Redirect'), ('x-sendfile', 'X-Sendfile')])
+def test_offload_headers(client, upload_folder, monkeypatch, mode, header):
+    monkeypatch.setattr(file_offload, 'mode', mode)
+    expected = ('/_protected/papers/sample.pdf' if mode == 'x-accel'
+                else str(upload_folder / 'papers' / 'sample.pdf'))
+
+    response = get(client, 'bytes=0-9')
+    assert response.status_code == 200
+    assert response.headers[header] == expected
+    assert response.headers['Content-Type'] == 'application/pdf'
+    assert response.headers['ETag']
+    assert response.get_data() == b''
+
+    # 304s are answered by the app, without handing the file to the proxy
+    response = get(client, **{'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+    assert header not in response.headers
+
+
+def test_head_with_range(client, upload_folder):
+    response = client.head('/uploads/papers/sample.pdf', headers={'Range': 'bytes=0-9'})
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f"bytes 0-9/{SIZE}"
+    assert response.content_length == 10
+    assert response.get_data() == b''
@@ -0,0 +1,107 @@
+# Full-page cache: one copy per role, per-user fragments, invalidation hooks
+
+import pytest
+
+from models import db, File, Report, User
+from page_cache import page_cache
+
+
+def sign_in(client, user):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+        session['auth_session_version'] = user.auth_session_version
+
+
+def make_user(name, role):
+    user = User(email=f'{name.lower()}@example.com', name=name, role=role)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def make_file(**fields):
+    file = File(
+        filename='paper.pdf', original_filename='paper.pdf', custom_filename='paper.pdf',
+        course_type='ug', department='cse', semester='1', category='CAT',
+        file_path='uploads/blobs/missing.pdf', **fields
+    )
+    db.session.add(file)
+    db.session.commit()
+    return file
+
+
+def test_anonymous_visitors_share_a_page(app):
+    first = app.test_client().get('/materials')
+    second = app.test_client().get('/materials')
+    assert first.headers['X-Page-Cache'] == 'MISS'
+    assert second.headers['X-Page-Cache'] == 'HIT'
+    assert b'<!--per-user:' not in second.get_data()
+
+
+def test_users_with_one_role_share_a_page_but_not_their_menu(app):
+    alice, bob = make_user('Alice', 'contributor'), make_user('Bob', 'contributor')
+    alice_client, bob_client = app.test_client(), app.test_client()
+    sign_in(alice_client, alice)
+    sign_in(bob_client, bob)
+
+    first = alice_client.get('/')
+    second = bob_client.get('/')
+    assert first.headers['X-Page-Cache'] == 'MISS'
+    assert second.headers['X-Page-Cache'] == 'HIT'
+    assert b'Welcome, Alice!' in first.get_data()
+    assert b'bob@example.com' in second.get_data()
+    assert b'Welcome, Bob!' in second.get_data()
+    assert b'Alice' not in second.get_data()
+
+
+def test_roles_get_separate_pages(app):
+    guest, contributor = make_user('Gina', 'guest'), make_user('Carl', 'contributor')
+    guest_client, contributor_client = app.test_client(), app.test_client()
+    sign_in(guest_client, guest)
+    sign_in(contributor_client, contributor)
+
+    assert guest_client.get('/').headers['X-Page-Cache'] == 'MISS'
+    assert contributor_client.get('/').headers['X-Page-Cache'] == 'MISS'
+    assert contributor_client.get('/').headers['X-Page-Cache'] == 'HIT'
+
+
+def test_cached_page_carries_the_visitors_csrf_token(app):
+    first, second = app.test_client(), app.test_client()
+    first.get('/calculators')
+    response = second.get('/calculators')
+    assert response.headers['X-Page-Cache'] == 'HIT'
+    assert b'__PAGE_CACHE_CSRF_TOKEN__' not in response.get_data()
+
+
+@pytest.fixture
+def admin_client(client, login):
+    login('admin')
+    return client
+
+
+def invalidates(action):
+    before = page_cache.generation()
+    response = action()
+    assert response.status_code == 200, response.get_data()
+    return page_cache.generation() > before
+
+
+def test_verify_file_invalidates(admin_client):
+    file = make_file(verified=False)
+    assert invalidates(lambda: admin_client.post(f'/api/files/verify/{file.id}'))
+
+
+def test_delete_file_api_invalidates(admin_client):
+    file = make_file(verified=True)
+    assert invalidates(lambda: admin_client.post(f'/api/files/delete/{file.id}'))
+
+
+@pytest.mark.parametrize('action', ['dismiss', 'delete_file'])
+def test_review_report_invalidates(admin_client, action):
+    file = make_file(verified=True)
+    reporter = make_user('Rita', 'contributor')
+    report = Report(file_id=file.id, reporter_id=reporter.id, reason='Wrong paper')
+    db.session.add(report)
+    db.session.commit()
+    assert invalidates(lambda: admin_client.post(f'/api/reports/{report.id}/review', json={'action': action}))
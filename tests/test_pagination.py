@@ -0,0 +1,115 @@
+# Keyset pagination walks every file once, straight off the upload_date indexes
+
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+from flask import Flask
+from sqlalchemy import event
+
+from models import db, File, upgrade_schema
+from pagination import paginate_files, encode_cursor
+
+
+def make_file(i, upload_date, **fields):
+    return File(
+        filename=f'paper{i}.pdf', original_filename=f'paper{i}.pdf', custom_filename=f'Paper {i}',
+        course_type='ug', department='cse', semester='1', category='CAT',
+        file_path=f'uploads/blobs/{i}.pdf', verified=True, upload_date=upload_date, **fields
+    )
+
+
+@pytest.fixture
+def files(app):
+    """Six files, three of them uploaded at the same moment; ids newest first"""
+    start = datetime(2025, 1, 1)
+    created = [make_file(i, start + timedelta(days=min(i, 3))) for i in range(6)]
+    db.session.add_all(created)
+    db.session.commit()
+    return sorted((file.id for file in created), key=lambda i: (db.session.get(File, i).upload_date, i), reverse=True)
+
+
+def test_walk_forward_and_back(files):
+    seen, pages, cursor = [], [], None
+    while True:
+        page = paginate_files(File.query, cursor, page_size=2)
+        pages.append(page)
+        seen.extend(file.id for file in page.items)
+        if not page.next_cursor:
+            break
+        cursor = page.next_cursor
+    assert seen == files
+
+    back = paginate_files(File.query, pages[-1].prev_cursor, page_size=2)
+    assert [file.id for file in back.items] == [file.id for file in pages[-2].items]
+    assert [file.id for file in paginate_files(File.query, back.prev_cursor, page_size=2).items] == files[:2]
+
+
+def query_plans(fn):
+    """EXPLAIN QUERY PLAN of every statement fn sends"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    connection = db.session.connection()
+    return [' | '.join(row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters))
+            for statement, parameters in statements]
+
+
+@pytest.mark.parametrize('listing', [
+    lambda: File.query.filter(File.auto_hidden == False, File.verified == True),  # Guest /search
+    lambda: File.query.filter(File.auto_hidden == False),  # Contributor /search
+    lambda: File.query.filter_by(verified=False),  # /admin/verify-files
+])
+@pytest.mark.parametrize('before', [None, False, True])
+def test_pages_are_read_in_index_order(app, files, listing, before):
+    if db.engine.dialect.name != 'sqlite':
+        pytest.skip('EXPLAIN QUERY PLAN is SQLite only')
+    cursor = None if before is None else encode_cursor(db.session.get(File, files[2]), before=before)
+
+    plans = query_plans(lambda: paginate_files(listing().options(*File.list_options()), cursor, page_size=2))
+    assert plans
+    for plan in plans:
+        assert 'TEMP B-TREE' not in plan
+        assert 'USING INDEX ix_files_' in plan
+        if cursor:
+            assert 'upload_date<?' in plan or 'upload_date>?' in plan
+
+
+def test_upgrade_dates_legacy_rows_and_refuses_null(tmp_path, monkeypatch):
+    legacy = Flask('legacy')
+    legacy.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'legacy.db'}"
+    db.init_app(legacy)
+    with legacy.app_context():
+        # A files table from before upload_date was NOT NULL
+        monkeypatch.setattr(File.__table__.c.upload_date, 'nullable', True)
+        db.create_all()
+        monkeypatch.undo()
+        db.session.add_all([make_file(1, datetime(2025, 1, 1)), make_file(2, datetime(2025, 1, 2))])
+        db.session.commit()
+        # Core statements: the ORM would fill in the column default for None
+        db.session.execute(sa.update(File).where(File.filename == 'paper1.pdf').values(upload_date=None))
+        db.session.execute(sa.text('CREATE INDEX ix_files_auto_hidden ON files (auto_hidden)'))
+        db.session.commit()
+
+        upgrade_schema()
+
+        assert File.query.filter(File.upload_date.is_(None)).count() == 0
+        assert 'ix_files_auto_hidden' not in {index['name'] for index in sa.inspect(db.engine).get_indexes('files')}
+        with pytest.raises(sa.exc.IntegrityError):
+            db.session.execute(sa.update(File).values(upload_date=None))
+        db.session.rollback()
+        with pytest.raises(sa.exc.IntegrityError):
+            db.session.execute(sa.insert(File).values(
+                filename='paper3.pdf', original_filename='paper3.pdf', custom_filename='Paper 3',
+                course_type='ug', department='cse', semester='1', category='CAT', file_type='QP',
+                file_path='uploads/blobs/3.pdf', verified=True, upload_date=None
+            ))
+        db.session.rollback()
+        db.session.remove()
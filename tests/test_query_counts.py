@@ -0,0 +1,83 @@
+# Listing pages issue the same number of SQL queries whatever the number of rows
+
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+import app as portal
+from models import db, File, Report, Subject, User
+
+
+@contextmanager
+def count_queries():
+    """Count the statements this thread sends to the database"""
+    counted = []
+    thread = threading.get_ident()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread:
+            counted.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counted
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def seed(first, last, verified=True):
+    """Files first..last-1, each with its own subject, uploader and report by its own reporter"""
+    start = datetime(2025, 1, 1)
+    for i in range(first, last):
+        uploader = User(email=f'uploader{i}@example.com', name=f'Uploader {i}', role='contributor')
+        reporter = User(email=f'reporter{i}@example.com', name=f'Reporter {i}', role='contributor')
+        subject = Subject(code=f'SUB{i}', name=f'Subject {i}', course_type='ug', department='cse',
+                          semester='1', category='CAT')
+        db.session.add_all([uploader, reporter, subject])
+        db.session.flush()
+        file = File(
+            filename=f'paper{i}.pdf', original_filename=f'paper{i}.pdf', custom_filename=f'Paper {i}',
+            course_type='ug', department='cse', semester='1', category='CAT',
+            subject_id=subject.id, subject_name=subject.name, file_path=f'uploads/blobs/{i}.pdf',
+            uploader_id=uploader.id, verified=verified, upload_date=start + timedelta(minutes=i)
+        )
+        db.session.add(file)
+        db.session.flush()
+        db.session.add(Report(file_id=file.id, reporter_id=reporter.id, reason='Duplicate'))
+    db.session.commit()
+
+
+# (url, whether the listed files are verified)
+LISTINGS = [
+    ('/category/ug/cse/1/CAT', True),
+    ('/search', True),
+    ('/search?format=json', True),
+    ('/manage-uploads', True),
+    ('/admin/verify-files', False),
+    ('/api/reports', True),
+]
+
+
+def queries_for(client, url):
+    client.get(url)  # Warm up anything built on first use
+    portal.hidden_files.invalidate()
+    with count_queries() as counted:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(counted)
+
+
+@pytest.mark.parametrize('url, verified', LISTINGS)
+def test_listing_query_count_is_constant(app, client, login, url, verified):
+    login('admin')
+
+    seed(0, 1, verified)
+    with_one = queries_for(client, url)
+
+    seed(1, 50, verified)
+    with_fifty = queries_for(client, url)
+
+    assert with_fifty == with_one
@@ -0,0 +1,67 @@
+# Reviewing reports keeps File.pending_report_count / auto_hidden in step
+
+import pytest
+
+import app as portal
+from models import db, File, Report, User
+
+
+@pytest.fixture
+def reported_file(app):
+    """A verified file with three pending reports, enough to hide it"""
+    file = File(
+        filename='paper.pdf', original_filename='paper.pdf', custom_filename='paper.pdf',
+        course_type='ug', department='cse', semester='1', category='CAT',
+        file_path='uploads/blobs/missing.pdf', verified=True
+    )
+    db.session.add(file)
+    db.session.flush()
+    for n in range(app.config['REPORT_HIDE_THRESHOLD']):
+        reporter = User(email=f'reporter{n}@example.com', name=f'Reporter {n}', role='contributor')
+        db.session.add(reporter)
+        db.session.flush()
+        db.session.add(Report(file_id=file.id, reporter_id=reporter.id, reason='Wrong paper'))
+    db.session.flush()
+    File.recount_reports(app.config['REPORT_HIDE_THRESHOLD'], file_id=file.id)
+    db.session.commit()
+    portal.hidden_files.invalidate()
+    return file
+
+
+def review(client, report_id, action):
+    return client.post(f'/api/reports/{report_id}/review', json={'action': action, 'notes': 'checked'})
+
+
+def test_dismiss_unhides_file(client, login, reported_file):
+    login('admin')
+    assert reported_file.auto_hidden
+    assert portal.hidden_files.is_hidden(reported_file.id)
+
+    report = Report.query.filter_by(file_id=reported_file.id).first()
+    response = review(client, report.id, 'dismiss')
+    assert response.json['success']
+
+    db.session.refresh(reported_file)
+    assert reported_file.pending_report_count == 2
+    assert not reported_file.auto_hidden
+    assert not portal.hidden_files.is_hidden(reported_file.id)
+
+    # Dismissing it again changes nothing
+    review(client, report.id, 'dismiss')
+    db.session.refresh(reported_file)
+    assert reported_file.pending_report_count == 2
+
+
+def test_delete_file_removes_reports_first(client, login, reported_file):
+    login('admin')
+    file_id = reported_file.id
+    report = Report.query.filter_by(file_id=file_id).first()
+
+    response = review(client, report.id, 'delete_file')
+    assert response.status_code == 200
+    assert response.json['success']
+
+    db.session.expire_all()
+    assert db.session.get(File, file_id) is None
+    assert Report.query.filter_by(file_id=file_id).count() == 0
+    assert not portal.hidden_files.is_hidden(file_id)
@@ -0,0 +1,96 @@
+# /search applies its text and hierarchy filters in SQL, across every page
+
+import re
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+import app as portal
+from models import db, File
+from search_index import search_index
+
+
+@pytest.fixture
+def papers(app):
+    """60 verified papers, newest first: the oldest is the only 'Compiler Design' one"""
+    start = datetime(2025, 1, 1)
+    for i in range(60):
+        file = File(
+            filename=f'paper{i}.pdf', original_filename=f'paper{i}.pdf', custom_filename=f'Paper {i}',
+            course_type='ug', department='cse' if i % 2 else 'mech', semester='1', category='CAT',
+            subject_name='Compiler Design' if i == 0 else f'Subject {i}',
+            file_path=f'uploads/blobs/{i}.pdf', verified=True, upload_date=start + timedelta(days=i)
+        )
+        db.session.add(file)
+        db.session.flush()
+        search_index.index_file(file)
+    db.session.commit()
+
+
+def results(response):
+    body = response.get_data(as_text=True)
+    total = int(re.search(r'<span id="resultsCount">(\d+)</span>', body).group(1))
+    names = re.findall(r'<h6 class="card-title mb-1">([^<]+)</h6>', body)
+    older = re.search(r'href="([^"#]+)">\s*Older', body)
+    return total, names, older.group(1).replace('&amp;', '&') if older else None
+
+
+def test_text_search_finds_files_past_the_first_page(client, papers):
+    total, names, older = results(client.get('/search?q=compiler'))
+    assert (total, names, older) == (1, ['Paper 0'], None)
+
+
+def test_filters_count_every_match_and_carry_into_page_links(client, papers):
+    total, names, older = results(client.get('/search?course_type=UG&department=CSE'))
+    assert total == 30
+    assert len(names) == 30
+    assert all(int(name.split()[1]) % 2 for name in names)
+
+    portal.app.config['PAGE_SIZE'] = 20
+    try:
+        total, names, older = results(client.get('/search?department=CSE'))
+        assert (total, len(names)) == (30, 20)
+        assert parse_qs(urlparse(older).query)['department'] == ['CSE']
+        total, rest, older = results(client.get(older))
+        assert (total, len(rest), older) == (30, 10, None)
+        assert not set(names) & set(rest)
+    finally:
+        portal.app.config['PAGE_SIZE'] = 50
+
+
+def test_no_matches(client, papers):
+    body = client.get('/search?q=thermodynamics').get_data(as_text=True)
+    assert 'No Results Found' in body
+
+
+def test_json_fallback_is_paged(client, monkeypatch):
+    records = [portal.files_collection.insert({
+        'filename': f'legacy{i}.pdf', 'custom_filename': f'Legacy {i}', 'subject': 'Old subject' if i else 'Rare subject',
+        'course_type': 'ug', 'department': 'cse', 'semester': '1', 'category': 'CAT', 'verified': True,
+        'upload_date': f'2024-01-{i + 1:02d} 10:00:00'
+    }) for i in range(5)]
+
+    def database_down(query=None):
+        raise RuntimeError('database unavailable')
+
+    monkeypatch.setattr(portal, 'visible_files_query', database_down)
+    monkeypatch.setitem(portal.app.config, 'PAGE_SIZE', 2)
+    try:
+        first = client.get('/search?format=json').get_json()
+        assert [f['custom_filename'] for f in first['files']] == ['Legacy 4', 'Legacy 3']
+        second = client.get(first['next']).get_json()
+        assert [f['custom_filename'] for f in second['files']] == ['Legacy 2', 'Legacy 1']
+        assert [f['custom_filename'] for f in client.get(second['prev']).get_json()['files']] == ['Legacy 4', 'Legacy 3']
+
+        total, names, older = results(client.get('/search?q=rare'))
+        assert (total, names) == (1, ['Legacy 0'])
+    finally:
+        for record in records:
+            portal.files_collection.delete(record['id'])
+
+
+def test_api_search_uses_the_same_filters(client, papers):
+    data = client.get('/api/search?department=CSE&q=subject').get_json()
+    assert data['count'] == 30
+    assert {f['department'] for f in data['results']} == {'cse'}
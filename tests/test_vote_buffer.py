@@ -0,0 +1,65 @@
+# The vote buffer keeps counting while a flush writes, and keeps failed deltas
+
+import threading
+
+import pytest
+
+from json_store import JsonDocument, JsonCollection
+from vote_buffer import VoteBuffer
+
+
+@pytest.fixture
+def collection(tmp_path):
+    collection = JsonCollection(JsonDocument(str(tmp_path / 'routes.json'), lambda: {"routes": []}), 'routes')
+    collection.insert({'likes': 0, 'dislikes': 0})
+    return collection
+
+
+@pytest.fixture
+def buffer():
+    buffer = VoteBuffer()
+    buffer.flush_interval = 3600
+    buffer.flush_every = 1000
+    return buffer
+
+
+def test_votes_are_not_blocked_by_a_flush(collection, buffer, monkeypatch):
+    writing, release = threading.Event(), threading.Event()
+    update_many = collection.update_many
+
+    def slow_update_many(changes):
+        writing.set()
+        assert release.wait(5)
+        return update_many(changes)
+
+    monkeypatch.setattr(collection, 'update_many', slow_update_many)
+    buffer.vote(collection, 1, 'like')
+    flusher = threading.Thread(target=buffer.flush)
+    flusher.start()
+    assert writing.wait(5)
+
+    # The flush is stuck writing; votes still go through and count its deltas
+    totals = []
+    voter = threading.Thread(target=lambda: totals.append(buffer.vote(collection, 1, 'like')))
+    voter.start()
+    voter.join(1)
+    release.set()
+    assert totals == [{'likes': 2, 'dislikes': 0}]
+
+    flusher.join(5)
+    buffer.flush()
+    assert collection.get(1)['likes'] == 2
+
+
+def test_failed_write_is_retried(collection, buffer, monkeypatch):
+    update_many = collection.update_many
+    monkeypatch.setattr(collection, 'update_many', lambda changes: 1 / 0)
+    buffer.vote(collection, 1, 'like')
+    buffer.vote(collection, 1, 'dislike')
+    buffer.flush()
+    assert collection.get(1)['likes'] == 0
+    assert buffer.vote(collection, 1, 'like') == {'likes': 2, 'dislikes': 1}
+
+    monkeypatch.setattr(collection, 'update_many', update_many)
+    buffer.flush()
+    assert (collection.get(1)['likes'], collection.get(1)['dislikes']) == (2, 1)
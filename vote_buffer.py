@@ -0,0 +1,137 @@
+# Write-behind buffer for like/dislike counters stored in JSON collections
+#
+# Votes are absorbed in memory and answered with stored value + pending delta;
+# the aggregated deltas are written back with one save per collection, either
+# after VOTE_FLUSH_INTERVAL seconds or once VOTE_FLUSH_EVERY votes are pending,
+# and on interpreter exit (gunicorn's graceful worker shutdown). Files are
+# written outside the buffer's lock, so a save only holds up votes on records
+# in the file being saved.
+
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+VOTE_FIELDS = ('likes', 'dislikes')
+
+
+class VoteBuffer:
+    def __init__(self, app=None):
+        self.app = app
+        self.flush_interval = 2.0
+        self.flush_every = 100
+        self._pending = {}  # (collection, record_id, reply_id) -> {'likes': n, 'dislikes': n}
+        self._writing = {}  # Deltas taken by the flush in progress, still counted in totals
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One flush at a time
+        self._timer = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read flush settings from the app config and flush on shutdown"""
+        self.flush_interval = float(app.config.get('VOTE_FLUSH_INTERVAL', self.flush_interval))
+        self.flush_every = int(app.config.get('VOTE_FLUSH_EVERY', self.flush_every))
+        atexit.register(self.flush)
+        self.app = app
+
+    @staticmethod
+    def _find_target(collection, record_id, reply_id=None):
+        """Return the record (or nested reply) holding the counters, or None"""
+        record = collection.get(record_id)
+        if record is not None and reply_id is not None:
+            record = next((reply for reply in record.get('replies', []) if reply.get('id') == reply_id), None)
+        return record
+
+    def vote(self, collection, record_id, vote_type, reply_id=None):
+        """Count a like/dislike; returns the current totals, or None if the target does not exist"""
+        field = 'likes' if vote_type == 'like' else 'dislikes'
+        key = (collection, record_id, reply_id)
+
+        # Looked up before taking the lock: it waits while this collection is being saved
+        target = self._find_target(collection, record_id, reply_id)
+        if target is None:
+            return None
+
+        with self._lock:
+            deltas = self._pending.setdefault(key, dict.fromkeys(VOTE_FIELDS, 0))
+            deltas[field] += 1
+            self._events += 1
+
+            writing = self._writing.get(key)
+            totals = {f: target.get(f, 0) + deltas[f] + (writing[f] if writing else 0) for f in VOTE_FIELDS}
+
+            flush_now = self._events >= self.flush_every
+            if not flush_now:
+                self._schedule()
+
+        if flush_now:
+            self.flush()
+        return totals
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write all pending deltas back, one read-modify-write per collection
+
+        Votes keep being counted while the files are written; only taking the
+        pending deltas and putting back those of a failed write hold the lock.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                pending, self._pending, self._events = self._pending, {}, 0
+                self._writing = dict(pending)
+
+            by_collection = {}
+            for (collection, record_id, reply_id), deltas in pending.items():
+                by_collection.setdefault(collection, {}).setdefault(record_id, []).append((reply_id, deltas))
+
+            for collection, records in by_collection.items():
+                changes = {record_id: self._applier(items) for record_id, items in records.items()}
+                try:
+                    collection.update_many(changes)
+                    failed = False
+                except Exception as e:
+                    logger.error(f"Error flushing votes to {collection.document.path}: {str(e)}")
+                    failed = True
+
+                with self._lock:
+                    for record_id, items in records.items():
+                        for reply_id, deltas in items:
+                            key = (collection, record_id, reply_id)
+                            del self._writing[key]
+                            if failed:
+                                # Keep the deltas so the next flush retries them
+                                kept = self._pending.setdefault(key, dict.fromkeys(VOTE_FIELDS, 0))
+                                for f in VOTE_FIELDS:
+                                    kept[f] += deltas[f]
+
+            with self._lock:
+                if self._pending:
+                    self._schedule()
+
+    @staticmethod
+    def _applier(items):
+        def apply(record):
+            for reply_id, deltas in items:
+                target = record
+                if reply_id is not None:
+                    target = next((reply for reply in record.get('replies', []) if reply.get('id') == reply_id), None)
+                    if target is None:
+                        continue
+                for f in VOTE_FIELDS:
+                    target[f] = target.get(f, 0) + deltas[f]
+        return apply
+
+
+# Global vote buffer instance
+vote_buffer = VoteBuffer()